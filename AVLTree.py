@@ -1,10 +1,14 @@
 # AVL tree implementation
 import sys
+from itertools import chain
 from typing import Union
 
 
 # Create a tree node
 class TreeNode(object):
+    # an index has a node for every distinct key, slots keep them small
+    __slots__ = ('key', 'data', 'left', 'right', 'height')
+
     def __init__(self, key, data):
         self.key = key
         self.data = data
@@ -12,10 +16,61 @@ class TreeNode(object):
         self.right = None
         self.height = 1
 
+    def __setstate__(self, state):
+        # pickle files of the old format hold nodes that had __dict__
+        if isinstance(state, tuple):
+            state = state[1]
+        for name, value in state.items():
+            setattr(self, name, value)
+
 
 class AVLTree(object):
+    # Keys are ordered, so the tree answers < and > as well as =
+    supports_range = True
+
     def __init__(self):
         self.root = None
+        # number of distinct keys
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def from_sorted(cls, pairs: list) -> 'AVLTree':
+        """
+        Build a perfectly balanced tree in O(n) without rotations
+
+        pairs: list of (key, data) sorted by key, keys must be unique and data is a list of values of the key
+        """
+
+        nodes = [TreeNode(key, data) for key, data in pairs]
+        tree = cls()
+        tree.size = len(nodes)
+
+        # (low, high, parent, is left child) of the subtrees that are still to be linked
+        stack = [(0, len(nodes), None, False)]
+        while stack:
+            low, high, parent, is_left = stack.pop()
+            if low >= high:
+                continue
+
+            middle = (low + high) // 2
+            node = nodes[middle]
+            # the bigger child subtree always has (high - low) // 2 nodes
+            node.height = (high - low).bit_length()
+
+            if parent is None:
+                tree.root = node
+            elif is_left:
+                parent.left = node
+            else:
+                parent.right = node
+
+            stack.append((low, middle, node, True))
+            stack.append((middle + 1, high, node, False))
+
+        return tree
 
     def insert_or_update_node(self, key: Union[int, str], value: list) -> None:
         self.root = self._insert_or_update_node(self.root, key, value)
@@ -25,6 +80,7 @@ class AVLTree(object):
 
         # Find the correct location and insert the node
         if not node:
+            self.size += 1
             return TreeNode(key, [value])
 
         if key == node.key:
@@ -104,69 +160,149 @@ class AVLTree(object):
             self.print_helper(currPtr.right, indent, True)
 
     def collect_values_from_subtree(self, node: TreeNode, result: list):
+        self._collect(node, result.extend)
+
+    @staticmethod
+    def _collect(node: TreeNode, extend) -> None:
+        """ Pass data of every node of the subtree to extend in order, without comparing keys """
+
+        stack = []
+        push, pop = stack.append, stack.pop
+        while stack or node is not None:
+            while node is not None:
+                push(node)
+                node = node.left
+
+            node = pop()
+            extend(node.data)
+            node = node.right
+
+    @staticmethod
+    def _iter_nodes(node: TreeNode, stack: list = None):
+        """ Iterative in-order traversal of the subtree, continues the path in stack if given """
+
+        stack = stack if stack is not None else []
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+
+            node = stack.pop()
+            yield node
+            node = node.right
+
+    def items(self):
+        """ Yield (key, data) of all nodes in ascending order of keys """
+
+        for node in self._iter_nodes(self.root):
+            yield node.key, node.data
+
+    def items_reversed(self):
+        """ Yield (key, data) of all nodes in descending order of keys """
+
+        # reversed in-order traversal: the right subtree first
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.right
+
+            node = stack.pop()
+            yield node.key, node.data
+            node = node.left
+
+    def min_item(self):
+        """ Return (key, data) of the leftmost node or None if the tree is empty """
+
+        node = self.root
         if node is None:
-            return
-        self.collect_values_from_subtree(node.left, result)
-        result.extend(node.data)
-        self.collect_values_from_subtree(node.right, result)
+            return None
+        while node.left is not None:
+            node = node.left
+        return node.key, node.data
 
-    def get_values_less_than(self, target: Union[int, str]):
-        result = []
-        self._get_values_less_than(self.root, target, result)
-        return result
+    def max_item(self):
+        """ Return (key, data) of the rightmost node or None if the tree is empty """
 
-    def _get_values_less_than(self, node: TreeNode, target: Union[int, str], result: list):
+        node = self.root
         if node is None:
-            return
+            return None
+        while node.right is not None:
+            node = node.right
+        return node.key, node.data
+
+    # The generators below yield data lists of matching nodes in ascending order of keys,
+    # iter_* flatten them lazily and get_* collect them into one list
+    def _equal_data(self, target: Union[int, str]):
+        node = self.root
+        while node is not None:
+            if node.key == target:
+                yield node.data
+                return
+
+            node = node.right if node.key < target else node.left
+
+    def _less_than_data(self, target: Union[int, str]):
+        for node in self._iter_nodes(self.root):
+            if node.key >= target:
+                return
+            yield node.data
+
+    def _greater_than_path(self, target: Union[int, str, tuple]) -> list:
+        # descend to the smallest key greater than target remembering the path like in-order traversal does
+        stack = []
+        node = self.root
+        while node is not None:
+            if node.key > target:
+                stack.append(node)
+                node = node.left
+            else:
+                node = node.right
+        return stack
 
-        if node.key < target:
-            self.collect_values_from_subtree(node.left, result)
-            # Node value is less than target value => add it to result
-            result.extend(node.data)
-            # Check right subtree
-            self._get_values_less_than(node.right, target, result)
-        else:
-            # Check left subtree
-            self._get_values_less_than(node.left, target, result)
+    def _greater_than_data(self, target: Union[int, str]):
+        for node in self._iter_nodes(None, self._greater_than_path(target)):
+            yield node.data
 
-    def get_values_greater_than(self, target: Union[int, str]):
-        result = []
-        self._get_values_greater_than(self.root, target, result)
-        return result
+    def items_greater_than(self, target: Union[int, str, tuple]):
+        """ Yield (key, data) of nodes with keys greater than target in ascending order of keys """
 
-    def _get_values_greater_than(self, node: TreeNode, target: Union[int, str], result: list):
-        if node is None:
-            return
+        for node in self._iter_nodes(None, self._greater_than_path(target)):
+            yield node.key, node.data
 
-        if node.key > target:
-            self.collect_values_from_subtree(node.right, result)
-            # Node value is greater than target value => add it to result
-            result.extend(node.data)
-            # Check left subtree
-            self._get_values_greater_than(node.left, target, result)
-        else:
-            # Check right subtree
-            self._get_values_greater_than(node.right, target, result)
+    def iter_equal(self, target: Union[int, str]):
+        return chain.from_iterable(self._equal_data(target))
+
+    def iter_less_than(self, target: Union[int, str]):
+        return chain.from_iterable(self._less_than_data(target))
+
+    def iter_greater_than(self, target: Union[int, str]):
+        return chain.from_iterable(self._greater_than_data(target))
 
     def get_equal(self, target: Union[int, str]):
+        return list(self.iter_equal(target))
+
+    # get_* walk the boundary path of the range once: subtrees that lie completely inside it are collected
+    # without comparing their keys, which is faster than filtering a full traversal
+    def get_values_less_than(self, target: Union[int, str]):
         result = []
-        self._get_equal(self.root, target, result)
+        node = self.root
+        while node is not None:
+            if node.key < target:
+                self._collect(node.left, result.extend)
+                result.extend(node.data)
+                node = node.right
+            else:
+                node = node.left
         return result
 
-    def _get_equal(self, node: TreeNode, target: Union[int, str], result):
-        if node is None:
-            return
-
-        if node.key == target:
-            # Node value is equal to target value => add it to result
+    def get_values_greater_than(self, target: Union[int, str]):
+        result = []
+        for node in reversed(self._greater_than_path(target)):
             result.extend(node.data)
-
-        elif node.key < target:
-            # Check right subtree
-            self._get_equal(node.right, target, result)
-        else:
-            # Check left subtree
-            self._get_equal(node.left, target, result)
+            self._collect(node.right, result.extend)
+        return result
 
 
 # tests
@@ -179,8 +315,11 @@ if __name__ == '__main__':
     myTree.insert_or_update_node(10, 120)
     myTree.print_helper(myTree.root, "", True)
 
-    key = 14
-    result = myTree.get_values_less_than(myTree.root, key)
+    key = 11
+    result = myTree.get_values_less_than(key)
     print(result)
-    result = myTree.get_values_greater_than(myTree.root, key)
+    result = myTree.get_values_greater_than(key)
     print(result)
+
+    balancedTree = AVLTree.from_sorted(list(myTree.items()))
+    balancedTree.print_helper(balancedTree.root, "", True)
@@ -0,0 +1,279 @@
+# B+ tree implementation
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Union
+
+
+# Leaf node: sorted keys, data list of every key and the link to the next leaf
+class LeafNode(object):
+    __slots__ = ('keys', 'data', 'next')
+
+    def __init__(self, keys: list, data: list):
+        self.keys = keys
+        self.data = data
+        self.next = None
+
+
+# Internal node: children[i] holds keys less than keys[i], children[i + 1] holds keys from keys[i]
+class InternalNode(object):
+    __slots__ = ('keys', 'children')
+
+    def __init__(self, keys: list, children: list):
+        self.keys = keys
+        self.children = children
+
+
+class BPlusTree(object):
+    # Keys are ordered, so the tree answers < and > as well as =
+    supports_range = True
+
+    def __init__(self, order: int = 64):
+        """
+        B+ tree index with the same interface as AVLTree
+
+        order: maximum number of keys in a node
+
+        Keys of a node are kept in one list that is searched with bisect, so a lookup visits
+        log_order(n) nodes instead of log_2(n) separate TreeNode objects. All data lists live in
+        the leaves, which are linked, so range scans are a sequential walk over the leaves.
+        """
+
+        self.order = order
+        self.root = LeafNode([], [])
+        # number of distinct keys
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def from_sorted(cls, pairs: list, order: int = 64) -> 'BPlusTree':
+        """
+        Build the tree in O(n) by packing the leaves and then every level above them
+
+        pairs: list of (key, data) sorted by key, keys must be unique and data is a list of values of the key
+        """
+
+        tree = cls(order)
+        tree.size = len(pairs)
+        if not pairs:
+            return tree
+
+        # leaves are filled to 3/4 so that the next inserts don't split them at once
+        fill = max(2, order * 3 // 4)
+
+        level = []
+        for start in range(0, len(pairs), fill):
+            chunk = pairs[start:start + fill]
+            leaf = LeafNode([key for key, _ in chunk], [data for _, data in chunk])
+            if level:
+                level[-1].next = leaf
+            level.append(leaf)
+
+        # the smallest key of every node of the level separates it from its left neighbour
+        low_keys = [leaf.keys[0] for leaf in level]
+        while len(level) > 1:
+            parents, parent_low_keys = [], []
+            for start in range(0, len(level), fill + 1):
+                children = level[start:start + fill + 1]
+
+                # a lone last child joins the previous node, which still has room for it
+                if len(children) == 1 and parents:
+                    parents[-1].keys.append(low_keys[start])
+                    parents[-1].children.append(children[0])
+                    continue
+
+                parents.append(InternalNode(low_keys[start + 1:start + len(children)], children))
+                parent_low_keys.append(low_keys[start])
+
+            level, low_keys = parents, parent_low_keys
+
+        tree.root = level[0]
+        return tree
+
+    def __getstate__(self):
+        # keys and data of the leaves are enough to rebuild the tree, nodes are not pickled
+        keys, data = [], []
+        for leaf in self._iter_leaves(self._first_leaf()):
+            keys.extend(leaf.keys)
+            data.extend(leaf.data)
+
+        return {'order': self.order, 'keys': keys, 'data': data}
+
+    def __setstate__(self, state):
+        tree = self.from_sorted(list(zip(state['keys'], state['data'])), state['order'])
+        self.order = tree.order
+        self.root = tree.root
+        self.size = tree.size
+
+    def insert_or_update_node(self, key: Union[int, str], value: list) -> None:
+        split = self._insert(self.root, key, value)
+
+        if split is not None:
+            separator, right = split
+            self.root = InternalNode([separator], [self.root, right])
+
+    def _insert(self, node, key: Union[int, str], value: list):
+        """ Insert into the subtree, return (separator key, new right sibling) if the node was split """
+
+        if isinstance(node, LeafNode):
+            position = bisect_left(node.keys, key)
+
+            if position < len(node.keys) and node.keys[position] == key:
+                node.data[position].append(value)
+                return None
+
+            node.keys.insert(position, key)
+            node.data.insert(position, [value])
+            self.size += 1
+
+            if len(node.keys) <= self.order:
+                return None
+
+            middle = len(node.keys) // 2
+            right = LeafNode(node.keys[middle:], node.data[middle:])
+            del node.keys[middle:], node.data[middle:]
+
+            right.next = node.next
+            node.next = right
+            return right.keys[0], right
+
+        position = bisect_right(node.keys, key)
+        split = self._insert(node.children[position], key, value)
+        if split is None:
+            return None
+
+        separator, child = split
+        node.keys.insert(position, separator)
+        node.children.insert(position + 1, child)
+
+        if len(node.keys) <= self.order:
+            return None
+
+        middle = len(node.keys) // 2
+        right = InternalNode(node.keys[middle + 1:], node.children[middle + 1:])
+        separator = node.keys[middle]
+        del node.keys[middle:], node.children[middle + 1:]
+        return separator, right
+
+    def _find_leaf(self, key: Union[int, str]) -> LeafNode:
+        node = self.root
+        while isinstance(node, InternalNode):
+            node = node.children[bisect_right(node.keys, key)]
+        return node
+
+    def _first_leaf(self) -> LeafNode:
+        node = self.root
+        while isinstance(node, InternalNode):
+            node = node.children[0]
+        return node
+
+    def _last_leaf(self) -> LeafNode:
+        node = self.root
+        while isinstance(node, InternalNode):
+            node = node.children[-1]
+        return node
+
+    @staticmethod
+    def _iter_leaves(leaf: LeafNode):
+        while leaf is not None:
+            yield leaf
+            leaf = leaf.next
+
+    def items(self):
+        """ Yield (key, data) of all keys in ascending order """
+
+        for leaf in self._iter_leaves(self._first_leaf()):
+            yield from zip(leaf.keys, leaf.data)
+
+    def items_reversed(self):
+        """ Yield (key, data) of all keys in descending order """
+
+        # leaves are linked only forwards, so they are visited by a depth-first walk from the last child
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, InternalNode):
+                stack.extend(node.children)
+            else:
+                yield from zip(reversed(node.keys), reversed(node.data))
+
+    def min_item(self):
+        """ Return (key, data) of the smallest key or None if the tree is empty """
+
+        leaf = self._first_leaf()
+        return (leaf.keys[0], leaf.data[0]) if leaf.keys else None
+
+    def max_item(self):
+        """ Return (key, data) of the greatest key or None if the tree is empty """
+
+        leaf = self._last_leaf()
+        return (leaf.keys[-1], leaf.data[-1]) if leaf.keys else None
+
+    # The generators below yield data lists of matching keys in ascending order of keys,
+    # iter_* flatten them lazily and get_* collect them into one list
+    def _equal_data(self, target: Union[int, str]):
+        leaf = self._find_leaf(target)
+        position = bisect_left(leaf.keys, target)
+
+        if position < len(leaf.keys) and leaf.keys[position] == target:
+            yield leaf.data[position]
+
+    def _less_than_data(self, target: Union[int, str]):
+        for leaf in self._iter_leaves(self._first_leaf()):
+            if leaf.keys and leaf.keys[-1] >= target:
+                yield from leaf.data[:bisect_left(leaf.keys, target)]
+                return
+
+            yield from leaf.data
+
+    def _greater_than_data(self, target: Union[int, str]):
+        leaf = self._find_leaf(target)
+        yield from leaf.data[bisect_right(leaf.keys, target):]
+
+        for leaf in self._iter_leaves(leaf.next):
+            yield from leaf.data
+
+    def items_greater_than(self, target: Union[int, str, tuple]):
+        """ Yield (key, data) of keys greater than target in ascending order """
+
+        leaf = self._find_leaf(target)
+        position = bisect_right(leaf.keys, target)
+        yield from zip(leaf.keys[position:], leaf.data[position:])
+
+        for leaf in self._iter_leaves(leaf.next):
+            yield from zip(leaf.keys, leaf.data)
+
+    def iter_equal(self, target: Union[int, str]):
+        return chain.from_iterable(self._equal_data(target))
+
+    def iter_less_than(self, target: Union[int, str]):
+        return chain.from_iterable(self._less_than_data(target))
+
+    def iter_greater_than(self, target: Union[int, str]):
+        return chain.from_iterable(self._greater_than_data(target))
+
+    def get_equal(self, target: Union[int, str]):
+        return list(self.iter_equal(target))
+
+    def get_values_less_than(self, target: Union[int, str]):
+        return list(self.iter_less_than(target))
+
+    def get_values_greater_than(self, target: Union[int, str]):
+        return list(self.iter_greater_than(target))
+
+
+# tests
+if __name__ == '__main__':
+    myTree = BPlusTree(order=4)
+
+    for number in [13, 4, 10, 10, 7, 1, 25, 16, 8, 3]:
+        myTree.insert_or_update_node(number, number * 10)
+
+    print(list(myTree.items()))
+    print(myTree.get_values_less_than(10))
+    print(myTree.get_values_greater_than(10))
+    print(myTree.get_equal(10))
+
+    packedTree = BPlusTree.from_sorted(list(myTree.items()), order=4)
+    print(list(packedTree.items()) == list(myTree.items()))
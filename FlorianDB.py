@@ -1,31 +1,79 @@
 import os
-from pickle import dump, load, PickleError
+import re
+import csv
+import time
+import threading
+from pickle import PickleError
+from itertools import islice
+from operator import itemgetter
 
 from tabulate import tabulate
-from collections import Counter
 
-from AVLTree import AVLTree
+from errors import Error, ProgrammingError, DataError, IntegrityError, OperationalError
+from locks import RWLock
+from indexes import (INDEX_TYPES, TABLE_KEYS, build_index, fold_rows, index_columns, index_keys, index_label,
+                     index_row_key, index_type_name, indexed_columns)
+from planner import Planner
+from aggregates import HashAggregate, item_name
+from sorting import SORT_MEMORY, ordered_by_index, ordered_row_ids, sort_key, sort_result, sort_rows, top_k
+from output import OUTPUT_FORMATS, write_rows
+from parallel import PARALLEL_THRESHOLD, ParallelScanner
+from column_store import VECTOR_THRESHOLD, VectorScanner
+from result_cache import ResultCache
+from SQLparser import bind
+import table_stats
+from wal import WriteAheadLog, CREATE, INSERT, INSERT_MANY, CREATE_INDEX, DROP_INDEX
+from storage import LazyDatabase, is_columnar, load_legacy, write_database
 
 # actually not used
 from colorama import Fore, Style
 
+# Number of rows that bulk inserts validate and log at once
+BULK_BATCH_SIZE = 10000
+
+NUMBER = re.compile(r'-?\d+')
+
+# Types of column values, the columnar file stores only these
+COLUMN_TYPES = (int, str)
+
+
+def database_filename(filename: str) -> str:
+    return filename if filename.endswith('.flodb') else filename + '.flodb'
+
 
 class FlorianDB:
-    def __init__(self):
+    def __init__(self, wal_sync_every=1, wal_sync_interval=0.0):
         """
         Initialize database
 
         filename: name of the file where stored or will be stored data of database, defaults to None
+        wal_sync_every, wal_sync_interval: group commit settings of the write-ahead log, see WriteAheadLog
+
+        Every CREATE and INSERT is appended to the write-ahead log <filename>.wal before it is applied,
+        so it is durable without rewriting the whole file. SAVE (and EXIT) is a checkpoint: the database
+        file is rewritten and the log is emptied. LOAD replays whatever is left in the log after a crash.
+
+        Methods don't print anything: they return results and raise errors.Error subclasses,
+        Interpreter prints them for the interactive shell.
+
+        Methods can be called from many threads. Every table has a reader/writer lock: selects of a table
+        run in parallel, inserts into it wait for them and run one at a time. LOAD, SAVE and CREATE hold
+        the lock of the whole database. Rows are never changed in place and indexes are only changed
+        under the write lock, so rows of a select are read after its lock is released.
+        CREATE INDEX builds the index in a background thread, see create_index.
 
         All our data will be stored in variable self.db. It will look like:
         self.db (dict) = {
             <name of the table> (dict): {
                 'col_names' (list): List of column names of the table
                 'data_types' (list): List of data type for each column
-                'data' (list): List of the rows that was inserted into the table
+                'data' (list): List of the rows (tuples) that was inserted into the table, the position of a row is its id
+                'stats' (dict, optional): Statistics computed by ANALYZE, see table_stats.analyze
+                'folded' (dict): Lowercase copies of str columns by column id, see indexes.fold_rows
 
                 # then will be stored
-                <1st indexed column name> (AVLTree): Tree of unique values of appropriate column
+                <1st indexed column name> (AVLTree | BPlusTree | HashIndex): Index of unique values of appropriate column
+                                                                             to ids of the rows with that value
                 ...
                 # and so on for all indexed columns
             }
@@ -33,65 +81,193 @@ class FlorianDB:
         }
         """
 
-        self.db = {}
+        self.db = LazyDatabase()
         self.filename = ''
+        self.output_format = 'grid'
+        # parallel.ParallelScanner of SET PARALLEL, None while full table scans are serial
+        self.scanner = None
+        self.parallel_threshold = PARALLEL_THRESHOLD
+        # column_store.VectorScanner of SET VECTORISED, None while conditions are evaluated row by row
+        self.vector = None
+        self.vector_threshold = VECTOR_THRESHOLD
+        # ids of rows matching recent WHERE conditions, see SET CACHE_SIZE / CACHE_MEMORY and SHOW CACHE STATS
+        self.cache = ResultCache()
+        # bytes of sort keys an ORDER BY may hold in memory before sorted runs are spilled to temporary files
+        self.sort_memory = SORT_MEMORY
+        # statements of PREPARE by name, parsed once and bound to values on every EXECUTE
+        self.prepared = {}
+
+        self.lock = RWLock()
+        # builds of CREATE INDEX that are running by (table name, column)
+        self._index_builds = {}
+        self._table_locks = {}
+        self._table_locks_guard = threading.Lock()
+
+        self.wal = None
+        self.wal_sync_every = wal_sync_every
+        self.wal_sync_interval = wal_sync_interval
+
+    def load(self, filename: str, create: bool = False) -> int:
+        """
+        Load the database file, a new empty database is created if the file doesn't exist and create is set
 
-    def load(self, filename):
-        if not filename.endswith('.flodb'):
-            filename += '.flodb'
+        :return: Number of operations recovered from the write-ahead log
+        """
 
-        # save previous database
-        if self.filename:
-            self.save()
+        filename = database_filename(filename)
 
-        if os.path.isfile(filename):
-            try:
-                with open(filename, 'rb') as f:
-                    self.db = load(f)
+        if not os.path.isfile(filename) and not create:
+            raise OperationalError(f'File {filename} not found.')
 
-                self.filename = filename
+        with self.lock.writing():
+            return self._load(filename)
 
-                print('Database has been successfully loaded.\n')
-                return True
+    def _load(self, filename: str) -> int:
+        # save previous database
+        if self.filename:
+            self.save()
+            self.close_wal()
+            self.db.close()
+            self.filename = ''
+
+        self.cache.clear()
+        # scanners keep copies of columns of the tables of the previous database
+        if self.scanner is not None:
+            self.scanner.clear()
+        if self.vector is not None:
+            self.vector.clear()
+
+        if not os.path.isfile(filename):
+            self.filename = filename
+            self.db = LazyDatabase()
+            self.open_wal()
+            self.save()
+            return 0
 
-            except (EOFError, FileNotFoundError, PickleError) as e:
-                print(f'Error: Failed to load database - {e}.\n')
-                return False
+        try:
+            if is_columnar(filename):
+                self.db = LazyDatabase(filename)
+            else:
+                self.db = LazyDatabase(tables=load_legacy(filename))
 
-        print(f'File {filename} not found.')
+        except (EOFError, FileNotFoundError, PickleError, ValueError) as e:
+            raise OperationalError(f'Error: Failed to load database - {e}.') from e
 
-        ans = input('Want git to create a new database? [y for yes, n for no]: ')
-        while ans.lower() not in ['y', 'n']:
-            print('\nInvalid input. Please enter either "y" for yes or "n" for no.')
-            ans = input('Want to create a new database? [y for yes, n for no]: ')
-        print()
+        self.filename = filename
+        self.open_wal()
 
-        if ans.lower() == 'y':
-            self.filename = filename
-            self.db = {}
-            self.save()
-            return True
-        else:
-            return False
+        try:
+            return self.replay_wal()
+        except OperationalError:
+            # nothing is saved over the file and the log, so they stay as they are for inspection
+            self.close_wal()
+            self.db.close()
+            self.db = LazyDatabase()
+            self.filename = ''
+            raise
+
+    def save(self) -> bool:
+        """ Checkpoint: write the whole database into its file and empty the write-ahead log """
 
-    def save(self):
         if not self.filename:
             return False
 
-        try:
-            with open(self.filename, 'wb') as f:
-                dump(self.db, f)
+        with self.lock.writing():
+            self._save()
 
-            print('Database has been successfully saved.\n')
-            return True
+        return True
 
-        except PickleError as e:
-            print(f'Error: Failed to save database - {e}.\n')
-            return False
+    def _save(self):
+        # the log with CREATE INDEX is emptied, so the index must be in the file
+        self.wait_for_indexes()
+
+        # the new file continues the next generation of the log, records of the current one are in the file
+        generation = self.db.wal_generation + 1
+        tmp_filename = self.filename + '.tmp'
+        try:
+            # tables that were never accessed are copied from the mapped file as they are
+            write_database(tmp_filename, self.db, generation)
+
+            # the old file stays intact until the new one is completely written
+            loaded = self.db.materialised()
+            self.db.close()
+            os.replace(tmp_filename, self.filename)
+            self.db = LazyDatabase(self.filename, loaded)
+
+        except (OSError, ValueError) as e:
+            raise OperationalError(f'Error: Failed to save database - {e}.') from e
+
+        if self.wal:
+            self.wal.truncate(generation)
+
+    def close(self, save: bool = True):
+        """ Checkpoint and release the files and worker processes of the database """
+
+        with self.lock.writing():
+            if self.filename and save:
+                self.save()
+            self.close_wal()
+            self.db.close()
+
+            if self.scanner is not None:
+                self.scanner.close()
+                self.scanner = None
+            if self.vector is not None:
+                self.vector.close()
+                self.vector = None
+
+    def open_wal(self):
+        self.wal = WriteAheadLog(self.filename + '.wal', self.wal_sync_every, self.wal_sync_interval,
+                                 self.db.wal_generation)
+
+    def close_wal(self):
+        if self.wal:
+            self.wal.close()
+            self.wal = None
+
+    def replay_wal(self) -> int:
+        """ Apply records left in the write-ahead log on top of the loaded checkpoint """
+
+        replayed = 0
+        for record in self.wal.replay(self.db.wal_generation):
+            try:
+                self._replay(record)
+            except Exception as e:
+                raise OperationalError(f'Error: Record {replayed + 1} of the write-ahead log {self.wal.filename} '
+                                       f'can\'t be applied - {e!r}.') from e
+            replayed += 1
+
+        return replayed
+
+    def _replay(self, record: tuple):
+        if record[0] == CREATE:
+            self._create_table(*record[1:])
+        elif record[0] == INSERT:
+            self._insert_row(*record[1:])
+        elif record[0] == INSERT_MANY:
+            self._insert_rows(*record[1:])
+        elif record[0] == CREATE_INDEX:
+            self._create_index(*record[1:])
+        elif record[0] == DROP_INDEX:
+            self._drop_index(*record[1:])
+        else:
+            raise ValueError(f'unknown record type {record[0]!r}')
 
     def is_table_exist(self, name):
         return True if name in self.db else False
 
+    def table_lock(self, name: str) -> RWLock:
+        with self._table_locks_guard:
+            if name not in self._table_locks:
+                self._table_locks[name] = RWLock()
+            return self._table_locks[name]
+
+    def table(self, name: str) -> dict:
+        # check whether the table exists
+        if not self.is_table_exist(name):
+            raise ProgrammingError(f'Error: Table {name} doesn\'t exists.')
+        return self.db[name]
+
     @staticmethod
     def is_column_exist(table, column_name):
         return True if column_name in table['col_names'] else False
@@ -100,21 +276,49 @@ class FlorianDB:
     def is_indexed(table, column_name):
         return True if column_name in table else False
 
-    def create_table(self, name: str, cols: list, indexed: list):
+    @staticmethod
+    def indexed_columns(table) -> list:
+        return indexed_columns(table)
+
+    def create_table(self, name: str, cols: list, indexed: list, index_types: dict = None):
+        with self.lock.writing():
+            self._check_create(name, cols, indexed, index_types)
+
+            self.wal.append(CREATE, name, cols, indexed, index_types)
+            self._create_table(name, cols, indexed, index_types)
+
+    def _check_create(self, name: str, cols: list, indexed: list = (), index_types: dict = None):
         # check whether the table exists
         if self.is_table_exist(name):
-            print(f'Error: Table {name} already exists.\n')
-            return False
+            raise IntegrityError(f'Error: Table {name} already exists.')
 
         if not cols:
-            print('Error: Table must have at least one column.\n')
-            return False
+            raise ProgrammingError('Error: Table must have at least one column.')
 
         # check whether any of entered column names are prohibited
-        if any(['col_names', 'data_types', 'data']) in cols:
-            print(f'Error: Names \'col_names\', \'data_types\', \'data\' are prohibited to use for column names.\n')
-            return False
+        if any(col in TABLE_KEYS for col in cols):
+            names = ', '.join(f"'{key}'" for key in TABLE_KEYS)
+            raise ProgrammingError(f'Error: Names {names} are prohibited to use for column names.')
+
+        # the Python API passes indexes and their types as they are, so everything is checked before it is logged
+        for in_col in indexed or ():
+            for column in index_columns(in_col):
+                if column not in cols:
+                    raise ProgrammingError(f'Error: Column {column} doesn\'t exist in table {name}.')
 
+        for in_col, index_type in (index_types or {}).items():
+            if in_col not in (indexed or ()):
+                raise ProgrammingError(f'Error: Column {index_label(in_col)} has an index type but isn\'t indexed.')
+            self._check_index_type(index_type)
+
+    @staticmethod
+    def _check_index_type(index_type: str):
+        # an unknown type in the log would make every replay fail, so it is rejected before it is logged
+        if not isinstance(index_type, str) or index_type not in INDEX_TYPES:
+            raise ProgrammingError(f'Error: Unknown index type {index_type}, use one of: {", ".join(INDEX_TYPES)}.')
+
+    def _create_table(self, name: str, cols: list, indexed: list, index_types: dict = None):
+        self.cache.invalidate(name)
         self.db[name] = {
             'col_names': cols,
             'data_types': [],
@@ -123,169 +327,594 @@ class FlorianDB:
 
         if indexed:
             for el in indexed:
-                self.db[name][el] = AVLTree()
+                self.db[name][el] = INDEX_TYPES[(index_types or {}).get(el, 'AVL')]()
 
-        print(f'Table {name} has been successfully created.\n')
-        return True
+    def create_index(self, name: str, column: str, index_type: str = 'AVL', background: bool = True):
+        """
+        Index the column of a table that already has rows
+
+        column: name of the column or names of the columns of a composite index, see indexes.index_name
+
+        The index is sorted and bulk-loaded from the rows the table has now in a background thread,
+        the table isn't locked meanwhile and selects scan it. Then the rows inserted during the build are
+        added under the write lock of the table and the index is attached. SAVE waits for running builds.
+
+        background: False builds the index in the calling thread, it is ready when the method returns
+        """
+
+        with self.lock.reading(), self.table_lock(name).writing():
+            table = self.table(name)
+
+            for indexed_column in index_columns(column):
+                if not self.is_column_exist(table, indexed_column):
+                    raise ProgrammingError(f'Error: Column {indexed_column} doesn\'t exist in table {name}.')
+            if self.is_indexed(table, column) or (name, column) in self._index_builds:
+                raise IntegrityError(f'Error: Column {index_label(column)} of table {name} is already indexed.')
+            self._check_index_type(index_type)
+
+            self.wal.append(CREATE_INDEX, name, column, index_type)
+
+            # rows are append-only, the first rows of the build stay as they are
+            build = {'table': table, 'rows': len(table['data']), 'thread': None}
+            self._index_builds[(name, column)] = build
+
+        if not background:
+            self._build_index(name, column, index_type, build)
+            return
+
+        build['thread'] = threading.Thread(target=self._build_index, args=(name, column, index_type, build),
+                                           name=f'index {name}.{column}', daemon=True)
+        build['thread'].start()
+
+    def _build_index(self, name: str, column: str, index_type: str, build: dict):
+        table = build['table']
+        index = None
+
+        try:
+            index = build_index(table, column, index_type, build['rows'])
+
+        finally:
+            with self.table_lock(name).writing():
+                # DROP INDEX removes the build, then the index is thrown away
+                if self._index_builds.get((name, column)) is build:
+                    del self._index_builds[(name, column)]
+
+                    if index is not None:
+                        for row_id, key in enumerate(index_keys(table, column, start=build['rows']), build['rows']):
+                            index.insert_or_update_node(key, row_id)
+                        table[column] = index
+
+    def _create_index(self, name: str, column: str, index_type: str):
+        table = self.db[name]
+        table[column] = build_index(table, column, index_type)
+
+    def wait_for_indexes(self):
+        """ Wait until indexes of CREATE INDEX are built """
+
+        for build in list(self._index_builds.values()):
+            if build['thread'] is not None:
+                build['thread'].join()
+
+    def drop_index(self, name: str, column: str):
+        with self.lock.reading(), self.table_lock(name).writing():
+            table = self.table(name)
+
+            # a running build is cancelled
+            build = self._index_builds.pop((name, column), None)
+            if build is None and (column in TABLE_KEYS or not self.is_indexed(table, column)):
+                raise ProgrammingError(f'Error: Column {index_label(column)} of table {name} isn\'t indexed.')
+
+            self.wal.append(DROP_INDEX, name, column)
+            self._drop_index(name, column)
+
+    def _drop_index(self, name: str, column: str):
+        self.db[name].pop(column, None)
 
     def insert(self, name: str, values: list):
-        # check whether the table exists
-        if not self.is_table_exist(name):
-            print(f'Error: Table {name} doesn\'t exists.\n')
-            return False
+        with self.lock.reading(), self.table_lock(name).writing():
+            self._insert(name, values)
+
+    def _insert(self, name: str, values: list):
+        table = self.table(name)
 
         # check whether the number of columns and the number of entered values matches
-        if len(self.db[name]['col_names']) != len(values):
-            print("Error: Column count doesn't match value count.\n")
-            return False
+        if len(table['col_names']) != len(values):
+            raise DataError('Error: Column count doesn\'t match value count.')
+
+        # check whether the table data type and the entered data type matches, values of an empty table set the types
+        for ctype, value in zip(table['data_types'] or map(type, values), values):
+            if type(value) is not ctype or ctype not in COLUMN_TYPES:
+                raise DataError(self._type_error(value, ctype))
+
+        self.wal.append(INSERT, name, values)
+        self._insert_row(name, values)
 
+    def _insert_row(self, name: str, values: list):
         if not self.db[name]['data_types']:
             self.db[name]['data_types'] = [type(value) for value in values]
 
-        # check whether the table data type and the entered data type matches
-        for ctype, value in zip(self.db[name]['data_types'], values):
-            if not isinstance(value, ctype):
-                print(f'Error: Value {value} doesn\'t match type {str(ctype)[7:-1]}.\n')
-                return False
+        self.cache.invalidate(name)
 
-        self.db[name]['data'].append(values)
+        # indexes store the position of the row in data
+        row_id = len(self.db[name]['data'])
+        self.db[name]['data'].append(tuple(values))
+        fold_rows(self.db[name])
 
-        for in_col in self.db[name]:
-            if in_col in ['col_names', 'data_types', 'data']:
-                continue
+        for in_col in self.indexed_columns(self.db[name]):
+            self.db[name][in_col].insert_or_update_node(index_row_key(self.db[name], in_col, row_id), row_id)
 
-            column_index = self.db[name]['col_names'].index(in_col)
-            if isinstance(values[column_index], int):
-                self.db[name][in_col].insert_or_update_node(values[column_index], values)
-            else:
-                self.db[name][in_col].insert_or_update_node(values[column_index].lower(), values)
+        if 'stats' in self.db[name]:
+            table_stats.update(self.db[name]['stats'], self.db[name]['col_names'], [values])
 
-        print(f'1 row has been inserted into table {name}.\n')
-        return True
+    def insert_many(self, name: str, rows) -> int:
+        """
+        Insert rows into the table
 
-    def select(self, name: str, conds: list):
-        # check whether the table exists
-        if not self.is_table_exist(name):
-            print(f'Error: Table {name} doesn\'t exists.\n')
-            return False
+        rows: iterable of rows, it is consumed in batches of BULK_BATCH_SIZE rows
 
-        # check if there is WHERE expression
-        if not conds:
-            self.print_table(self.db[name])
-            return True
+        Every batch is validated and written to the write-ahead log at once. Indexes are updated
+        after the last batch, so loading a lot of rows builds them bottom-up instead of row by row.
+        Batches inserted before an invalid one are kept.
 
-        res_rows = self._select(self.db[name], conds)
+        :return: Number of inserted rows
+        """
 
-        # if error raised
-        if res_rows is False:
-            return False
+        with self.lock.reading(), self.table_lock(name).writing():
+            return self._insert_many(name, rows)
 
-        # display table
-        self.print_table(self.db[name], res_rows)
-        return True
+    def _insert_many(self, name: str, rows) -> int:
+        table = self.table(name)
+        first_row = len(table['data'])
 
-    def _select(self, table: dict, conds: list):
-        if isinstance(conds[0], list):
-            left_op = self._select(table, conds[0])
-            right_op = self._select(table, conds[2])
-            oper = conds[1]
+        rows = iter(rows)
+        try:
+            while batch := list(islice(rows, BULK_BATCH_SIZE)):
+                self._check_rows(table, batch)
 
-            # if error raised
-            if left_op is False or right_op is False:
-                return False
+                self.wal.append(INSERT_MANY, name, batch)
+                self._append_rows(table, batch)
 
-            return self._filter(oper, left_op, right_op)
+        finally:
+            self.cache.invalidate(name)
+            self._index_rows(table, first_row)
 
-        left_op, oper, right_op = conds
-        return self._filter(oper, left_op, right_op, table)
+        return len(table['data']) - first_row
 
-    def _filter(self, op, l_op, r_op, table=None):
-        if op == 'OR':
-            l_tuple = map(tuple, l_op)
-            r_tuple = map(tuple, r_op)
+    def copy_from(self, name: str, filename: str, header: bool = False) -> int:
+        """
+        Insert rows of the csv file into the table, numbers are converted to int
 
-            common = list((Counter(l_tuple) | Counter(r_tuple)).elements())
+        :return: Number of inserted rows
+        """
 
-            return common
+        with self.lock.reading():
+            data_types = self.table(name)['data_types']
 
-        elif op == 'AND':
-            l_tuple = map(tuple, l_op)
-            r_tuple = map(tuple, r_op)
+        try:
+            with open(filename, newline='', encoding='utf-8') as f:
+                records = csv.reader(f)
+                if header:
+                    next(records, None)
 
-            combined = list((Counter(l_tuple) & Counter(r_tuple)).elements())
+                return self.insert_many(name, self._convert_records(records, data_types))
 
-            return combined
+        except (OSError, csv.Error) as e:
+            raise OperationalError(f'Error: Failed to read {filename} - {e}.') from e
 
-        else:
-            # check whether the entered column exists
-            if not self.is_column_exist(table, l_op):
-                print('Invalid syntax: one of the operands in condition must be the column name.\n')
-                return False
-
-            operator_functions = {
-                '=': lambda x, y: x == y,
-                '<': lambda x, y: x < y,
-                '>': lambda x, y: x > y
-            }
+    @staticmethod
+    def _convert_records(records, data_types: list):
+        for record in records:
+            if not record:
+                continue
+
+            # column types of an empty table are guessed from the first record
+            if not data_types:
+                data_types = [int if NUMBER.fullmatch(value) else str for value in record]
+
+            # the row is left as it is to fail the column count check
+            if len(record) != len(data_types):
+                yield record
+                continue
 
             try:
-                compare_func = operator_functions[op]
-            except KeyError:
-                print(f'Error: Invalid operator {op}!\n')
-                return False
-
-            if isinstance(r_op, str):
-                r_op = r_op.lower()
-
-            if self.is_indexed(table, l_op):
-                if op == '=':
-                    return table[l_op].get_equal(r_op)
-                elif op == '<':
-                    return table[l_op].get_values_less_than(r_op)
-                elif op == '>':
-                    return table[l_op].get_values_greater_than(r_op)
+                yield [int(value) if ctype is int else value for ctype, value in zip(data_types, record)]
+            except ValueError:
+                value = next(value for ctype, value in zip(data_types, record)
+                             if ctype is int and not NUMBER.fullmatch(value))
+                raise DataError(f'Error: Value {value} doesn\'t match type int.') from None
+
+    @staticmethod
+    def _check_rows(table: dict, rows: list):
+        """ Validate a batch of rows column by column """
+
+        col_count = len(table['col_names'])
+        if any(len(values) != col_count for values in rows):
+            raise DataError('Error: Column count doesn\'t match value count.')
+
+        data_types = table['data_types'] or [type(value) for value in rows[0]]
+        for column_index, ctype in enumerate(data_types):
+            column = list(map(itemgetter(column_index), rows))
+
+            # exact types, so bool values don't pass as int
+            if ctype not in COLUMN_TYPES or set(map(type, column)) != {ctype}:
+                value = next(value for value in column if type(value) is not ctype or ctype not in COLUMN_TYPES)
+                raise DataError(FlorianDB._type_error(value, ctype))
+
+    @staticmethod
+    def _type_error(value, ctype: type) -> str:
+        if ctype not in COLUMN_TYPES:
+            return f'Error: Value {value!r} of type {ctype.__name__} is not supported, values must be int or str.'
+        return f'Error: Value {value} doesn\'t match type {ctype.__name__}.'
+
+    def _insert_rows(self, name: str, rows: list):
+        table = self.db[name]
+        first_row = len(table['data'])
+
+        self.cache.invalidate(name)
+        self._append_rows(table, rows)
+        self._index_rows(table, first_row)
+
+    @staticmethod
+    def _append_rows(table: dict, rows: list):
+        if not table['data_types']:
+            table['data_types'] = [type(value) for value in rows[0]]
+
+        table['data'].extend(map(tuple, rows))
+        fold_rows(table)
+
+    def _index_rows(self, table: dict, first_row: int):
+        """ Add rows starting from first_row to the indexes of the table """
+
+        new_rows = table['data'][first_row:]
+        if not new_rows:
+            return
+
+        if 'stats' in table:
+            table_stats.update(table['stats'], table['col_names'], new_rows)
+
+        for in_col in self.indexed_columns(table):
+            # rebuilding the whole index is cheaper than inserting more rows than it already has
+            if len(new_rows) >= first_row:
+                table[in_col] = build_index(table, in_col, index_type_name(table[in_col]))
+            else:
+                for row_id, key in enumerate(index_keys(table, in_col, start=first_row), first_row):
+                    table[in_col].insert_or_update_node(key, row_id)
+
+    def select(self, name: str, conds: list, limit: int = None, columns: list = None, group_by: list = None,
+               order_by=None, descending: bool = False) -> tuple:
+        """
+        Select rows of the table that match the WHERE condition tree
+
+        columns: names of the selected columns and [function, column] of aggregates, all columns if empty or None
+        group_by: names of the columns that group rows for aggregates
+        order_by: column name (or [function, column] of an aggregate of the select list) the rows are sorted by
+        descending: whether rows are sorted in descending order, rows with equal values keep the order of the table
+
+        :return: tuple(
+            (list): Column names
+            (iterator): Matching rows, they are taken from the table while the iterator is consumed, rows inserted
+                        after select returned are not included
+        )
+        """
+
+        with self.lock.reading(), self.table_lock(name).reading():
+            table = self.table(name)
 
+            if group_by or any(isinstance(item, list) for item in columns or ()):
+                col_names, rows = self._aggregate(name, table, conds, columns or group_by, group_by or [])
+                if order_by is not None:
+                    rows = sort_result(rows, self._order_position(col_names, order_by), descending)
+                return col_names, iter(rows[:limit] if limit is not None else rows)
+
+            col_ids = self._projection(name, table, columns)
+
+            if order_by is not None:
+                data = table['data']
+                rows = map(data.__getitem__, self._ordered(name, table, conds, order_by, descending, limit))
+
+            # check if there is WHERE expression
+            elif not conds:
+                # rows inserted after the lock is released are not part of the result
+                rows = islice(table['data'], len(table['data']))
             else:
-                col_id = table['col_names'].index(l_op)
-                result = []
+                planner = Planner(table, self.scanner, self.vector)
+                index_only = planner.index_only(planner.plan(conds), col_ids) if col_ids is not None else None
+
+                if index_only is not None:
+                    # the index may change after the lock is released, so its keys are taken at once
+                    return columns, iter(index_only.rows(limit))
+
+                data = table['data']
+                rows = (data[row_id] for row_id in self._select(table, conds, name))
+
+        if col_ids is not None:
+            # only the selected values of the rows are taken
+            getter = itemgetter(*col_ids)
+            rows = map(getter, rows) if len(col_ids) > 1 else ((getter(row),) for row in rows)
+
+        if limit is not None:
+            rows = islice(rows, limit)
+
+        return (columns if col_ids is not None else table['col_names']), rows
+
+    def _ordered(self, name: str, table: dict, conds: list, column, descending: bool, limit: int = None):
+        """
+        Return ids of the rows that match the WHERE condition tree in the order of the column
+
+        An AVL or BTREE index of the column is walked in order (stopping after limit matching rows), otherwise
+        the first limit rows are kept by a heap of limit rows or all matching rows are sorted, see sorting.py.
+        """
+
+        self._check_order(name, table, column)
+        planner = Planner(table, self.scanner, self.vector)
+        plan = planner.plan(conds) if conds else None
+
+        if ordered_by_index(table, column, plan, limit):
+            # the index may change after the lock is released, so the ids are taken at once
+            return ordered_row_ids(table, column, descending, planner.condition(conds) if conds else None, limit)
+
+        row_ids = self._select(table, conds, name) if conds else range(len(table['data']))
+        key = sort_key(table, table['col_names'].index(column))
+
+        if limit is not None:
+            return top_k(row_ids, key, limit, descending)
+        return sort_rows(row_ids, key, descending, self.sort_memory)
 
-                if isinstance(r_op, str):
-                    for row in table['data']:
-                        if compare_func(row[col_id].lower(), r_op):
-                            result.append(row)
-                else:
-                    for row in table['data']:
-                        if compare_func(row[col_id], r_op):
-                            result.append(row)
+    def _check_order(self, name: str, table: dict, column):
+        if not isinstance(column, str):
+            raise ProgrammingError(f'Error: Aggregate {item_name(column)} in ORDER BY of a query without aggregates.')
+        self._projection(name, table, [column])
 
-                return result
+    @staticmethod
+    def _order_position(col_names: list, item) -> int:
+        """ Position of the ORDER BY item among the columns of the aggregate result """
+
+        if item_name(item) not in col_names:
+            raise ProgrammingError(f'Error: {item_name(item)} of ORDER BY must be in the select list.')
+        return col_names.index(item_name(item))
+
+    def _aggregate(self, name: str, table: dict, conds: list, items: list, group_by: list) -> tuple:
+        """
+        Aggregate the rows that match the WHERE condition tree
+
+        :return: tuple(
+            (list): Column names
+            (list): Result rows, one for every group
+        )
+        """
+
+        aggregate = self._hash_aggregate(name, table, items, group_by)
+
+        if not group_by:
+            plan = Planner(table, self.scanner, self.vector).plan(conds) if conds else None
+            if aggregate.answers(plan):
+                return aggregate.names(), [aggregate.from_index(plan)]
+
+        # the ids of the matching rows are aggregated chunk by chunk, rows themselves are not collected
+        row_ids = self._select(table, conds, name) if conds else range(len(table['data']))
+        return aggregate.names(), aggregate.run(row_ids)
+
+    def _hash_aggregate(self, name: str, table: dict, items: list, group_by: list) -> HashAggregate:
+        columns = list(group_by) + [item if isinstance(item, str) else item[1] for item in items]
+        self._projection(name, table, [column for column in columns if column != '*'])
+
+        return HashAggregate(table, items, group_by)
 
     @staticmethod
-    def print_table(table: dict, data=None):
-        col_names = table['col_names']
+    def _projection(name: str, table: dict, columns: list = None):
+        """ Return ids of the selected columns or None if all columns are selected """
+
+        if not columns:
+            return None
+
+        for column in columns:
+            if column not in table['col_names']:
+                raise ProgrammingError(f'Error: Column {column} doesn\'t exist in table {name}.')
+
+        return [table['col_names'].index(column) for column in columns]
+
+    def _select(self, table: dict, conds: list, name: str = None):
+        """
+        Evaluate the WHERE condition tree, the result is taken from the result cache if the table has a name
+
+        :return: Sorted list or array of ids (positions in table['data']) of matching rows
+        """
+
+        planner = Planner(table, self.scanner, self.vector)
+        if name is None:
+            return planner.plan(conds).execute()
+
+        condition = str(planner.condition(conds))
+        row_ids = self.cache.get(name, condition)
+
+        if row_ids is None:
+            version = self.cache.version(name)
+            row_ids = self.cache.put(name, version, condition, planner.plan(conds).execute())
+
+        return row_ids
+
+    def analyze(self, name: str = '') -> list:
+        """
+        Compute statistics of the table or of all tables if name is empty
+
+        :return: Names of the analyzed tables, statistics are stored in table['stats']
+        """
+
+        with self.lock.reading():
+            names = [name] if name else list(self.db)
+
+            for table_name in names:
+                with self.table_lock(table_name).writing():
+                    table = self.table(table_name)
+                    table['stats'] = table_stats.analyze(table)
+
+        return names
+
+    def explain(self, name: str, conds: list, columns: list = None, group_by: list = None, order_by=None,
+                descending: bool = False, limit: int = None) -> list:
+        """ Return lines describing the plan of the select query """
+
+        with self.lock.reading(), self.table_lock(name).reading():
+            table = self.table(name)
+            planner = Planner(table, self.scanner, self.vector)
+
+            if group_by or any(isinstance(item, list) for item in columns or ()):
+                aggregate = self._hash_aggregate(name, table, columns or group_by, group_by or [])
+                plan = planner.plan(conds) if conds else None
+
+                # the aggregate is the child of the sort of ORDER BY
+                lines, depth = [], 0
+                if order_by is not None:
+                    self._order_position(aggregate.names(), order_by)
+                    lines, depth = [f'Sort: ORDER BY {item_name(order_by)}{" DESC" if descending else ""}'], 1
+                prefix = '  ' * (depth - 1) + '-> ' if depth else ''
+
+                if plan is not None:
+                    return lines + [prefix + aggregate.describe(plan)] + plan.explain(depth + 1)
+                if aggregate.answers():
+                    return lines + [prefix + aggregate.describe()]
+                return lines + [prefix + aggregate.describe(),
+                                f'{"  " * depth}-> Table scan: {name}  (est. rows: {len(table["data"])})']
+
+            col_ids = self._projection(name, table, columns)
+            if order_by is not None:
+                return self._explain_order(name, table, planner, conds, order_by, descending, limit)
+
+            if not conds:
+                return [f'Table scan: {name}  (est. rows: {len(table["data"])})']
+
+            plan = planner.plan(conds)
+            if col_ids is not None:
+                plan = planner.index_only(plan, col_ids) or plan
+
+            return plan.explain()
+
+    def _explain_order(self, name: str, table: dict, planner: Planner, conds: list, column, descending: bool,
+                       limit: int = None) -> list:
+        self._check_order(name, table, column)
+        plan = planner.plan(conds) if conds else None
+        order = f'ORDER BY {column}{" DESC" if descending else ""}'
+
+        if ordered_by_index(table, column, plan, limit):
+            condition = f': {planner.condition(conds)}' if conds else ''
+            return [f'Index order scan using {index_type_name(table[column])} index on {column}'
+                    f'{" DESC" if descending else ""}{condition}']
+
+        if limit is not None:
+            lines = [f'Top-K heap: {order} LIMIT {limit}']
+        else:
+            lines = [f'Sort: {order}']
+
+        if plan is None:
+            return lines + [f'-> Table scan: {name}  (est. rows: {len(table["data"])})']
+        return lines + plan.explain(1)
+
+    def cache_stats(self) -> dict:
+        """ Counters of the result cache, see result_cache.ResultCache.stats """
+
+        return self.cache.stats()
+
+    def prepare(self, name: str, statement: dict):
+        """ Keep the parsed statement under the name, an old statement of the same name is replaced """
+
+        self.prepared[name] = statement
 
-        if data is None:
-            data = table['data']
+    def prepared_statement(self, name: str) -> dict:
+        if name not in self.prepared:
+            raise ProgrammingError(f'Error: Prepared statement {name} doesn\'t exist.')
+        return self.prepared[name]
 
-        # Create a table with column headers and data
-        table = [col_names] + data
+    def set_option(self, option: str, value):
+        if option == 'OUTPUT':
+            if str(value).lower() not in OUTPUT_FORMATS:
+                raise ProgrammingError(f'Error: Unknown output format {value}, use one of: {", ".join(OUTPUT_FORMATS)}.')
 
-        # Using tabulate for table formatting and output
-        print(tabulate(table, headers='firstrow', tablefmt='grid'), '\n')
+            self.output_format = str(value).lower()
+            return
+
+        if option in ('PARALLEL', 'PARALLEL_THRESHOLD'):
+            if not isinstance(value, int) or value < 0:
+                raise ProgrammingError(f'Error: Value of {option} must be a non-negative number.')
+
+            if option == 'PARALLEL_THRESHOLD':
+                self.parallel_threshold = value
+                if self.scanner is not None:
+                    self.scanner.threshold = value
+                return
+
+            # the old pool is stopped, the number of workers of a pool is fixed
+            if self.scanner is not None:
+                self.scanner.close()
+            self.scanner = ParallelScanner(value, self.parallel_threshold) if value else None
+            return
+
+        if option == 'VECTORISED':
+            if str(value).upper() not in ('ON', 'OFF'):
+                raise ProgrammingError('Error: Value of VECTORISED must be ON or OFF.')
+
+            if str(value).upper() == 'OFF':
+                if self.vector is not None:
+                    self.vector.close()
+                self.vector = None
+            elif self.vector is None:
+                try:
+                    self.vector = VectorScanner(self.vector_threshold)
+                except ImportError:
+                    raise OperationalError('Error: NumPy is required for vectorised scans.')
+            return
+
+        if option in ('CACHE_SIZE', 'CACHE_MEMORY'):
+            if not isinstance(value, int) or value < 0:
+                raise ProgrammingError(f'Error: Value of {option} must be a non-negative number.')
+
+            if option == 'CACHE_SIZE':
+                self.cache.resize(size=value)
+            else:
+                self.cache.resize(memory=value)
+            return
+
+        if option == 'SORT_MEMORY':
+            if not isinstance(value, int) or value < 0:
+                raise ProgrammingError(f'Error: Value of {option} must be a non-negative number.')
+
+            self.sort_memory = value
+            return
+
+        if option == 'VECTORISED_THRESHOLD':
+            if not isinstance(value, int) or value < 0:
+                raise ProgrammingError(f'Error: Value of {option} must be a non-negative number.')
+
+            self.vector_threshold = value
+            if self.vector is not None:
+                self.vector.threshold = value
+            return
+
+        raise ProgrammingError(f'Error: Unknown option {option}.')
 
 
 class Interpreter:
-    def __init__(self, db: FlorianDB, parser):
+    def __init__(self, db: FlorianDB, parser=None):
+        """ Run parsed statements on the database and print their results for the interactive shell """
+
         self.db = db
         self.parser = parser
 
     def interpret(self):
-        result = self.parser.parse()
+        self.execute(bind(self.parser.parse()))
+
+    def execute(self, result: dict):
+        """ Run the parsed statement, it must be bound (see SQLparser.bind) if it has placeholders """
 
         if not result['success']:
             print(result['error'])
             return
 
+        try:
+            self._execute(result)
+        except Error as e:
+            print(f'{e}\n')
+
+    def _execute(self, result: dict):
         # debug -------------------------
         # for key, value in result.items():
         #     print(key, ": ", value)
@@ -293,7 +922,7 @@ class Interpreter:
 
         command = result['command'].upper()
 
-        if self.db.filename == '' and command not in ["LOAD", "EXIT"]:
+        if self.db.filename == '' and command not in ["LOAD", "EXIT", "SET", "SHOW", "PREPARE", "EXECUTE"]:
             print('Error: Load database first!\n')
             return
 
@@ -301,29 +930,167 @@ class Interpreter:
             table_name = result['table_name']
             col_names = result['col_names']
             indexed_cols = result['indexed_cols']
+            index_types = result['index_types']
+
+            self.db.create_table(table_name, col_names, indexed_cols, index_types)
+            print(f'Table {table_name} has been successfully created.\n')
+
+        elif command == "CREATE INDEX":
+            table_name = result['table_name']
+            column = result['column']
+
+            self.db.create_index(table_name, column, result['index_type'])
+            print(f'Index on column {index_label(column)} of table {table_name} is being built, '
+                  f'selects scan the table until it is ready.\n')
+
+        elif command == "DROP INDEX":
+            table_name = result['table_name']
+            column = result['column']
 
-            self.db.create_table(table_name, col_names, indexed_cols)
+            self.db.drop_index(table_name, column)
+            print(f'Index on column {index_label(column)} of table {table_name} has been dropped.\n')
 
         elif command == "INSERT":
             table_name = result['table_name']
-            col_values = result['col_values']
+            rows = result['rows']
 
-            self.db.insert(table_name, col_values)
+            if len(rows) == 1:
+                self.db.insert(table_name, rows[0])
+                print(f'1 row has been inserted into table {table_name}.\n')
+            else:
+                self.insert_many(table_name, self.db.insert_many, rows)
+
+        elif command == "COPY":
+            table_name = result['table_name']
+            filename = result['filename']
+            header = result['header']
+
+            self.insert_many(table_name, self.db.copy_from, filename, header)
 
         elif command == "SELECT":
             table_name = result['table_name']
             conditions = result['conditions']
+            limit = result['limit']
 
-            self.db.select(table_name, conditions)
+            col_names, rows = self.db.select(table_name, conditions, limit, result.get('columns'), result.get('group_by'),
+                                             result.get('order_by'), result.get('descending', False))
+            write_rows(col_names, rows, self.db.output_format)
 
-        elif command == "LOAD":
-            filename = result['filename']
+        elif command == "ANALYZE":
+            table_name = result['table_name']
+
+            for name in self.db.analyze(table_name):
+                self.print_stats(name, self.db.table(name)['stats'])
+
+        elif command == "EXPLAIN":
+            table_name = result['table_name']
+            conditions = result['conditions']
 
-            self.db.load(filename)
+            print('\n'.join(self.db.explain(table_name, conditions, result.get('columns'), result.get('group_by'),
+                                            result.get('order_by'), result.get('descending', False),
+                                            result.get('limit'))), '\n')
+
+        elif command == "SET":
+            option = result['option']
+            value = result['value']
+
+            self.db.set_option(option, value)
+            if option == 'OUTPUT':
+                print(f'Output format has been set to {self.db.output_format}.\n')
+            elif option == 'PARALLEL':
+                print(f'Full table scans are parallel with {value} worker processes.\n' if value else
+                      'Full table scans are serial.\n')
+            elif option == 'PARALLEL_THRESHOLD':
+                print(f'Tables with at least {value} rows are scanned in parallel.\n')
+            elif option == 'VECTORISED':
+                print('Conditions of full table scans are vectorised.\n' if self.db.vector is not None else
+                      'Conditions of full table scans are evaluated row by row.\n')
+            elif option == 'VECTORISED_THRESHOLD':
+                print(f'Tables with at least {value} rows are scanned vectorised.\n')
+            elif option == 'CACHE_SIZE':
+                print(f'Result cache keeps up to {value} results.\n' if value else 'Result cache is off.\n')
+            elif option == 'CACHE_MEMORY':
+                print(f'Result cache keeps up to {value} bytes of results.\n')
+            elif option == 'SORT_MEMORY':
+                print(f'ORDER BY sorts up to {value} bytes of keys in memory, bigger results are sorted on disk.\n')
+
+        elif command == "SHOW":
+            # values are formatted one by one, otherwise the hit ratio turns all counters into floats
+            stats = [(name, str(value)) for name, value in self.db.cache_stats().items()]
+            print(tabulate(stats, headers=['statistic', 'value'], tablefmt='grid', disable_numparse=True), '\n')
+
+        elif command == "PREPARE":
+            name = result['name']
+            statement = result['statement']
+
+            self.db.prepare(name, statement)
+            print(f'Statement {name} with {statement["params"]} parameter(s) has been prepared.\n')
+
+        elif command == "EXECUTE":
+            name = result['name']
+            values = result['values']
+
+            self.execute(bind(self.db.prepared_statement(name), values))
+
+        elif command == "LOAD":
+            self.load(result['filename'])
 
         elif command == "SAVE":
-            self.db.save()
+            self.save()
 
         else:
-            self.db.save()
+            self.save()
+            self.db.close(save=False)
             exit(0)
+
+    @staticmethod
+    def insert_many(table_name: str, insert, *args):
+        """ Run the bulk insert and print one summary line """
+
+        start_time = time.perf_counter()
+        inserted = insert(table_name, *args)
+        elapsed = time.perf_counter() - start_time
+
+        print(f'{inserted} row(s) have been inserted into table {table_name} '
+              f'in {elapsed:.2f} s ({inserted / elapsed if elapsed else 0:.0f} rows/sec).\n')
+
+    @staticmethod
+    def print_stats(table_name: str, stats: dict):
+        columns = stats['columns']
+        print(f'Table {table_name} has been analyzed: {stats["rows"]} row(s).')
+        if columns:
+            print(tabulate([[col_name, column['distinct'], column['min'], column['max']]
+                            for col_name, column in columns.items()],
+                           headers=['column', 'distinct', 'min', 'max'], tablefmt='grid'))
+        print()
+
+    def load(self, filename: str):
+        filename = database_filename(filename)
+        create = False
+
+        if not os.path.isfile(filename):
+            print(f'File {filename} not found.')
+
+            ans = input('Want git to create a new database? [y for yes, n for no]: ')
+            while ans.lower() not in ['y', 'n']:
+                print('\nInvalid input. Please enter either "y" for yes or "n" for no.')
+                ans = input('Want to create a new database? [y for yes, n for no]: ')
+            print()
+
+            if ans.lower() == 'n':
+                return
+            create = True
+
+        replayed = self.db.load(filename, create)
+
+        if create:
+            print('Database has been successfully saved.\n')
+            return
+
+        if replayed:
+            print(f'{replayed} operation(s) have been recovered from the write-ahead log.')
+        print('Database has been successfully loaded.\n')
+
+    def save(self):
+        if self.db.save():
+            print('Database has been successfully saved.\n')
@@ -0,0 +1,56 @@
+# Hash index implementation
+from typing import Union
+
+
+class HashIndex(object):
+    # Keys are not ordered, so < and > can't be answered by the index
+    supports_range = False
+
+    def __init__(self):
+        """
+        Equality-only index with the same interface as AVLTree
+
+        Maps a key to the list of values with that key, so a lookup is one dict access.
+        """
+
+        self.table = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    @classmethod
+    def from_sorted(cls, pairs: list) -> 'HashIndex':
+        index = cls()
+        index.table = dict(pairs)
+        return index
+
+    def insert_or_update_node(self, key: Union[int, str], value: list) -> None:
+        data = self.table.get(key)
+        if data is None:
+            self.table[key] = [value]
+        else:
+            data.append(value)
+
+    def items(self):
+        """ Yield (key, data) of all keys in ascending order """
+
+        return iter(sorted(self.table.items(), key=lambda item: item[0]))
+
+    def iter_equal(self, target: Union[int, str]):
+        return iter(self.table.get(target, ()))
+
+    def get_equal(self, target: Union[int, str]):
+        return list(self.table.get(target, ()))
+
+
+# tests
+if __name__ == '__main__':
+    myIndex = HashIndex()
+
+    myIndex.insert_or_update_node(13, 20)
+    myIndex.insert_or_update_node(10, 110)
+    myIndex.insert_or_update_node(10, 120)
+
+    print(myIndex.get_equal(10))
+    print(myIndex.get_equal(11))
+    print(list(myIndex.items()))
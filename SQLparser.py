@@ -1,24 +1,105 @@
 import lexer
 from typing import Union
 
+from indexes import index_name
+
 P_OPEN = '('
 P_CLOSE = ')'
 
+INDEX_TYPES = ('AVL', 'BTREE', 'HASH')
+
+AGGREGATE_FUNCTIONS = ('COUNT', 'SUM', 'MIN', 'MAX', 'AVG')
+
+# Literal token types and the parameter placeholder that stands for a literal
+VALUE_TYPES = (lexer.QUOTES, lexer.NUMBER, lexer.PLACEHOLDER)
+
+# Types of parameter values, the same as the types of literals and of columns
+PARAM_TYPES = (int, str)
+
+
+# Parameter placeholder ? of a statement, position is its number from 0 in the order of the statement
+class Placeholder:
+    __slots__ = ('position',)
+
+    def __init__(self, position: int):
+        self.position = position
+
+    def __repr__(self):
+        return f'Placeholder({self.position})'
+
+
+def _substitute(value, params):
+    if isinstance(value, Placeholder):
+        return params[value.position]
+    if isinstance(value, list):
+        return [_substitute(item, params) for item in value]
+    return value
+
+
+def bind(statement: dict, params=()) -> dict:
+    """
+    Return a copy of the parsed statement with its placeholders replaced by params
+
+    The parsed statement itself is left untouched, so it can be bound again and again.
+    Lists of the copy are new, so rows inserted from it don't share lists with the statement.
+
+    If the number of params doesn't match the number of placeholders or a param isn't int or str:
+    :return: dict(
+        'success' (bool): False
+        'error' (str): Error type and description
+    )
+    """
+
+    if not statement['success']:
+        return statement
+
+    if len(params) != statement.get('params', 0):
+        return {'success': False,
+                'error': f'Parameter error: Statement has {statement.get("params", 0)} parameter(s), '
+                         f'but {len(params)} value(s) were given.\n'}
+
+    # bool is an int subclass, but it isn't a value of the language either
+    for value in params:
+        if type(value) not in PARAM_TYPES:
+            return {'success': False,
+                    'error': f'Parameter error: Value {value!r} of type {type(value).__name__} is not supported, '
+                             f'parameters must be int or str.\n'}
+
+    result = {key: _substitute(value, params) for key, value in statement.items()}
+    result['params'] = 0
+    return result
+
 
 class Parser:
     def __init__(self, plexer: lexer.Lexer):
         self.lexer = plexer
         self._curr_token = self.lexer.get_next_token()
+        # number of placeholders met so far
+        self.placeholders = 0
 
     def advance_to_next_token(self):
         self._curr_token = self.lexer.get_next_token()
 
+    def value(self) -> Union[str, int, Placeholder]:
+        """ Return the value of the current literal or placeholder token and advance """
+
+        token = self._curr_token
+        self.advance_to_next_token()
+
+        if token.ttype == lexer.PLACEHOLDER:
+            self.placeholders += 1
+            return Placeholder(self.placeholders - 1)
+        return token.value
+
     def _error_select(self, instead) -> dict:
         unexpected = f'{self._curr_token.ttype}' if self._curr_token.ttype == 'EOF' else f'{self._curr_token.ttype}:"{self._curr_token.value}"'
 
         return {'success': False,
                 'error': f'Invalid syntax: Unexpected {unexpected} instead {instead} while parsing.\n'
-                         f'Correct syntax: SELECT FROM table_name [WHERE condition]\n'
+                         f'Correct syntax: SELECT [* | item [,...]] FROM table_name [WHERE condition] '
+                         f'[GROUP BY column_name [,...]] [ORDER BY item [ASC | DESC]] [LIMIT number]\n'
+                         f'\t\t\t\titem := column_name | function(column_name) | COUNT(*)\n'
+                         f'\t\t\t\tfunction := ( COUNT | SUM | MIN | MAX | AVG )\n'
                          f'\t\t\t\tcondition := column_name operator "value" | (condition) AND (condition) | (condition) OR (condition)\n'
                          f'\t\t\t\toperator := ( = | < | > )\n'}
 
@@ -27,14 +108,22 @@ class Parser:
 
         return {'success': False,
                 'error': f'Invalid syntax: Unexpected {unexpected} instead {instead} while parsing.\n'
-                         f'Correct syntax: INSERT [INTO] table_name ("value" [,...])\n'}
+                         f'Correct syntax: INSERT [INTO] table_name ("value" [,...]) [, ("value" [,...]) ...]\n'}
+
+    def _error_copy(self, instead) -> dict:
+        unexpected = f'{self._curr_token.ttype}' if self._curr_token.ttype == 'EOF' else f'{self._curr_token.ttype}:"{self._curr_token.value}"'
+
+        return {'success': False,
+                'error': f'Invalid syntax: Unexpected {unexpected} instead {instead} while parsing.\n'
+                         f'Correct syntax: COPY table_name FROM "file_name" [HEADER]\n'}
 
     def _error_create(self, instead) -> dict:
         unexpected = f'{self._curr_token.ttype}' if self._curr_token.ttype == 'EOF' else f'{self._curr_token.ttype}:"{self._curr_token.value}"'
 
         return {'success': False,
                 'error': f'Invalid syntax: Unexpected {unexpected} instead {instead} while parsing.\n'
-                         f'Correct syntax: CREATE table_name (column_name [INDEXED] [,...])\n'}
+                         f'Correct syntax: CREATE table_name (column_name [INDEXED [AVL | BTREE | HASH]] [,...]\n'
+                         f'\t\t\t\t[, INDEXED (column_name, column_name [,...]) [AVL | BTREE | HASH]])\n'}
 
     def parse_create(self) -> dict:
         """
@@ -45,7 +134,9 @@ class Parser:
             'command' (str): Command name
             'table_name' (str): Table name
             'col_names' (list): List of column names
-            'indexed_cols' (list): List of columns that need to be indexed
+            'indexed_cols' (list): List of columns that need to be indexed, columns of a composite index
+                                   are joined by commas (see indexes.index_name)
+            'index_types' (dict): Index type of every indexed column (AVL by default)
         )
 
         If query syntax is invalid:
@@ -60,7 +151,8 @@ class Parser:
             'command': self._curr_token.value,
             'table_name': '',
             'col_names': [],
-            'indexed_cols': []
+            'indexed_cols': [],
+            'index_types': {}
         }
         self.advance_to_next_token()
 
@@ -73,12 +165,17 @@ class Parser:
         result['table_name'] = self._curr_token.value
         self.advance_to_next_token()
 
+        # CREATE INDEX ON ..., a table named index is still created with CREATE index (...)
+        if result['table_name'].upper() == 'INDEX' and self._is_word('ON'):
+            return self.parse_index('CREATE INDEX')
+
         if (self._curr_token.ttype, self._curr_token.value) != (lexer.PARENTHESES, P_OPEN):
             return self._error_create(f'"{P_OPEN}"')
         self.advance_to_next_token()
 
         col_names = []
         indexed_cols = []
+        index_types = {}
 
         while self._curr_token.value != P_CLOSE:
             if self._curr_token.ttype != lexer.IDENTIFIER:
@@ -90,15 +187,34 @@ class Parser:
             col_names.append(self._curr_token.value)
             self.advance_to_next_token()
 
-            if isinstance(self._curr_token.value, str) and self._curr_token.value.upper() == 'INDEXED':
+            # INDEXED (column_name, column_name [,...]) declares a composite index instead of a column
+            if col_names[-1].upper() == 'INDEXED' and self._curr_token.value == P_OPEN:
+                col_names.pop()
+                columns = self.parse_column_list()
+                if isinstance(columns, dict):
+                    return self._error_create(columns['instead'])
+
+                indexed_cols.append(index_name(columns[0]))
+                index_types[indexed_cols[-1]] = 'AVL'
+
+                if isinstance(self._curr_token.value, str) and self._curr_token.value.upper() in INDEX_TYPES:
+                    index_types[indexed_cols[-1]] = self._curr_token.value.upper()
+                    self.advance_to_next_token()
+
+            elif isinstance(self._curr_token.value, str) and self._curr_token.value.upper() == 'INDEXED':
                 indexed_cols.append(col_names[-1])
+                index_types[col_names[-1]] = 'AVL'
                 self.advance_to_next_token()
 
+                if isinstance(self._curr_token.value, str) and self._curr_token.value.upper() in INDEX_TYPES:
+                    index_types[col_names[-1]] = self._curr_token.value.upper()
+                    self.advance_to_next_token()
+
             if self._curr_token.value not in [',', P_CLOSE]:
                 if self._curr_token.ttype == 'EOF':
                     return self._error_create(f'"{P_CLOSE}"')
                 return {'success': False,
-                        'error': f'Column names error: Column name can have only one property: INDEXED.\n'}
+                        'error': f'Column names error: Column name can have only one property: INDEXED [AVL | BTREE | HASH].\n'}
 
             if self._curr_token.value != P_CLOSE:
                 self.advance_to_next_token()
@@ -112,17 +228,119 @@ class Parser:
 
         result['col_names'] = col_names
         result['indexed_cols'] = indexed_cols
+        result['index_types'] = index_types
+        return result
+
+    def parse_column_list(self, index_type: bool = False) -> Union[tuple, dict]:
+        """
+        Parse (column_name [,...] [AVL | BTREE | HASH]) from the opening parenthesis
+
+        index_type: whether an index type may follow the last column
+
+        :return: Tuple (list of column names, index type or None)
+                 or dict('instead' (str): what was expected) if syntax is invalid
+        """
+
+        self.advance_to_next_token()
+        columns = []
+        chosen_type = None
+
+        while True:
+            if self._curr_token.ttype != lexer.IDENTIFIER:
+                return {'instead': '<column name>'}
+            columns.append(self._curr_token.value)
+            self.advance_to_next_token()
+
+            if index_type and isinstance(self._curr_token.value, str) and self._curr_token.value.upper() in INDEX_TYPES:
+                chosen_type = self._curr_token.value.upper()
+                self.advance_to_next_token()
+                break
+
+            if self._curr_token.value != ',':
+                break
+            self.advance_to_next_token()
+
+        if (self._curr_token.ttype, self._curr_token.value) != (lexer.PARENTHESES, P_CLOSE):
+            return {'instead': f'"{P_CLOSE}"'}
+        self.advance_to_next_token()
+
+        return columns, chosen_type
+
+    def _is_word(self, word: str) -> bool:
+        return self._curr_token.ttype == lexer.IDENTIFIER and self._curr_token.value.upper() == word
+
+    def _error_index(self, command: str, instead) -> dict:
+        unexpected = f'{self._curr_token.ttype}' if self._curr_token.ttype == 'EOF' else f'{self._curr_token.ttype}:"{self._curr_token.value}"'
+        index_type = ' [AVL | BTREE | HASH]' if command == 'CREATE INDEX' else ''
+
+        return {'success': False,
+                'error': f'Invalid syntax: Unexpected {unexpected} instead {instead} while parsing.\n'
+                         f'Correct syntax: {command} ON table_name (column_name [,...]{index_type})\n'}
+
+    def parse_index(self, command: str) -> dict:
+        """
+        Parse the rest of CREATE INDEX / DROP INDEX starting from ON
+
+        :return: dict(
+            'success' (bool): Whether query syntax is valid
+            'command' (str): CREATE INDEX or DROP INDEX
+            'table_name' (str): Table name
+            'column' (str): Name of the indexed column, names of columns of a composite index joined by commas
+            'index_type' (str): Index type of CREATE INDEX (AVL by default)
+        )
+        """
+
+        result = {
+            'success': True,
+            'command': command,
+            'table_name': '',
+            'column': ''
+        }
+
+        if not self._is_word('ON'):
+            return self._error_index(command, 'ON')
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != lexer.IDENTIFIER:
+            return self._error_index(command, '<table name>')
+        result['table_name'] = self._curr_token.value
+        self.advance_to_next_token()
+
+        if (self._curr_token.ttype, self._curr_token.value) != (lexer.PARENTHESES, P_OPEN):
+            return self._error_index(command, f'"{P_OPEN}"')
+
+        columns = self.parse_column_list(index_type=command == 'CREATE INDEX')
+        if isinstance(columns, dict):
+            return self._error_index(command, columns['instead'])
+
+        # several columns make a composite index
+        result['column'] = index_name(columns[0])
+        if command == 'CREATE INDEX':
+            result['index_type'] = columns[1] or 'AVL'
+
+        if self._curr_token.ttype != 'EOF':
+            return self._error_index(command, 'EOF')
+
         return result
 
+    def parse_drop(self) -> dict:
+        self.advance_to_next_token()
+
+        if not self._is_word('INDEX'):
+            return self._error_index('DROP INDEX', 'INDEX')
+        self.advance_to_next_token()
+
+        return self.parse_index('DROP INDEX')
+
     def parse_insert(self) -> dict:
         """
-        Parse the sql insert query that insert row into the table
+        Parse the sql insert query that insert one or several rows into the table
 
         :return: dict(
             'success' (bool): Whether query syntax is valid
             'command' (str): Command name
             'table_name' (str): Table name
-            'col_values' (list): List of values that will be inserted to table
+            'rows' (list): List of rows, every row is a list of values that will be inserted to table
         )
 
         If query syntax is invalid:
@@ -136,7 +354,7 @@ class Parser:
             'success': True,
             'command': self._curr_token.value,
             'table_name': '',
-            'col_values': []
+            'rows': []
         }
         self.advance_to_next_token()
 
@@ -152,6 +370,29 @@ class Parser:
         result['table_name'] = self._curr_token.value
         self.advance_to_next_token()
 
+        rows = []
+
+        while True:
+            col_values = self.parse_values()
+
+            if isinstance(col_values, dict):
+                return col_values
+
+            rows.append(col_values)
+
+            if (self._curr_token.ttype, self._curr_token.value) != (lexer.PUNCTUATION, ','):
+                break
+            self.advance_to_next_token()
+
+        if self._curr_token.ttype != 'EOF':
+            return self._error_insert('EOF')
+
+        result['rows'] = rows
+        return result
+
+    def parse_values(self) -> Union[list, dict]:
+        """ values: LPAREN ("value" | number) [, ...] RPAREN """
+
         if (self._curr_token.ttype, self._curr_token.value) != (lexer.PARENTHESES, P_OPEN):
             return self._error_insert(f'"{P_OPEN}"')
         self.advance_to_next_token()
@@ -159,14 +400,13 @@ class Parser:
         col_values = []
 
         while self._curr_token.value != P_CLOSE:
-            if self._curr_token.ttype not in (lexer.QUOTES, lexer.NUMBER):
+            if self._curr_token.ttype not in VALUE_TYPES:
                 if self._curr_token.ttype == lexer.KEYWORD:
                     return {'success': False,
                             'error': f'Name error: Forbidden to use reserved words as column names.\n'}
                 return self._error_insert('<column name>')
 
-            col_values.append(self._curr_token.value)
-            self.advance_to_next_token()
+            col_values.append(self.value())
 
             if self._curr_token.value not in [',', P_CLOSE]:
                 if self._curr_token.ttype == 'EOF':
@@ -181,10 +421,62 @@ class Parser:
                 return self._error_insert(f'"{P_CLOSE}"')
 
         self.advance_to_next_token()
+        return col_values
+
+    def parse_copy(self) -> dict:
+        """
+        Parse the copy command that insert rows from the csv file into the table
+
+        :return: dict(
+            'success' (bool): Whether query syntax is valid
+            'command' (str): Command name
+            'table_name' (str): Table name
+            'filename' (str): Path to the csv file
+            'header' (bool): Whether the first line of the file is a header that must be skipped
+        )
+
+        If query syntax is invalid:
+        :return: dict(
+            'success' (bool): False
+            'error' (str): Error type and description
+        )
+        """
+
+        result = {
+            'success': True,
+            'command': self._curr_token.value,
+            'table_name': '',
+            'filename': '',
+            'header': False
+        }
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != lexer.IDENTIFIER:
+            if self._curr_token.ttype == lexer.KEYWORD:
+                return {'success': False,
+                        'error': f'Name error: Forbidden to use reserved words as table names.\n'}
+            return self._error_copy('<table name>')
+
+        result['table_name'] = self._curr_token.value
+        self.advance_to_next_token()
+
+        if not isinstance(self._curr_token.value, str) or self._curr_token.value.upper() != 'FROM':
+            return self._error_copy('FROM')
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != lexer.QUOTES:
+            return self._error_copy('"file_name"')
+
+        result['filename'] = self._curr_token.value
+        self.advance_to_next_token()
+
+        if isinstance(self._curr_token.value, str) and self._curr_token.value.upper() == 'HEADER':
+            result['header'] = True
+            self.advance_to_next_token()
+
         if self._curr_token.ttype != 'EOF':
-            return self._error_insert('EOF')
+            return self._error_copy('EOF')
 
-        result['col_values'] = col_values
         return result
 
     def parse_select(self) -> dict:
@@ -195,7 +487,13 @@ class Parser:
             'success' (bool): Whether query syntax is valid
             'command' (str): Command name
             'table_name' (str): Table name
+            'columns' (list): Names of the selected columns and [function, column name] of aggregates
+                              (column name is * for COUNT(*)), empty list selects all columns
             'conditions' (list): List of WHERE clause conditions by which records should be filtered
+            'group_by' (list): Names of the columns of GROUP BY
+            'order_by' (str | list | None): Column name or [function, column name] of ORDER BY
+            'descending' (bool): Whether ORDER BY is DESC
+            'limit' (int | None): Maximum number of rows to output
         )
 
         If query syntax is invalid:
@@ -209,12 +507,34 @@ class Parser:
             'success': True,
             'command': self._curr_token.value,
             'table_name': '',
-            'conditions': []
+            'columns': [],
+            'conditions': [],
+            'group_by': [],
+            'order_by': None,
+            'descending': False,
+            'limit': None
         }
         self.advance_to_next_token()
 
+        # select list: * | item [, item]*
+        if (self._curr_token.ttype, self._curr_token.value) == (lexer.PUNCTUATION, '*'):
+            self.advance_to_next_token()
+
+        elif self._curr_token.ttype == lexer.IDENTIFIER:
+            while True:
+                item = self.parse_select_item()
+                if isinstance(item, dict):
+                    return item
+                result['columns'].append(item)
+
+                if self._curr_token.value != ',':
+                    break
+                self.advance_to_next_token()
+                if self._curr_token.ttype != lexer.IDENTIFIER:
+                    return self._error_select('<column name>')
+
         if not isinstance(self._curr_token.value, str) or self._curr_token.value.upper() != 'FROM':
-            return self._error_select('FROM')
+            return self._error_select('FROM' if not result['columns'] else '"," | FROM')
         self.advance_to_next_token()
 
         if self._curr_token.ttype != lexer.IDENTIFIER:
@@ -229,22 +549,131 @@ class Parser:
         if self._curr_token.ttype == 'EOF':
             return result
 
-        if not isinstance(self._curr_token.value, str) or self._curr_token.value.upper() != 'WHERE':
-            return self._error_select('WHERE')
-        self.advance_to_next_token()
+        expected = 'WHERE | GROUP BY | ORDER BY | LIMIT'
+
+        if isinstance(self._curr_token.value, str) and self._curr_token.value.upper() == 'WHERE':
+            self.advance_to_next_token()
+
+            conditions = self.expr()
+
+            if isinstance(conditions, dict):
+                return conditions
+
+            result['conditions'] = conditions
+            expected = 'OR | AND | GROUP BY | ORDER BY | LIMIT'
+
+        if self._is_word('GROUP'):
+            group_by = self.parse_group_by()
+
+            if isinstance(group_by, dict):
+                return group_by
+
+            result['group_by'] = group_by
+            expected = '"," | ORDER BY | LIMIT'
 
-        conditions = self.expr()
+        if self._is_word('ORDER'):
+            order_by = self.parse_order_by()
 
-        if isinstance(conditions, dict):
-            return conditions
+            if isinstance(order_by, dict):
+                return order_by
 
-        result['conditions'] = conditions
+            result['order_by'], result['descending'] = order_by
+            expected = 'ASC | DESC | LIMIT'
+
+        # LIMIT isn't reserved, columns and tables named limit stay valid
+        if self._is_word('LIMIT'):
+            limit = self.parse_limit()
+
+            if isinstance(limit, dict):
+                return limit
+
+            result['limit'] = limit
+            expected = 'EOF'
 
         if self._curr_token.ttype != 'EOF':
-            return self._error_select('OR | AND')
+            return self._error_select(expected)
 
         return result
 
+    def parse_select_item(self) -> Union[str, list, dict]:
+        """ item: column_name | (COUNT | SUM | MIN | MAX | AVG) LPAREN column_name RPAREN | COUNT LPAREN * RPAREN """
+
+        name = self._curr_token.value
+        self.advance_to_next_token()
+
+        # a column may be named like a function, a function is followed by a parenthesis
+        if name.upper() not in AGGREGATE_FUNCTIONS or (self._curr_token.ttype, self._curr_token.value) != (lexer.PARENTHESES, P_OPEN):
+            return name
+        function = name.upper()
+        self.advance_to_next_token()
+
+        if function == 'COUNT' and (self._curr_token.ttype, self._curr_token.value) == (lexer.PUNCTUATION, '*'):
+            column = '*'
+        elif self._curr_token.ttype == lexer.IDENTIFIER:
+            column = self._curr_token.value
+        else:
+            return self._error_select('<column name> | *' if function == 'COUNT' else '<column name>')
+        self.advance_to_next_token()
+
+        if (self._curr_token.ttype, self._curr_token.value) != (lexer.PARENTHESES, P_CLOSE):
+            return self._error_select(f'"{P_CLOSE}"')
+        self.advance_to_next_token()
+
+        return [function, column]
+
+    def parse_group_by(self) -> Union[list, dict]:
+        """ group_by: GROUP BY column_name [, column_name]* """
+
+        self.advance_to_next_token()
+        if not self._is_word('BY'):
+            return self._error_select('BY')
+        self.advance_to_next_token()
+
+        columns = []
+        while True:
+            if self._curr_token.ttype != lexer.IDENTIFIER:
+                return self._error_select('<column name>')
+            columns.append(self._curr_token.value)
+            self.advance_to_next_token()
+
+            if self._curr_token.value != ',':
+                return columns
+            self.advance_to_next_token()
+
+    def parse_order_by(self) -> Union[tuple, dict]:
+        """ order_by: ORDER BY item [ASC | DESC], returns (item, descending) """
+
+        self.advance_to_next_token()
+        if not self._is_word('BY'):
+            return self._error_select('BY')
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != lexer.IDENTIFIER:
+            return self._error_select('<column name>')
+
+        item = self.parse_select_item()
+        if isinstance(item, dict):
+            return item
+
+        descending = False
+        if self._is_word('ASC') or self._is_word('DESC'):
+            descending = self._curr_token.value.upper() == 'DESC'
+            self.advance_to_next_token()
+
+        return item, descending
+
+    def parse_limit(self) -> Union[int, dict]:
+        """ limit: LIMIT number """
+
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != lexer.NUMBER or self._curr_token.value < 0:
+            return self._error_select('<number of rows>')
+
+        limit = self._curr_token.value
+        self.advance_to_next_token()
+        return limit
+
     def expr(self) -> Union[list, dict]:
         """ expr: term [(OR | AND) term]* """
 
@@ -280,8 +709,8 @@ class Parser:
             result = [result, self._curr_token.value]
             self.advance_to_next_token()
 
-            if self._curr_token.ttype not in (lexer.QUOTES, lexer.NUMBER):
-                return self._error_select('"value"')
+            if self._curr_token.ttype not in VALUE_TYPES:
+                return self._error_select('"value" | ?')
             result.append(self.factor())
 
         if not isinstance(result, list):
@@ -306,13 +735,232 @@ class Parser:
             self.advance_to_next_token()
             return res
 
-        elif token.ttype in (lexer.IDENTIFIER, lexer.NUMBER, lexer.QUOTES):
-            self.advance_to_next_token()
-            return token.value
+        elif token.ttype == lexer.IDENTIFIER or token.ttype in VALUE_TYPES:
+            return self.value()
 
         else:
             return self._error_select('column_name | "value"')
 
+    def parse_explain(self) -> dict:
+        """
+        Parse the explain command that shows the plan of the select query
+
+        :return: dict of parse_select with 'command' set to EXPLAIN
+        """
+
+        command = self._curr_token.value
+        self.advance_to_next_token()
+
+        if not isinstance(self._curr_token.value, str) or self._curr_token.value.upper() != 'SELECT':
+            return self._error_select('SELECT')
+
+        result = self.parse_select()
+        if result['success']:
+            result['command'] = command
+
+        return result
+
+    def parse_analyze(self) -> dict:
+        result = {
+            'success': True,
+            'command': self._curr_token.value,
+            'table_name': ''
+        }
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype == lexer.IDENTIFIER:
+            result['table_name'] = self._curr_token.value
+            self.advance_to_next_token()
+
+        if self._curr_token.ttype != 'EOF':
+            return {'success': False,
+                    'error': f'Invalid syntax: Unexpected {self._curr_token.ttype}:"{self._curr_token.value}" instead table_name while parsing.\n'
+                             f'Correct syntax: ANALYZE [table_name]\n'}
+
+        return result
+
+    def parse_show(self) -> dict:
+        """
+        Parse the show command that displays counters of the engine
+
+        :return: dict(
+            'success' (bool): Whether query syntax is valid
+            'command' (str): Command name
+            'subject' (str): What to show, only CACHE STATS for now
+        )
+        """
+
+        result = {
+            'success': True,
+            'command': self._curr_token.value,
+            'subject': ''
+        }
+        self.advance_to_next_token()
+
+        words = []
+        while self._curr_token.ttype == lexer.IDENTIFIER:
+            words.append(self._curr_token.value.upper())
+            self.advance_to_next_token()
+
+        if words != ['CACHE', 'STATS'] or self._curr_token.ttype != 'EOF':
+            unexpected = f'{self._curr_token.ttype}' if self._curr_token.ttype == 'EOF' else f'{self._curr_token.ttype}:"{self._curr_token.value}"'
+            return {'success': False,
+                    'error': f'Invalid syntax: Unexpected {unexpected} instead CACHE STATS while parsing.\n'
+                             f'Correct syntax: SHOW CACHE STATS\n'}
+
+        result['subject'] = ' '.join(words)
+        return result
+
+    def parse_set(self) -> dict:
+        """
+        Parse the set command that changes an option of the session
+
+        :return: dict(
+            'success' (bool): Whether query syntax is valid
+            'command' (str): Command name
+            'option' (str): Option name in upper case
+            'value' (str | int): New value of the option
+        )
+        """
+
+        result = {
+            'success': True,
+            'command': self._curr_token.value,
+            'option': '',
+            'value': None
+        }
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != lexer.IDENTIFIER:
+            return self._error_set('option')
+
+        result['option'] = self._curr_token.value.upper()
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype not in (lexer.IDENTIFIER, lexer.NUMBER, lexer.QUOTES):
+            return self._error_set('value')
+
+        result['value'] = self._curr_token.value
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != 'EOF':
+            return self._error_set('EOF')
+
+        return result
+
+    def _error_set(self, instead) -> dict:
+        unexpected = f'{self._curr_token.ttype}' if self._curr_token.ttype == 'EOF' else f'{self._curr_token.ttype}:"{self._curr_token.value}"'
+
+        return {'success': False,
+                'error': f'Invalid syntax: Unexpected {unexpected} instead {instead} while parsing.\n'
+                         f'Correct syntax: SET option value\n'}
+
+    def _error_prepare(self, instead) -> dict:
+        unexpected = f'{self._curr_token.ttype}' if self._curr_token.ttype == 'EOF' else f'{self._curr_token.ttype}:"{self._curr_token.value}"'
+
+        return {'success': False,
+                'error': f'Invalid syntax: Unexpected {unexpected} instead {instead} while parsing.\n'
+                         f'Correct syntax: PREPARE statement_name AS statement\n'
+                         f'\t\t\t\tstatement can use ? in place of values\n'}
+
+    def parse_prepare(self) -> dict:
+        """
+        Parse the prepare command that parses the statement once to execute it later with EXECUTE
+
+        :return: dict(
+            'success' (bool): Whether query syntax is valid
+            'command' (str): Command name
+            'name' (str): Name of the prepared statement
+            'statement' (dict): Parsed statement, its values may be Placeholder
+            'params' (int): 0, placeholders belong to the statement
+        )
+        """
+
+        result = {
+            'success': True,
+            'command': self._curr_token.value,
+            'name': '',
+            'statement': None,
+            'params': 0
+        }
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != lexer.IDENTIFIER:
+            return self._error_prepare('statement_name')
+
+        result['name'] = self._curr_token.value
+        self.advance_to_next_token()
+
+        if not isinstance(self._curr_token.value, str) or self._curr_token.value.upper() != 'AS':
+            return self._error_prepare('AS')
+        self.advance_to_next_token()
+
+        if isinstance(self._curr_token.value, str) and self._curr_token.value.upper() in ('PREPARE', 'EXECUTE'):
+            return self._error_prepare('statement')
+
+        statement = self.parse()
+        if not statement['success']:
+            return statement
+
+        result['statement'] = statement
+        return result
+
+    def _error_execute(self, instead) -> dict:
+        unexpected = f'{self._curr_token.ttype}' if self._curr_token.ttype == 'EOF' else f'{self._curr_token.ttype}:"{self._curr_token.value}"'
+
+        return {'success': False,
+                'error': f'Invalid syntax: Unexpected {unexpected} instead {instead} while parsing.\n'
+                         f'Correct syntax: EXECUTE statement_name [("value" [,...])]\n'}
+
+    def parse_execute(self) -> dict:
+        """
+        Parse the execute command that runs the prepared statement with values of its placeholders
+
+        :return: dict(
+            'success' (bool): Whether query syntax is valid
+            'command' (str): Command name
+            'name' (str): Name of the prepared statement
+            'values' (list): Values of the placeholders in their order
+        )
+        """
+
+        result = {
+            'success': True,
+            'command': self._curr_token.value,
+            'name': '',
+            'values': []
+        }
+        self.advance_to_next_token()
+
+        if self._curr_token.ttype != lexer.IDENTIFIER:
+            return self._error_execute('statement_name')
+
+        result['name'] = self._curr_token.value
+        self.advance_to_next_token()
+
+        if (self._curr_token.ttype, self._curr_token.value) == (lexer.PARENTHESES, P_OPEN):
+            self.advance_to_next_token()
+
+            while self._curr_token.value != P_CLOSE:
+                if self._curr_token.ttype not in (lexer.QUOTES, lexer.NUMBER):
+                    return self._error_execute('"value"')
+
+                result['values'].append(self._curr_token.value)
+                self.advance_to_next_token()
+
+                if self._curr_token.value not in [',', P_CLOSE]:
+                    return self._error_execute(f'"{P_CLOSE}"')
+
+                if self._curr_token.value != P_CLOSE:
+                    self.advance_to_next_token()
+
+            self.advance_to_next_token()
+
+        if self._curr_token.ttype != 'EOF':
+            return self._error_execute('EOF')
+
+        return result
+
     def parse_load(self) -> dict:
         result = {
             'success': True,
@@ -358,8 +1006,16 @@ class Parser:
     def parse(self) -> dict:
         command_handlers = {
             'CREATE': self.parse_create,
+            'DROP': self.parse_drop,
             'INSERT': self.parse_insert,
+            'COPY': self.parse_copy,
             'SELECT': self.parse_select,
+            'EXPLAIN': self.parse_explain,
+            'ANALYZE': self.parse_analyze,
+            'SET': self.parse_set,
+            'SHOW': self.parse_show,
+            'PREPARE': self.parse_prepare,
+            'EXECUTE': self.parse_execute,
             'LOAD': self.parse_load,
             'SAVE': self.parse_save,
             'EXIT': self.parse_exit
@@ -369,6 +1025,11 @@ class Parser:
             command = self._curr_token.value.upper()
 
             if command in command_handlers:
-                return command_handlers[command]()
+                result = command_handlers[command]()
+
+                # number of placeholders, the statement can be run only after bind() with as many values
+                if result['success']:
+                    result.setdefault('params', self.placeholders)
+                return result
 
         return {'success': False, 'error': 'Error: Unknown command.\n'}
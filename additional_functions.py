@@ -4,3 +4,9 @@ from itertools import islice
 
 def consume(iterator, n):
     deque(islice(iterator, n), maxlen=0)
+
+
+def index_key(value):
+    """ Key of the value in indexes, strings are compared case-insensitively """
+
+    return value if isinstance(value, int) else value.lower()
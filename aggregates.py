@@ -0,0 +1,293 @@
+from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
+
+from errors import ProgrammingError
+from indexes import index_columns
+from planner import CompositeIndexScan, IndexScan
+
+# Number of row ids that are grouped and aggregated at once, every aggregate of a group takes the values
+# of its rows of the chunk with one call of sum / min / max
+CHUNK_ROWS = 4096
+
+
+def item_name(item) -> str:
+    """ Name of the item of the select list in the result: the column name or FUNCTION(column) """
+
+    return item if isinstance(item, str) else f'{item[0]}({item[1]})'
+
+
+class Aggregate:
+    def __init__(self, table: dict, function: str, column: str):
+        """
+        Aggregate function of the select list
+
+        Aggregates are evaluated in chunks: start() is the state of an empty group, update() adds row ids
+        of the group and result() is the value of the group. from_keys() computes the value from
+        (key, row ids) pairs of an index without reading rows.
+        """
+
+        self.function = function
+        self.column = column
+        self.data = table['data']
+        self.col_id = None
+        self.ctype = None
+
+        if column != '*':
+            self.col_id = table['col_names'].index(column)
+            self.ctype = table['data_types'][self.col_id] if table['data_types'] else None
+
+    def values(self, row_ids: list):
+        return map(itemgetter(self.col_id), map(self.data.__getitem__, row_ids))
+
+    def start(self):
+        return None
+
+    def update(self, state, row_ids: list):
+        raise NotImplementedError
+
+    def result(self, state):
+        return state
+
+    def from_keys(self, pairs: list):
+        raise NotImplementedError
+
+
+class Count(Aggregate):
+    # columns have no NULL values, so COUNT(column) is the number of rows like COUNT(*)
+    def start(self):
+        return 0
+
+    def update(self, state, row_ids: list):
+        return state + len(row_ids)
+
+    def from_keys(self, pairs: list):
+        return sum(map(len, map(itemgetter(1), pairs)))
+
+
+class Sum(Aggregate):
+    def __init__(self, table: dict, function: str, column: str):
+        super().__init__(table, function, column)
+        if self.ctype is str:
+            raise ProgrammingError(f'Error: {function} of str column {column}.')
+
+    def update(self, state, row_ids: list):
+        total = sum(self.values(row_ids))
+        return total if state is None else state + total
+
+    def from_keys(self, pairs: list):
+        return sum(key * len(row_ids) for key, row_ids in pairs) if pairs else None
+
+
+class Min(Aggregate):
+    pick = staticmethod(min)
+
+    def __init__(self, table: dict, function: str, column: str):
+        super().__init__(table, function, column)
+
+        # strings are compared case-insensitively like in conditions, the state is the id of the first row
+        # with the smallest (greatest) folded value, so the result is the value as it was inserted
+        self.key = None
+        if self.ctype is str:
+            folded = table.get('folded', {}).get(self.col_id)
+            col_id, data = self.col_id, self.data
+            self.key = folded.__getitem__ if folded is not None else lambda row_id: data[row_id][col_id].lower()
+
+    def update(self, state, row_ids: list):
+        if self.key is not None:
+            row_id = self.pick(row_ids, key=self.key)
+            # the earlier row wins a tie
+            return row_id if state is None else self.pick(state, row_id, key=self.key)
+
+        value = self.pick(self.values(row_ids))
+        return value if state is None else self.pick(state, value)
+
+    def result(self, state):
+        if state is None or self.key is None:
+            return state
+        return self.data[state][self.col_id]
+
+    def from_keys(self, pairs: list):
+        return self.pick(key for key, _ in pairs) if pairs else None
+
+
+class Max(Min):
+    pick = staticmethod(max)
+
+
+class Avg(Sum):
+    def start(self):
+        return [0, 0]
+
+    def update(self, state, row_ids: list):
+        state[0] += sum(self.values(row_ids))
+        state[1] += len(row_ids)
+        return state
+
+    def result(self, state):
+        return state[0] / state[1] if state[1] else None
+
+    def from_keys(self, pairs: list):
+        count = sum(map(len, map(itemgetter(1), pairs)))
+        return sum(key * len(row_ids) for key, row_ids in pairs) / count if count else None
+
+
+AGGREGATES = {'COUNT': Count, 'SUM': Sum, 'MIN': Min, 'MAX': Max, 'AVG': Avg}
+
+
+class HashAggregate:
+    def __init__(self, table: dict, items: list, group_by: list = ()):
+        """
+        Hash aggregation of the select list over a stream of row ids
+
+        items: column names and [function, column] of aggregates, see Parser.parse_select, columns must exist
+        group_by: names of the columns of GROUP BY, rows of one group have equal (folded) values of them
+
+        Row ids are consumed in chunks of CHUNK_ROWS, so the matching rows are never collected. A chunk is split
+        into groups by a dict and every aggregate of a group is updated once per chunk. Without GROUP BY
+        the chunk is the only group.
+        """
+
+        for item in items:
+            if isinstance(item, str) and item not in group_by:
+                raise ProgrammingError(f'Error: Column {item} must be in GROUP BY or used in an aggregate function.')
+
+        self.table = table
+        self.items = items
+        self.group_by = list(group_by)
+        self.aggregates = [AGGREGATES[item[0]](table, *item) for item in items if not isinstance(item, str)]
+
+    def names(self) -> list:
+        return [item_name(item) for item in self.items]
+
+    def _keys(self, row_ids: list):
+        """ Group keys of the rows: values of GROUP BY columns (tuples of several columns), str values are folded """
+
+        data, folded = self.table['data'], self.table.get('folded', {})
+        columns = []
+
+        for column in self.group_by:
+            col_id = self.table['col_names'].index(column)
+            if col_id in folded:
+                columns.append(map(folded[col_id].__getitem__, row_ids))
+            elif self.table['data_types'] and self.table['data_types'][col_id] is str:
+                columns.append((data[row_id][col_id].lower() for row_id in row_ids))
+            else:
+                columns.append(map(itemgetter(col_id), map(data.__getitem__, row_ids)))
+
+        # a single column is the key itself, tuples of one value aren't worth making
+        return columns[0] if len(columns) == 1 else zip(*columns)
+
+    def run(self, row_ids) -> list:
+        """ Aggregate the rows, return result rows of groups in the order of their first rows """
+
+        aggregates = self.aggregates
+        # group key -> [id of the first row, states of aggregates]
+        groups = {}
+
+        row_ids = iter(row_ids)
+        while chunk := list(islice(row_ids, CHUNK_ROWS)):
+            if self.group_by:
+                chunk_groups = defaultdict(list)
+                for row_id, key in zip(chunk, self._keys(chunk)):
+                    chunk_groups[key].append(row_id)
+            else:
+                chunk_groups = {(): chunk}
+
+            for key, group_rows in chunk_groups.items():
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = [group_rows[0], [aggregate.start() for aggregate in aggregates]]
+
+                states = group[1]
+                for i, aggregate in enumerate(aggregates):
+                    states[i] = aggregate.update(states[i], group_rows)
+
+        # without GROUP BY an empty table is one group too
+        if not self.group_by and not groups:
+            groups[()] = [None, [aggregate.start() for aggregate in aggregates]]
+
+        return [self._row(first_row, states) for first_row, states in groups.values()]
+
+    def _row(self, first_row: int, states: list) -> tuple:
+        data, col_names = self.table['data'], self.table['col_names']
+        results = iter([aggregate.result(state) for aggregate, state in zip(self.aggregates, states)])
+
+        # columns of GROUP BY take the values of the first row of the group
+        return tuple(data[first_row][col_names.index(item)] if isinstance(item, str) else next(results)
+                     for item in self.items)
+
+    def _index(self, aggregate: Aggregate):
+        index = self.table.get(aggregate.column) if aggregate.col_id is not None else None
+        return index if index is not None and index.supports_range else None
+
+    @staticmethod
+    def _scan_columns(plan) -> list:
+        if isinstance(plan, IndexScan):
+            return [plan.predicate.column]
+        if isinstance(plan, CompositeIndexScan):
+            return index_columns(plan.in_col)
+        return []
+
+    def answers(self, plan=None) -> bool:
+        """
+        Whether the result is answered by an index without reading rows, see from_index
+
+        plan: plan of the WHERE condition, None if there is no condition
+        """
+
+        if self.group_by:
+            return False
+
+        if plan is None:
+            return all(isinstance(aggregate, Count) or isinstance(aggregate, Min) and self._index(aggregate)
+                       for aggregate in self.aggregates)
+
+        # keys of str columns are folded, only keys of int columns are the values of rows
+        columns = self._scan_columns(plan)
+        return bool(columns) and all(isinstance(aggregate, Count) or aggregate.column in columns
+                                     and aggregate.ctype is int for aggregate in self.aggregates)
+
+    def from_index(self, plan=None) -> tuple:
+        """
+        Return the result row answered by an index, answers() must be true
+
+        plan: IndexScan or CompositeIndexScan answering the whole WHERE condition, None if there is no condition.
+              COUNT and aggregates of int columns of the index are computed from keys of the scan and numbers
+              of their rows, so the matching rows are neither read nor collected.
+        Without a condition COUNT is the number of rows and MIN / MAX of a column with an AVL or BTREE index
+        are the first and the last key of the index, found in O(log n).
+        """
+
+        table = self.table
+
+        if plan is None:
+            results = []
+            for aggregate in self.aggregates:
+                if isinstance(aggregate, Count):
+                    results.append(len(table['data']))
+                else:
+                    index = self._index(aggregate)
+                    item = index.min_item() if aggregate.pick is min else index.max_item()
+                    # keys of str columns are folded, the value is taken from the first row of the key
+                    results.append(table['data'][item[1][0]][aggregate.col_id] if item is not None else None)
+            return tuple(results)
+
+        columns = self._scan_columns(plan)
+        # (key, row ids) of the matching keys, row ids are only counted
+        pairs = list(plan.items())
+
+        results = []
+        for aggregate in self.aggregates:
+            if isinstance(aggregate, Count) or len(columns) == 1:
+                results.append(aggregate.from_keys(pairs))
+            else:
+                position = columns.index(aggregate.column)
+                results.append(aggregate.from_keys([(key[position], row_ids) for key, row_ids in pairs]))
+
+        return tuple(results)
+
+    def describe(self, plan=None) -> str:
+        operator = 'Index aggregate' if self.answers(plan) else 'Hash aggregate'
+        group_by = f' GROUP BY {", ".join(self.group_by)}' if self.group_by else ''
+        return f'{operator}: {", ".join(self.names())}{group_by}'
@@ -0,0 +1,217 @@
+from itertools import islice
+
+from errors import ProgrammingError
+from FlorianDB import FlorianDB
+from SQLparser import bind
+from statements import parse
+
+
+def connect(filename: str, wal_sync_every=1, wal_sync_interval=0.0) -> 'Connection':
+    """
+    Open the database file, it is created if it doesn't exist
+
+        with connect('cats') as connection:
+            for row in connection.execute('SELECT FROM cats WHERE name = ?', ('Murzik',)):
+                ...
+    """
+
+    db = FlorianDB(wal_sync_every, wal_sync_interval)
+    db.load(filename, create=True)
+    return Connection(db)
+
+
+class Connection:
+    def __init__(self, db: FlorianDB, commands: tuple = None):
+        """
+        Embedded connection to the loaded database
+
+        commands: commands the connection runs (e.g. 'SELECT', 'CREATE INDEX'), None runs all of them
+
+        Nothing is printed: statements return rows through cursors and fail with errors.Error subclasses.
+        Every change is durable once execute returns (see the write-ahead log of FlorianDB),
+        commit() is a checkpoint that rewrites the database file.
+        Statements of PREPARE belong to the connection, other connections of the database don't see them.
+        """
+
+        self.db = db
+        self.commands = commands
+        # name -> parsed statement of PREPARE
+        self.prepared = {}
+
+    def cursor(self) -> 'Cursor':
+        return Cursor(self)
+
+    def execute(self, sql: str, params=()) -> 'Cursor':
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq_of_params) -> 'Cursor':
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def commit(self):
+        self.db.save()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Cursor:
+    # default number of rows of fetchmany
+    arraysize = 100
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        # (name, type, None, None, None, None, None) of every column of the result, None if there are no rows
+        self.description = None
+        # number of inserted rows, -1 for other statements
+        self.rowcount = -1
+        self._rows = iter(())
+
+    def execute(self, sql: str, params=()) -> 'Cursor':
+        """ Run one statement, ? placeholders of the statement take the values of params in their order """
+
+        self.run(bind(parse(sql), params))
+        return self
+
+    def executemany(self, sql: str, seq_of_params) -> 'Cursor':
+        """ Run the statement for every params, INSERT statements are inserted as one bulk insert """
+
+        statement = parse(sql)
+
+        if statement['success'] and statement['command'].upper() == 'INSERT':
+            self._allow('INSERT')
+
+            def bound_rows():
+                for params in seq_of_params:
+                    yield from self._check(bind(statement, params))['rows']
+
+            self._reset()
+            self.rowcount = self._db().insert_many(statement['table_name'], bound_rows())
+            return self
+
+        rowcount = 0
+        for params in seq_of_params:
+            self.run(bind(statement, params))
+            rowcount += max(self.rowcount, 0)
+
+        self.rowcount = rowcount
+        return self
+
+    def _db(self) -> FlorianDB:
+        if self.connection.db is None:
+            raise ProgrammingError('Error: Connection is closed.')
+        return self.connection.db
+
+    @staticmethod
+    def _check(statement: dict) -> dict:
+        if not statement['success']:
+            raise ProgrammingError(statement['error'].rstrip('\n'))
+        return statement
+
+    def _allow(self, command: str):
+        if self.connection.commands is not None and command not in self.connection.commands:
+            raise ProgrammingError(f'Error: {command} is not available through this connection.')
+
+    def _reset(self):
+        self.description = None
+        self.rowcount = -1
+        self._rows = iter(())
+
+    def run(self, statement: dict):
+        """ Run the parsed statement, it must be bound (see SQLparser.bind) if it has placeholders """
+
+        statement = self._check(statement)
+        command = statement['command'].upper()
+        db = self._db()
+        self._allow(command)
+
+        self._reset()
+
+        if command == 'CREATE':
+            db.create_table(statement['table_name'], statement['col_names'],
+                            statement['indexed_cols'], statement['index_types'])
+
+        elif command == 'CREATE INDEX':
+            db.create_index(statement['table_name'], statement['column'], statement['index_type'])
+
+        elif command == 'DROP INDEX':
+            db.drop_index(statement['table_name'], statement['column'])
+
+        elif command == 'INSERT':
+            rows = statement['rows']
+
+            if len(rows) == 1:
+                db.insert(statement['table_name'], rows[0])
+                self.rowcount = 1
+            else:
+                self.rowcount = db.insert_many(statement['table_name'], rows)
+
+        elif command == 'COPY':
+            self.rowcount = db.copy_from(statement['table_name'], statement['filename'], statement['header'])
+
+        elif command == 'SELECT':
+            col_names, rows = db.select(statement['table_name'], statement['conditions'], statement['limit'],
+                                        statement.get('columns'), statement.get('group_by'),
+                                        statement.get('order_by'), statement.get('descending', False))
+            table = db.table(statement['table_name'])
+            types = dict(zip(table['col_names'], table['data_types']))
+            self.description = tuple((name, types.get(name), None, None, None, None, None) for name in col_names)
+            # rows of the table are tuples, so they are returned as they are while the cursor is read
+            self._rows = rows
+
+        elif command == 'EXPLAIN':
+            lines = db.explain(statement['table_name'], statement['conditions'], statement.get('columns'),
+                               statement.get('group_by'), statement.get('order_by'),
+                               statement.get('descending', False), statement.get('limit'))
+            self.description = (('plan', str, None, None, None, None, None),)
+            self._rows = iter([(line,) for line in lines])
+
+        elif command == 'ANALYZE':
+            db.analyze(statement['table_name'])
+
+        elif command == 'SET':
+            db.set_option(statement['option'], statement['value'])
+
+        elif command == 'SHOW':
+            # values are counters and byte sizes, only the hit ratio is a float
+            self.description = (('statistic', str, None, None, None, None, None),
+                                ('value', None, None, None, None, None, None))
+            self._rows = iter(db.cache_stats().items())
+
+        elif command == 'PREPARE':
+            self._allow(statement['statement']['command'].upper())
+            self.connection.prepared[statement['name']] = statement['statement']
+
+        elif command == 'EXECUTE':
+            if statement['name'] not in self.connection.prepared:
+                raise ProgrammingError(f'Error: Prepared statement {statement["name"]} doesn\'t exist.')
+            self.run(bind(self.connection.prepared[statement['name']], statement['values']))
+
+        elif command == 'SAVE':
+            db.save()
+
+        else:
+            raise ProgrammingError(f'Error: {command} is not available through connections, '
+                                   f'use connect() and Connection.close().')
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size: int = None) -> list:
+        return list(islice(self._rows, self.arraysize if size is None else size))
+
+    def fetchall(self) -> list:
+        return list(self._rows)
+
+    def __iter__(self):
+        return self._rows
+
+    def close(self):
+        self._reset()
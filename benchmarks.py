@@ -0,0 +1,881 @@
+import gc
+import io
+import os
+import re
+import csv
+import sys
+import time
+import signal
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+from itertools import islice
+from operator import itemgetter
+
+import lexer
+import statements
+from SQLparser import Parser, bind
+from client import Client
+from FlorianDB import FlorianDB
+from indexes import build_index, fold_rows
+from storage import LazyDatabase, decode_column, write_database
+from parallel import ParallelScanner
+from output import write_rows
+from column_store import VectorScanner
+from planner import Planner
+from sorting import SORT_MEMORY
+from AVLTree import AVLTree, TreeNode
+from BPlusTree import BPlusTree
+from additional_functions import consume
+
+
+def measure(func, *args, repeat=3):
+    """ Return the best time of several runs of func in seconds and its result """
+
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(title, baseline, improved):
+    print(f'{title:<40} {baseline * 1000:>10.1f} ms {improved * 1000:>10.1f} ms {baseline / improved:>8.1f}x')
+
+
+# Recursive traversals AVLTree used before the iterative ones, kept as the baseline
+def _recursive_collect(node: TreeNode, result: list):
+    if node is None:
+        return
+    _recursive_collect(node.left, result)
+    result.extend(node.data)
+    _recursive_collect(node.right, result)
+
+
+def _recursive_less_than(node: TreeNode, target, result: list):
+    if node is None:
+        return
+    if node.key < target:
+        _recursive_collect(node.left, result)
+        result.extend(node.data)
+        _recursive_less_than(node.right, target, result)
+    else:
+        _recursive_less_than(node.left, target, result)
+
+
+def _recursive_greater_than(node: TreeNode, target, result: list):
+    if node is None:
+        return
+    if node.key > target:
+        _recursive_collect(node.right, result)
+        result.extend(node.data)
+        _recursive_greater_than(node.left, target, result)
+    else:
+        _recursive_greater_than(node.right, target, result)
+
+
+def _recursive_equal(node: TreeNode, target, result: list):
+    if node is None:
+        return
+    if node.key == target:
+        result.extend(node.data)
+    elif node.key < target:
+        _recursive_equal(node.right, target, result)
+    else:
+        _recursive_equal(node.left, target, result)
+
+
+def bench_avl(rows: int):
+    keys = [random.randrange(rows) for _ in range(rows)]
+    print(f'AVLTree, {rows} rows, {len(set(keys))} distinct keys')
+    print(f'{"":<40} {"recursive":>13} {"iterative":>13} {"speedup":>9}')
+
+    def insert_all():
+        tree = AVLTree()
+        for row_id, key in enumerate(keys):
+            tree.insert_or_update_node(key, row_id)
+        return tree
+
+    def build_sorted():
+        grouped = {}
+        for row_id, key in enumerate(keys):
+            grouped.setdefault(key, []).append(row_id)
+        return AVLTree.from_sorted(sorted(grouped.items()))
+
+    insert_time, tree = measure(insert_all, repeat=1)
+    build_time, _ = measure(build_sorted, repeat=1)
+    report('build (insert one by one / from_sorted)', insert_time, build_time)
+
+    targets = random.sample(keys, 20)
+
+    def recursive(func):
+        def run():
+            for target in targets:
+                result = []
+                func(tree.root, target, result)
+        return run
+
+    def iterative(func):
+        def run():
+            for target in targets:
+                func(target)
+        return run
+
+    for title, old, new in [('equal', _recursive_equal, tree.get_equal),
+                            ('less than', _recursive_less_than, tree.get_values_less_than),
+                            ('greater than', _recursive_greater_than, tree.get_values_greater_than)]:
+        old_time, _ = measure(recursive(old))
+        new_time, _ = measure(iterative(new))
+        report(f'{title} x{len(targets)}', old_time, new_time)
+
+    # streaming: only the first rows of a range are needed
+    def first_rows():
+        for target in targets:
+            list(islice(tree.iter_greater_than(target), 10))
+
+    old_time, _ = measure(recursive(_recursive_greater_than))
+    new_time, _ = measure(first_rows)
+    report(f'first 10 rows greater than x{len(targets)}', old_time, new_time)
+
+
+def bench_btree(rows: int):
+    keys = [random.randrange(rows) for _ in range(rows)]
+    print(f'AVLTree vs BPlusTree, {rows} rows, {len(set(keys))} distinct keys')
+    print(f'{"":<40} {"AVLTree":>13} {"BPlusTree":>13} {"speedup":>9}')
+
+    def insert_all(index_type):
+        def run():
+            tree = index_type()
+            for row_id, key in enumerate(keys):
+                tree.insert_or_update_node(key, row_id)
+            return tree
+        return run
+
+    avl_time, avl = measure(insert_all(AVLTree), repeat=1)
+    btree_time, btree = measure(insert_all(BPlusTree), repeat=1)
+    report('insert one by one', avl_time, btree_time)
+
+    pairs = list(avl.items())
+    avl_time, _ = measure(AVLTree.from_sorted, pairs)
+    btree_time, _ = measure(BPlusTree.from_sorted, pairs)
+    report('from_sorted', avl_time, btree_time)
+
+    points = random.sample(keys, 10000)
+    targets = random.sample(keys, 20)
+
+    def lookups(tree, method, arguments):
+        def run():
+            for target in arguments:
+                getattr(tree, method)(target)
+        return run
+
+    for title, method, arguments in [(f'equal x{len(points)}', 'get_equal', points),
+                                     (f'less than x{len(targets)}', 'get_values_less_than', targets),
+                                     (f'greater than x{len(targets)}', 'get_values_greater_than', targets)]:
+        avl_time, _ = measure(lookups(avl, method, arguments))
+        btree_time, _ = measure(lookups(btree, method, arguments))
+        report(title, avl_time, btree_time)
+
+
+# Lexer that tried every regex at every position of the input, kept as the baseline
+class _LegacyLexer(lexer.Lexer):
+    def __init__(self, sql):
+        self._SQL_REGEX = [
+            (re.compile(rx, re.IGNORECASE | re.UNICODE).match, tt)
+            for rx, tt in lexer.SQL_REGEX
+        ]
+        super().__init__(sql)
+
+    def get_tokens(self, sql: str):
+        iterator = enumerate(sql)
+        for pos, char in iterator:
+            for rematch, tt in self._SQL_REGEX:
+                match = rematch(sql, pos)
+
+                if not match:
+                    continue
+                elif tt is lexer.PROCESS_AS_KEYWORD:
+                    tvalue, ttype = self.is_keyword(match.group())
+                    yield lexer.Token(tvalue, ttype)
+                elif tt is lexer.NUMBER:
+                    yield lexer.Token(int(match.group()), tt)
+                elif tt is lexer.QUOTES:
+                    yield lexer.Token(match.group()[1:-1], tt)
+                else:
+                    yield lexer.Token(match.group(), tt)
+
+                consume(iterator, match.end() - pos - 1)
+                break
+
+
+def bench_lexer(rows: int):
+    tuples = min(rows, 10000)
+    statements = {
+        f'INSERT with {tuples} tuples': 'INSERT INTO people ' + ', '.join(
+            f'({i}, "Name{random.randrange(rows)}", "some longer text value {i}")' for i in range(tuples)),
+        '1000 short INSERTs': ['INSERT INTO cats ("1", "Murzik", "Sausages")'] * 1000,
+    }
+    print('Lexer')
+    print(f'{"":<40} {"legacy":>13} {"master re":>13} {"speedup":>9}')
+
+    def tokenize(lexer_type, sql):
+        def run():
+            for statement in sql if isinstance(sql, list) else [sql]:
+                tokens = lexer_type(statement).tokens
+                for _ in tokens:
+                    pass
+        return run
+
+    for title, sql in statements.items():
+        for statement in sql[:1] if isinstance(sql, list) else [sql]:
+            legacy = [(t.value, t.ttype) for t in _LegacyLexer(statement).tokens if t.ttype != lexer.WHITESPACE]
+            assert legacy == [(t.value, t.ttype) for t in lexer.Lexer(statement).tokens]
+
+        old_time, _ = measure(tokenize(_LegacyLexer, sql))
+        new_time, _ = measure(tokenize(lexer.Lexer, sql))
+        report(title, old_time, new_time)
+
+
+def bench_prepared(rows: int):
+    count = min(rows, 10000)
+    values = [(str(i), f'Name{random.randrange(rows)}', f'some longer text value {i}') for i in range(count)]
+    print(f'Prepared statements, {count} statements')
+    print(f'{"":<40} {"parse each":>13} {"prepared":>13} {"speedup":>9}')
+
+    def parse_each(template):
+        def run():
+            for row in values:
+                Parser(lexer.Lexer(template.format(*row))).parse()
+        return run
+
+    def prepared(template):
+        def run():
+            statement = statements.parse(template.replace('"{}"', '?'))
+            for row in values:
+                bind(statement, row)
+        return run
+
+    for title, template in [('INSERT', 'INSERT INTO people ("{}", "{}", "{}")'),
+                            ('SELECT', 'SELECT FROM people WHERE (id = "{}" OR name = "{}") AND text > "{}"')]:
+        old_time, _ = measure(parse_each(template))
+        new_time, _ = measure(prepared(template))
+        report(title, old_time, new_time)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _connect(port: int, timeout: float = 10.0) -> Client:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return Client(port=port)
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def _percentile(values: list, percent: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def bench_server(rows: int, clients: int = 8, requests: int = 500, write_ratio: float = 0.1):
+    """
+    Load generator: clients send point SELECTs by an indexed column and INSERTs in parallel,
+    latency of every request is measured on the client side
+    """
+
+    print(f'Server, {rows} rows, {clients} clients x {requests} requests, {write_ratio:.0%} writes')
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_name = os.path.join(directory, 'people.csv')
+        with open(csv_name, 'w', newline='') as f:
+            csv.writer(f).writerows((i, f'Name{random.randrange(rows)}', random.randrange(100)) for i in range(rows))
+
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'),
+                                   '--serve', '--db', os.path.join(directory, 'bench'), '--port', str(port)],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            with _connect(port) as client:
+                client.execute('CREATE people (id INDEXED, name INDEXED HASH, age)')
+                client.execute(f'COPY people FROM "{csv_name}"')
+
+            latencies = {'SELECT': [], 'INSERT': []}
+
+            def run(seed: int):
+                generator = random.Random(seed)
+                measured = {'SELECT': [], 'INSERT': []}
+
+                with _connect(port) as client:
+                    for i in range(requests):
+                        start = time.perf_counter()
+                        if generator.random() < write_ratio:
+                            client.execute('INSERT INTO people (?, ?, ?)', (rows + seed * requests + i, 'New', 1))
+                            measured['INSERT'].append(time.perf_counter() - start)
+                        else:
+                            client.execute('SELECT FROM people WHERE id = ?', (generator.randrange(rows),)).fetchall()
+                            measured['SELECT'].append(time.perf_counter() - start)
+
+                for kind, values in measured.items():
+                    latencies[kind].extend(values)
+
+            start_time = time.perf_counter()
+            threads = [threading.Thread(target=run, args=(seed,)) for seed in range(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start_time
+
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait()
+
+    print(f'{"":<12} {"requests":>9} {"p50":>10} {"p95":>10} {"p99":>10} {"max":>10}')
+    for kind, values in latencies.items():
+        values.sort()
+        if values:
+            print(f'{kind:<12} {len(values):>9} ' + ' '.join(
+                f'{_percentile(values, percent) * 1000:>7.2f} ms' for percent in (50, 95, 99, 100)))
+    print(f'throughput: {clients * requests / elapsed:.0f} requests/sec')
+
+
+def bench_stress(rows: int, readers: int = 8, writers: int = 2, seconds: float = 3.0):
+    """
+    Select throughput of 1 and more reader threads, then with writer threads inserting into the same table
+
+    Results and indexes under concurrent access are checked by tests/test_concurrency.py.
+    """
+
+    print(f'Stress, {rows} rows, {readers} reader and {writers} writer threads, {seconds:.0f} s')
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = FlorianDB(wal_sync_every=0)
+        db.load(os.path.join(directory, 'stress'), create=True)
+        db.create_table('t', ['id', 'grp', 'name'], ['id', 'grp', 'name'], {'id': 'AVL', 'grp': 'BTREE', 'name': 'HASH'})
+        db.insert_many('t', ([i, i % 100, f'Name{i % 1000}'] for i in range(rows)))
+
+        stop = threading.Event()
+
+        def read(seed: int, counter: list):
+            generator = random.Random(seed)
+            while not stop.is_set():
+                kind = generator.randrange(3)
+                if kind == 0:
+                    consume(db.select('t', ['grp', '=', generator.randrange(100)])[1], None)
+                elif kind == 1:
+                    consume(db.select('t', ['id', '<', generator.randrange(rows)])[1], None)
+                else:
+                    consume(db.select('t', ['name', '=', f'name{generator.randrange(1000)}'])[1], None)
+                counter[0] += 1
+
+        def write(seed: int, counter: list):
+            generator = random.Random(seed)
+            next_id = rows * (seed + 2)
+            while not stop.is_set():
+                if generator.random() < 0.5:
+                    db.insert('t', [next_id, generator.randrange(100), f'Name{generator.randrange(1000)}'])
+                    next_id += 1
+                else:
+                    batch = [[next_id + i, generator.randrange(100), 'Batch'] for i in range(50)]
+                    db.insert_many('t', batch)
+                    next_id += len(batch)
+                counter[0] += 1
+
+        def run(reader_count: int, writer_count: int) -> tuple:
+            stop.clear()
+            read_counters = [[0] for _ in range(reader_count)]
+            write_counters = [[0] for _ in range(writer_count)]
+            threads = [threading.Thread(target=read, args=(seed, counter)) for seed, counter in enumerate(read_counters)]
+            threads += [threading.Thread(target=write, args=(seed, counter)) for seed, counter in enumerate(write_counters)]
+
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+            return sum(c[0] for c in read_counters) / seconds, sum(c[0] for c in write_counters) / seconds
+
+        try:
+            single, _ = run(1, 0)
+            parallel, _ = run(readers, 0)
+            # selects hold the GIL while they run, so more threads add no throughput
+            print(f'selects/sec without writers: 1 thread {single:.0f}, {readers} threads {parallel:.0f} '
+                  f'({parallel / single:.2f}x)')
+
+            reads, writes = run(readers, writers)
+            print(f'with writers: {reads:.0f} selects/sec, {writes:.0f} inserts/sec')
+        finally:
+            db.close(save=False)
+
+
+def bench_parallel(rows: int, workers: int = 4):
+    rows = max(rows, 1000000)
+    table = {
+        'col_names': ['id', 'name', 'age'],
+        'data_types': [int, str, int],
+        'data': [(i, f'Name{random.randrange(rows)}', random.randrange(100)) for i in range(rows)]
+    }
+    fold_rows(table)
+    print(f'Parallel table scan, {rows} rows, {workers} workers, {os.cpu_count()} CPUs')
+    print(f'{"":<40} {"serial":>13} {"parallel":>13} {"speedup":>9}')
+
+    scanner = ParallelScanner(workers, threshold=0)
+    try:
+        conditions = {
+            'int equality': ['age', '=', 42],
+            'string range': ['name', '<', 'Name2'],
+            'AND of both': [['age', '>', 50], 'AND', ['name', '>', 'Name5']],
+        }
+
+        # the first scan starts the workers and encodes the columns
+        start = time.perf_counter()
+        Planner(table, scanner).plan(conditions['AND of both']).execute()
+        print(f'first scan (start workers, encode columns): {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        for title, conds in conditions.items():
+            serial_time, serial = measure(Planner(table).plan(conds).execute)
+            parallel_time, parallel = measure(Planner(table, scanner).plan(conds).execute)
+            assert serial == parallel
+            report(title, serial_time, parallel_time)
+    finally:
+        scanner.close()
+
+
+def bench_folded(rows: int):
+    table = {
+        'col_names': ['id', 'name', 'age'],
+        'data_types': [int, str, int],
+        'data': [[i, f'Name{random.randrange(rows)}', random.randrange(100)] for i in range(rows)]
+    }
+    fold_rows(table)
+    print(f'Table scan with folded string columns, {rows} rows')
+    print(f'{"":<40} {"lower()":>13} {"folded":>13} {"speedup":>9}')
+
+    conditions = {
+        'string equality': ['name', '=', 'name42'],
+        'string range': ['name', '<', 'Name2'],
+        'AND of string and int': [['age', '>', 50], 'AND', ['name', '>', 'Name5']],
+        'OR of strings': [['name', '=', 'Name7'], 'OR', ['name', '<', 'Name11']],
+    }
+
+    for title, conds in conditions.items():
+        plan = Planner(table).plan(conds)
+        # rows are compared like before the folded columns: lower() of the value of every row
+        matches = plan.condition.compile()
+
+        lower_time, lower = measure(lambda: [row_id for row_id, row in enumerate(table['data']) if matches(row)])
+        folded_time, folded = measure(plan.execute)
+        assert lower == folded
+        report(title, lower_time, folded_time)
+
+
+def bench_vector(rows: int):
+    table = {
+        'col_names': ['id', 'name', 'age'],
+        'data_types': [int, str, int],
+        'data': [[i, f'Name{random.randrange(rows)}', random.randrange(100)] for i in range(rows)]
+    }
+    fold_rows(table)
+    print(f'Vectorised table scan, {rows} rows')
+
+    try:
+        scanner = VectorScanner(threshold=0)
+    except ImportError:
+        print('skipped: NumPy is not installed')
+        return
+
+    conditions = {
+        'int equality': ['id', '=', rows // 2],
+        'int range': ['age', '<', 30],
+        'string equality': ['name', '=', 'name42'],
+        'string range': ['name', '<', 'Name2'],
+        'AND of both': [['age', '>', 50], 'AND', ['name', '>', 'Name5']],
+        'OR of both': [['age', '=', 7], 'OR', ['name', '<', 'Name11']],
+    }
+
+    # the first scan builds the column arrays
+    start = time.perf_counter()
+    Planner(table, vector=scanner).plan(conditions['AND of both']).execute()
+    print(f'first scan (build columns): {(time.perf_counter() - start) * 1000:.1f} ms')
+    print(f'{"":<40} {"rows":>13} {"vectorised":>13} {"speedup":>9}')
+
+    for title, conds in conditions.items():
+        serial_time, serial = measure(Planner(table).plan(conds).execute)
+        vector_time, vector = measure(Planner(table, vector=scanner).plan(conds).execute)
+        assert serial == vector
+        report(title, serial_time, vector_time)
+
+    # inserted rows are appended to the columns by the next scan
+    table['data'].extend([i, f'Name{i}', i % 100] for i in range(rows, rows + 1000))
+    fold_rows(table)
+    conds = conditions['AND of both']
+    assert Planner(table).plan(conds).execute() == Planner(table, vector=scanner).plan(conds).execute()
+
+
+# TreeNode before it got __slots__, kept as the baseline of the memory benchmark
+class _DictTreeNode:
+    def __init__(self, key, data):
+        self.key = key
+        self.data = data
+        self.left = None
+        self.right = None
+        self.height = 1
+
+
+def _traced(build):
+    """ Return bytes allocated by build() that are still held by its result, and the result """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0], result
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(rows: int):
+    rows = max(rows, 1000000)
+    names = [f'Name{i}' for i in range(10000)]
+    foods = ['Sausages', 'Fish', 'Milk', 'Chicken', 'Cheese']
+
+    path = os.path.join(tempfile.mkdtemp(prefix='florian-bench-'), 'memory.flodb')
+    write_database(path, {'cats': {
+        'col_names': ['id', 'name', 'favourite_food', 'age'],
+        'data_types': [int, str, str, int],
+        'data': [(i, random.choice(names), random.choice(foods), random.randrange(20)) for i in range(rows)],
+        'id': AVLTree()
+    }})
+    print(f'Memory of a loaded table, {rows} rows of 4 columns, id indexed')
+
+    def load_lists():
+        # rows as lists with a string object for every value and index nodes with __dict__, like before
+        db = LazyDatabase(path)
+        entry = db.pending_entry('cats')
+        columns = [decode_column(db.segment(column), column['encoding'], rows) for column in entry['columns']]
+        table = {'col_names': entry['col_names'], 'data_types': [int, str, str, int],
+                 'data': list(map(list, zip(*columns)))}
+        fold_rows(table)
+
+        avl_module = sys.modules[AVLTree.__module__]
+        avl_module.TreeNode = _DictTreeNode
+        try:
+            table['id'] = build_index(table, 'id')
+        finally:
+            avl_module.TreeNode = TreeNode
+
+        db.close()
+        return table
+
+    def load_tuples():
+        db = LazyDatabase(path)
+        table = db['cats']
+        db.close()
+        return table
+
+    try:
+        before, table = _traced(load_lists)
+        del table
+        after, table = _traced(load_tuples)
+        assert isinstance(table['data'][0], tuple)
+    finally:
+        shutil.rmtree(os.path.dirname(path))
+
+    print(f'{"":<40} {"lists":>13} {"tuples":>13} {"saving":>9}')
+    print(f'{"bytes per row":<40} {before / rows:>13.1f} {after / rows:>13.1f} {before / after:>8.1f}x')
+
+
+def bench_cache(rows: int):
+    queries = [
+        [['age', '>', 90], 'AND', ['name', '<', 'Name2']],
+        [['age', '=', 7], 'OR', ['name', '=', 'Name42']],
+        ['id', '<', rows // 10],
+    ]
+    print(f'Result cache, {rows} rows, {len(queries)} queries repeated 20 times')
+    print(f'{"":<40} {"no cache":>13} {"cache":>13} {"speedup":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = FlorianDB(wal_sync_every=0)
+        db.load(os.path.join(directory, 'cache'), create=True)
+        db.create_table('people', ['id', 'name', 'age'], ['id'])
+        db.insert_many('people', ([i, f'Name{random.randrange(rows)}', random.randrange(100)] for i in range(rows)))
+
+        def dashboard(inserts: bool):
+            def run():
+                results = []
+                for i in range(20):
+                    # an insert between refreshes invalidates the results of the table
+                    if inserts and i % 5 == 0:
+                        db.insert('people', [rows + i, f'Name{i}', i])
+                    results.extend(len(list(db.select('people', conds)[1])) for conds in queries)
+                return results
+            return run
+
+        try:
+            for title, inserts in [('only selects', False), ('insert every 5 refreshes', True)]:
+                db.set_option('CACHE_SIZE', 0)
+                off_time, off = measure(dashboard(inserts), repeat=1)
+                db.set_option('CACHE_SIZE', 128)
+                on_time, on = measure(dashboard(inserts), repeat=1)
+                # inserted rows change the results of the second run
+                assert off == on or inserts
+                report(title, off_time, on_time)
+
+            stats = db.cache_stats()
+            print(f'hits {stats["hits"]}, misses {stats["misses"]}, invalidations {stats["invalidations"]}')
+        finally:
+            db.close(save=False)
+
+
+def bench_create_index(rows: int):
+    print(f'CREATE INDEX on a loaded table, {rows} rows')
+    print(f'{"":<40} {"re-insert":>13} {"bulk":>13} {"speedup":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = FlorianDB(wal_sync_every=0)
+        db.load(os.path.join(directory, 'index'), create=True)
+        db.create_table('people', ['id', 'name', 'age'], [])
+        db.insert_many('people', ([i, f'Name{random.randrange(rows)}', random.randrange(100)] for i in range(rows)))
+        data = list(db.table('people')['data'])
+
+        try:
+            for column, index_type in [('id', 'AVL'), ('name', 'BTREE'), ('name', 'HASH')]:
+                # before CREATE INDEX the table had to be created again with the index and filled row by row
+                def recreate():
+                    copy = f'copy_{column}_{index_type}'
+                    db.create_table(copy, ['id', 'name', 'age'], [column], {column: index_type})
+                    for row in data:
+                        db.insert(copy, row)
+                recreate_time, _ = measure(recreate, repeat=1)
+
+                def create_index():
+                    db.create_index('people', column, index_type)
+                    db.wait_for_indexes()
+                    db.drop_index('people', column)
+                build_time, _ = measure(create_index, repeat=1)
+                report(f'{index_type} index on {column}', recreate_time, build_time)
+
+            # selects keep running (as table scans) while the index is built
+            selects = 0
+            db.create_index('people', 'name', 'BTREE')
+            while ('people', 'name') in db._index_builds:
+                consume(db.select('people', ['name', '=', f'name{selects}'])[1], None)
+                selects += 1
+            print(f'selects answered during the build of the BTREE index: {selects}')
+        finally:
+            db.close(save=False)
+
+
+def bench_composite(rows: int):
+    data = [(i, f'City{random.randrange(50)}', random.randrange(100)) for i in range(rows)]
+    single = {'col_names': ['id', 'city', 'age'], 'data_types': [int, str, int], 'data': data}
+    fold_rows(single)
+    composite = dict(single)
+
+    for index_type in ('AVL', 'BTREE'):
+        single['city'] = build_index(single, 'city', index_type)
+        composite['city,age'] = build_index(composite, 'city,age', index_type)
+
+        print(f'Composite {index_type} index on (city, age), {rows} rows')
+        print(f'{"":<40} {"city index":>13} {"composite":>13} {"speedup":>9}')
+
+        conditions = {
+            'equality and range': [['city', '=', 'city7'], 'AND', ['age', '>', 90]],
+            'equality of both columns': [['city', '=', 'city7'], 'AND', ['age', '=', 42]],
+            'range below': [['age', '<', 5], 'AND', ['city', '=', 'city13']],
+        }
+
+        for title, conds in conditions.items():
+            # the single-column index is looked up and the rows are filtered by age
+            single_plan = Planner(single).plan(conds)
+            composite_plan = Planner(composite).plan(conds)
+
+            single_time, single_rows = measure(single_plan.execute)
+            composite_time, composite_rows = measure(composite_plan.execute)
+            assert sorted(single_rows) == sorted(composite_rows)
+            report(title, single_time, composite_time)
+        print()
+
+
+def bench_projection(rows: int):
+    print(f'SELECT of a column list, {rows} rows, csv output')
+    print(f'{"":<40} {"all columns":>13} {"projected":>13} {"speedup":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = FlorianDB(wal_sync_every=0)
+        db.load(os.path.join(directory, 'projection'), create=True)
+        db.create_table('people', ['id', 'name', 'city', 'age', 'grp'], ['id', 'grp,age'], {'grp,age': 'BTREE'})
+        db.insert_many('people', ([i, f'Name{random.randrange(rows)}', f'City{random.randrange(50)}',
+                                   random.randrange(100), random.randrange(20)] for i in range(rows)))
+        # every select is evaluated, not taken from the result cache
+        db.set_option('CACHE_SIZE', 0)
+
+        queries = {
+            'index only: id range': (['id'], ['id', '>', rows // 2]),
+            'index only: composite': (['age'], [['grp', '=', 7], 'AND', ['age', '>', 50]]),
+            'projection: name by id range': (['name'], ['id', '>', rows // 2]),
+            'projection: table scan': (['id', 'age'], ['city', '=', 'City7']),
+        }
+
+        try:
+            for title, (columns, conds) in queries.items():
+                def run(selected):
+                    out = io.StringIO()
+                    write_rows(*db.select('people', conds, columns=selected), fmt='csv', out=out)
+                    return out.tell()
+
+                all_time, all_bytes = measure(run, None)
+                projected_time, projected_bytes = measure(run, columns)
+                report(title, all_time, projected_time)
+                print(f'{"":<40} {all_bytes:>11} B {projected_bytes:>11} B')
+
+            print('\n'.join(db.explain('people', queries['index only: composite'][1], ['age'])))
+        finally:
+            db.close(save=False)
+
+
+def bench_aggregate(rows: int):
+    print(f'Aggregates, {rows} rows')
+    print(f'{"":<40} {"rows":>13} {"aggregate":>13} {"speedup":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = FlorianDB(wal_sync_every=0)
+        db.load(os.path.join(directory, 'aggregate'), create=True)
+        db.create_table('people', ['id', 'city', 'age'], ['id', 'age'], {'age': 'BTREE'})
+        db.insert_many('people', ([i, f'City{random.randrange(50)}', random.randrange(100)] for i in range(rows)))
+        db.set_option('CACHE_SIZE', 0)
+
+        # before aggregates the rows were selected, written out and aggregated by the client
+        def by_rows(conds, aggregate):
+            def run():
+                col_names, selected = db.select('people', conds)
+                selected = list(selected)
+                write_rows(col_names, selected, fmt='csv', out=io.StringIO())
+                return aggregate(selected)
+            return run
+
+        def sum_by_city(selected):
+            sums = {}
+            for _, city, age in selected:
+                sums[city.lower()] = sums.get(city.lower(), 0) + age
+            return sorted(sums.values())
+
+        cases = {
+            'COUNT(*), id range': (['id', '>', rows // 2], [['COUNT', '*']], [], lambda selected: (len(selected),)),
+            'COUNT(*), AVG(age), age range': (
+                ['age', '>', 50], [['COUNT', '*'], ['AVG', 'age']], [],
+                lambda selected: (len(selected), sum(row[2] for row in selected) / len(selected))),
+            'MIN(id), MAX(id)': ([], [['MIN', 'id'], ['MAX', 'id']], [],
+                                 lambda selected: (min(row[0] for row in selected), max(row[0] for row in selected))),
+            'COUNT(*), table scan': (['city', '=', 'City7'], [['COUNT', '*']], [], lambda selected: (len(selected),)),
+            'SUM(age) GROUP BY city': ([], ['city', ['SUM', 'age']], ['city'], sum_by_city),
+        }
+
+        try:
+            for title, (conds, columns, group_by, aggregate) in cases.items():
+                rows_time, expected = measure(by_rows(conds, aggregate))
+                aggregate_time, result = measure(lambda: list(db.select('people', conds, columns=columns,
+                                                                        group_by=group_by)[1]))
+
+                assert (sorted(row[-1] for row in result) if group_by else result[0]) == expected
+                report(title, rows_time, aggregate_time)
+
+            print('\n'.join(db.explain('people', ['age', '>', 50], [['COUNT', '*'], ['AVG', 'age']])))
+        finally:
+            db.close(save=False)
+
+
+def bench_order(rows: int):
+    print(f'ORDER BY, {rows} rows')
+    print(f'{"":<40} {"sorted":>13} {"ORDER BY":>13} {"speedup":>9}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = FlorianDB(wal_sync_every=0)
+        db.load(os.path.join(directory, 'order'), create=True)
+        db.create_table('people', ['id', 'city', 'age'], ['id', 'age'], {'age': 'BTREE'})
+        db.insert_many('people', ([i, f'City{random.randrange(50)}', random.randrange(100)] for i in range(rows)))
+        db.set_option('CACHE_SIZE', 0)
+
+        # before ORDER BY the client selected all matching rows and sorted them
+        def by_client(conds, col_id, descending, limit):
+            def run():
+                key = (lambda row: row[col_id].lower()) if col_id == 1 else itemgetter(col_id)
+                selected = sorted(db.select('people', conds)[1], key=key, reverse=descending)
+                return selected[:limit] if limit is not None else selected
+            return run
+
+        cases = {
+            'age DESC LIMIT 10, index order': ([], 'age', True, 10),
+            'age LIMIT 10 WHERE city, index order': (['city', '=', 'City7'], 'age', False, 10),
+            'city LIMIT 10, top-K heap': ([], 'city', False, 10),
+            'city DESC LIMIT 100, top-K heap': (['id', '>', rows // 2], 'city', True, 100),
+            'city, in memory sort': ([], 'city', False, None),
+            'city, external sort': ([], 'city', False, None),
+        }
+
+        try:
+            for title, (conds, column, descending, limit) in cases.items():
+                db.set_option('SORT_MEMORY', 64 * 1024 if 'external' in title else SORT_MEMORY)
+
+                sorted_time, expected = measure(by_client(conds, ['id', 'city', 'age'].index(column), descending, limit))
+                order_time, result = measure(lambda: list(db.select('people', conds, limit, order_by=column,
+                                                                    descending=descending)[1]))
+
+                assert result == expected
+                report(title, sorted_time, order_time)
+
+            print('\n'.join(db.explain('people', ['city', '=', 'City7'], order_by='age', limit=10)))
+        finally:
+            db.close(save=False)
+
+
+BENCHMARKS = {
+    'avl': bench_avl,
+    'btree': bench_btree,
+    'lexer': bench_lexer,
+    'prepared': bench_prepared,
+    'server': bench_server,
+    'stress': bench_stress,
+    'parallel': bench_parallel,
+    'folded': bench_folded,
+    'memory': bench_memory,
+    'cache': bench_cache,
+    'create_index': bench_create_index,
+    'composite': bench_composite,
+    'projection': bench_projection,
+    'aggregate': bench_aggregate,
+    'order': bench_order,
+    'vector': bench_vector,
+}
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Toy SQL Engine benchmarks')
+    arg_parser.add_argument('names', nargs='*', metavar='NAME',
+                            help=f'benchmarks to run: {", ".join(BENCHMARKS)}, all by default')
+    arg_parser.add_argument('--rows', type=int, default=100000, help='number of rows in generated tables')
+    args = arg_parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        arg_parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+
+    sys.setrecursionlimit(10000)
+    random.seed(0)
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name](args.rows)
+        print()
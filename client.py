@@ -0,0 +1,109 @@
+import socket
+from itertools import islice
+
+import errors
+from protocol import DEFAULT_PORT, FRAME_HEADER, decode_payload, encode_frame, payload_length
+
+
+class Client:
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, timeout: float = None):
+        """
+        Client of the database server
+
+            with Client(port=7433) as client:
+                for row in client.execute('SELECT FROM cats WHERE name = ?', ('Murzik',)):
+                    ...
+
+        Statements run one at a time: executing the next statement reads the rest of the previous result.
+        Errors of the server are raised as the same classes of module errors.
+        """
+
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile('rb')
+        self._result = None
+
+    def execute(self, sql: str, params=()) -> 'Result':
+        if self._result is not None:
+            self._result.fetchall()
+
+        self._socket.sendall(encode_frame({'sql': sql, 'params': list(params)}))
+        self._result = Result(self)
+        return self._result
+
+    def read_frame(self) -> dict:
+        header = self._file.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            raise errors.OperationalError('Error: Connection has been closed by the server.')
+
+        length = payload_length(header)
+        payload = self._file.read(length)
+        if len(payload) < length:
+            raise errors.OperationalError('Error: Connection has been closed by the server.')
+
+        message = decode_payload(payload)
+        if 'error' in message:
+            error_type = getattr(errors, message.get('type', ''), errors.Error)
+            if not (isinstance(error_type, type) and issubclass(error_type, errors.Error)):
+                error_type = errors.Error
+            raise error_type(message['error'])
+
+        return message
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Result:
+    def __init__(self, client: Client):
+        """ Result of one statement, rows are received in chunks while it is read """
+
+        self._client = client
+        self.columns = None
+        self.rowcount = -1
+        self._done = False
+        self._chunk = iter(())
+
+        message = client.read_frame()
+        if 'columns' in message:
+            self.columns = message['columns']
+        else:
+            self._finish(message)
+
+    def _finish(self, message: dict):
+        self.rowcount = message['rowcount']
+        self._done = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> tuple:
+        while True:
+            row = next(self._chunk, None)
+            if row is not None:
+                return tuple(row)
+
+            if self._done:
+                raise StopIteration
+
+            message = self._client.read_frame()
+            if 'rows' in message:
+                self._chunk = iter(message['rows'])
+            else:
+                self._finish(message)
+
+    def fetchone(self):
+        return next(self, None)
+
+    def fetchmany(self, size: int = 100) -> list:
+        return list(islice(self, size))
+
+    def fetchall(self) -> list:
+        return list(self)
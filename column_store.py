@@ -0,0 +1,210 @@
+import threading
+from functools import reduce
+from operator import and_, or_
+
+# NumPy is optional, without it SET VECTORISED is refused
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from indexes import fold
+from parallel import _columns
+from planner import And, Or
+
+# Tables with fewer rows are scanned row by row, building the arrays isn't worth it
+VECTOR_THRESHOLD = 10000
+
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class _Column:
+    def __init__(self, dtype):
+        self.values = np.empty(1024, dtype)
+        self.length = 0
+
+    def _append(self, values: list):
+        end = self.length + len(values)
+
+        # capacity is doubled, so appending a row at a time stays amortised O(1)
+        if end > len(self.values):
+            grown = np.empty(max(end, 2 * len(self.values)), self.values.dtype)
+            grown[:self.length] = self.values[:self.length]
+            self.values = grown
+
+        self.values[self.length:end] = values
+        self.length = end
+
+
+class IntColumn(_Column):
+    def __init__(self):
+        super().__init__(np.int64)
+
+    def append(self, values: list):
+        self._append(values)
+
+    def compare(self, op: str, value: int):
+        values = self.values[:self.length]
+
+        # a value out of the int64 range is smaller or bigger than every value of the column
+        if not _INT64_MIN <= value <= _INT64_MAX:
+            return np.full(self.length, op == ('<' if value > 0 else '>'))
+
+        if op == '=':
+            return values == value
+        if op == '<':
+            return values < value
+        return values > value
+
+
+class StrColumn(_Column):
+    def __init__(self):
+        """ Dictionary-encoded strings: codes of the rows and the dictionary of distinct case-folded values """
+
+        super().__init__(np.int32)
+        self.dictionary = []
+        self.codes = {}
+        self._array = None
+
+    def append(self, values: list):
+        """ Append folded values of rows """
+
+        codes = self.codes
+        dictionary = self.dictionary
+
+        encoded = []
+        for value in values:
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(dictionary)
+                dictionary.append(value)
+            encoded.append(code)
+
+        self._append(encoded)
+
+    def compare(self, op: str, value: str):
+        codes = self.values[:self.length]
+
+        if op == '=':
+            code = self.codes.get(value)
+            return codes == code if code is not None else np.zeros(self.length, bool)
+
+        # the dictionary is compared once, then every row takes the result of its code
+        if self._array is None or len(self._array) != len(self.dictionary):
+            self._array = np.array(self.dictionary, dtype=object)
+
+        matches = self._array < value if op == '<' else self._array > value
+        return matches.astype(bool)[codes]
+
+
+class ColumnStore:
+    def __init__(self, table: dict):
+        """
+        Columnar copy of the rows of the table: an int64 array for every int column and
+        a dictionary-encoded array for every str column
+
+        The store follows table['data']: rows are append-only, so sync() only appends the rows
+        inserted since the previous sync. Columns of integers that don't fit into int64 are not stored.
+        """
+
+        self.data = table['data']
+        self.folded = table.get('folded', {})
+        self.columns = [None] * len(table['col_names'])
+        self.length = 0
+        self._lock = threading.Lock()
+
+        for col_id, ctype in enumerate(table['data_types']):
+            if ctype is int:
+                self.columns[col_id] = IntColumn()
+            elif ctype is str:
+                self.columns[col_id] = StrColumn()
+
+    def sync(self):
+        with self._lock:
+            if self.length == len(self.data):
+                return
+
+            new_rows = self.data[self.length:]
+            for col_id, column in enumerate(self.columns):
+                if column is None:
+                    continue
+
+                try:
+                    if isinstance(column, StrColumn):
+                        folded = self.folded.get(col_id)
+                        column.append(folded[self.length:len(self.data)] if folded is not None else
+                                      [fold(row[col_id]) for row in new_rows])
+                    else:
+                        column.append([row[col_id] for row in new_rows])
+                except OverflowError:
+                    self.columns[col_id] = None
+
+            self.length += len(new_rows)
+
+    def mask(self, condition):
+        """ Boolean array of the rows that match the condition """
+
+        if isinstance(condition, And):
+            return reduce(and_, map(self.mask, condition.children))
+        if isinstance(condition, Or):
+            return reduce(or_, map(self.mask, condition.children))
+
+        return self.columns[condition.col_id].compare(condition.op, condition.value)
+
+    def supports(self, condition) -> bool:
+        if isinstance(condition, (And, Or)):
+            return all(map(self.supports, condition.children))
+        return self.columns[condition.col_id] is not None
+
+
+class VectorScanner:
+    label = 'Vectorised table scan'
+
+    def __init__(self, threshold: int = VECTOR_THRESHOLD):
+        """
+        Evaluate conditions of full table scans on NumPy column stores
+
+        Predicates are compared as whole arrays and AND / OR are & / | of the boolean masks.
+        Stores are built on the first scan of a table and kept up to date by the following scans.
+        """
+
+        if np is None:
+            raise ImportError('NumPy is required for vectorised scans')
+
+        self.threshold = threshold
+        # id of the data list of a table -> its ColumnStore, which keeps the list alive
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def store(self, table: dict) -> ColumnStore:
+        with self._lock:
+            store = self._stores.get(id(table['data']))
+            if store is None:
+                store = self._stores[id(table['data'])] = ColumnStore(table)
+
+        store.sync()
+        return store
+
+    def supports(self, table: dict, condition) -> bool:
+        """ Whether all columns of the condition can be stored, a missing store isn't built to find out """
+
+        store = self._stores.get(id(table['data']))
+        if store is not None:
+            return store.supports(condition)
+
+        data_types = table['data_types']
+        return bool(data_types) and all(data_types[col_id] in (int, str) for col_id in _columns(condition))
+
+    def scan(self, table: dict, condition) -> list:
+        """ Return the sorted list of ids of the rows that match the condition """
+
+        return np.flatnonzero(self.store(table).mask(condition)).tolist()
+
+    def clear(self):
+        """ Drop the stores of all tables, so tables that are no longer used aren't kept alive """
+
+        with self._lock:
+            self._stores.clear()
+
+    def close(self):
+        self._stores.clear()
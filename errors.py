@@ -0,0 +1,31 @@
+# Exceptions of the database, the names follow Python DB-API (PEP 249).
+# Messages are the ones the interactive shell prints, so it just prints str(error).
+
+
+class Error(Exception):
+    pass
+
+
+# Invalid syntax, unknown table, column or prepared statement, wrong number of parameters
+class ProgrammingError(Error):
+    pass
+
+
+# Values that don't match columns of the table
+class DataError(Error):
+    pass
+
+
+# Table that already exists
+class IntegrityError(Error):
+    pass
+
+
+# Database or csv files that can't be read or written
+class OperationalError(Error):
+    pass
+
+
+# Unexpected failure of the database itself, e.g. a statement the server couldn't run
+class InternalError(Error):
+    pass
@@ -0,0 +1,140 @@
+from itertools import groupby
+from operator import itemgetter
+
+from AVLTree import AVLTree
+from BPlusTree import BPlusTree
+from HashIndex import HashIndex
+from additional_functions import index_key
+
+# Index types that can be declared in CREATE: INDEXED [AVL | BTREE | HASH]
+INDEX_TYPES = {
+    'AVL': AVLTree,
+    'BTREE': BPlusTree,
+    'HASH': HashIndex
+}
+
+# Keys of a table dict that are not indexes
+TABLE_KEYS = ('col_names', 'data_types', 'data', 'stats', 'folded')
+
+# A composite index is stored under the names of its columns joined by COMPOSITE_SEPARATOR, e.g. 'a,b'
+COMPOSITE_SEPARATOR = ','
+
+
+def indexed_columns(table: dict) -> list:
+    return [key for key in table if key not in TABLE_KEYS]
+
+
+def index_name(columns: list) -> str:
+    return COMPOSITE_SEPARATOR.join(columns)
+
+
+def index_columns(in_col: str) -> list:
+    """ Names of the columns of the index, one for a single-column index """
+
+    return in_col.split(COMPOSITE_SEPARATOR)
+
+
+def index_label(in_col: str) -> str:
+    """ Name of the index for messages: the column or (a, b) for a composite index """
+
+    columns = index_columns(in_col)
+    return columns[0] if len(columns) == 1 else f'({", ".join(columns)})'
+
+
+def index_type_name(index) -> str:
+    return next(name for name, index_type in INDEX_TYPES.items() if isinstance(index, index_type))
+
+
+def fold(value: str) -> str:
+    """ Lowercase value, a value that is lowercase already is returned itself, so its folded copy costs nothing """
+
+    folded = value.lower()
+    return value if folded == value else folded
+
+
+def fold_rows(table: dict):
+    """
+    Append rows of data that aren't folded yet to table['folded']
+
+    table['folded'] keeps a lowercase copy of every str column by column id, so scans and indexes compare
+    strings case-insensitively without calling lower() on every row.
+    """
+
+    folded = table.setdefault('folded', {})
+    data = table['data']
+
+    for column_index, ctype in enumerate(table['data_types']):
+        if ctype is str:
+            column = folded.setdefault(column_index, [])
+
+            # rows with equal values share one folded string
+            folds = {}
+            column.extend([folds[value] if value in folds else folds.setdefault(value, fold(value))
+                           for value in map(itemgetter(column_index), data[len(column):])])
+
+
+def column_keys(table: dict, column_index: int, end: int = None, start: int = 0) -> list:
+    """ Index keys of the column for rows from start to end (all rows by default) """
+
+    data = table['data']
+    folded = table.get('folded', {}).get(column_index)
+
+    if end is None:
+        if folded is not None and len(folded) == len(data):
+            return folded if not start else folded[start:]
+        return [index_key(row[column_index]) for row in data[start:]]
+
+    # rows may be appended meanwhile, so the rows up to end are copied
+    if folded is not None and len(folded) >= end:
+        return folded[start:end]
+    return [index_key(row[column_index]) for row in data[start:end]]
+
+
+def row_key(table: dict, column_index: int, row_id: int):
+    """ Index key of the column of the row """
+
+    folded = table.get('folded', {}).get(column_index)
+    if folded is not None and row_id < len(folded):
+        return folded[row_id]
+    return index_key(table['data'][row_id][column_index])
+
+
+def index_keys(table: dict, in_col: str, end: int = None, start: int = 0) -> list:
+    """ Keys of the index for rows from start to end (all rows by default), keys of a composite index are tuples """
+
+    column_ids = [table['col_names'].index(column) for column in index_columns(in_col)]
+    if len(column_ids) == 1:
+        return column_keys(table, column_ids[0], end, start)
+    return list(zip(*(column_keys(table, column_index, end, start) for column_index in column_ids)))
+
+
+def index_row_key(table: dict, in_col: str, row_id: int):
+    """ Key of the row in the index """
+
+    column_ids = [table['col_names'].index(column) for column in index_columns(in_col)]
+    if len(column_ids) == 1:
+        return row_key(table, column_ids[0], row_id)
+    return tuple(row_key(table, column_index, row_id) for column_index in column_ids)
+
+
+def build_index(table: dict, in_col: str, index_type: str = 'AVL', end: int = None):
+    """
+    Sort rows by the key of the index and build a balanced index of the given type bottom-up, indexes store row ids
+
+    in_col: name of the indexed column or names of the columns of a composite index, see index_name
+    end: only the first end rows are indexed, used to build an index while rows are inserted
+    """
+
+    keys = index_keys(table, in_col, end)
+
+    # hash index doesn't need sorted keys
+    if not INDEX_TYPES[index_type].supports_range:
+        index = INDEX_TYPES[index_type]()
+        for row_id, key in enumerate(keys):
+            index.insert_or_update_node(key, row_id)
+        return index
+
+    # sorting is stable, so ids of every key stay in ascending order
+    keyed = sorted(zip(keys, range(len(keys))), key=itemgetter(0))
+    pairs = [(key, [row_id for _, row_id in group]) for key, group in groupby(keyed, key=itemgetter(0))]
+    return INDEX_TYPES[index_type].from_sorted(pairs)
@@ -1,11 +1,10 @@
 import re
-from additional_functions import consume
 
 PROCESS_AS_KEYWORD = object()
 
 # Define token types
-WHITESPACE, KEYWORD, IDENTIFIER, QUOTES, NUMBER, OPERATOR, PUNCTUATION, PARENTHESES = (
-    'WHITESPACE', 'KEYWORD', 'IDENTIFIER', 'QUOTES', 'NUMBER', 'OPERATOR', 'PUNCTUATION', 'PARENTHESES'
+WHITESPACE, KEYWORD, IDENTIFIER, QUOTES, NUMBER, OPERATOR, PUNCTUATION, PARENTHESES, PLACEHOLDER = (
+    'WHITESPACE', 'KEYWORD', 'IDENTIFIER', 'QUOTES', 'NUMBER', 'OPERATOR', 'PUNCTUATION', 'PARENTHESES', 'PLACEHOLDER'
 )
 
 # Define regular expressions for SQL tokens
@@ -17,14 +16,25 @@ SQL_REGEX = [
     (r'"(""|\\"|[^"])*"', QUOTES),                        # sql_string_double_quotes
     (r'-?[\d][\d.]*', NUMBER),                            # sql_number_literal
     (r'[=<>]', OPERATOR),                                 # sql_operators
-    (r'[.,;]', PUNCTUATION),                              # sql_punctuation
-    (r'[()]', PARENTHESES)                                # sql_parentheses
+    (r'[.,;*]', PUNCTUATION),                             # sql_punctuation
+    (r'[()]', PARENTHESES),                               # sql_parentheses
+    (r'\?', PLACEHOLDER)                                  # sql_parameter_placeholder
 ]
 
 KEYWORDS = ['CREATE', 'INSERT', 'INTO', 'VALUES', 'SELECT', 'FROM', 'WHERE', 'OR', 'AND']
 
+# All token regexes joined into one alternation compiled once, every alternative is a named group _<position>.
+# Alternatives are tried in the order of SQL_REGEX, so the first matching one wins like before.
+MASTER_REGEX = re.compile(
+    '|'.join(f'(?P<_{i}>{rx.replace("(?i)", "")})' for i, (rx, _) in enumerate(SQL_REGEX)),
+    re.IGNORECASE | re.UNICODE
+)
+GROUP_TYPES = {f'_{i}': tt for i, (_, tt) in enumerate(SQL_REGEX)}
+
 
 class Token:
+    __slots__ = ('value', 'ttype')
+
     def __init__(self, value, ttype):
         self.value = value
         self.ttype = ttype
@@ -32,12 +42,7 @@ class Token:
 
 class Lexer:
     def __init__(self, sql):
-        self._SQL_REGEX = [
-            (re.compile(rx, re.IGNORECASE | re.UNICODE).match, tt)
-            for rx, tt in SQL_REGEX
-        ]
-
-        self._keywords = KEYWORDS
+        self._keywords = frozenset(KEYWORDS)
 
         self.tokens = self.get_tokens(sql)
         self._current_token = Token(None, None)
@@ -60,24 +65,21 @@ class Lexer:
         else:
             return value, IDENTIFIER
 
-    # Tokenize SQL input
+    # Tokenize SQL input in one pass, characters that no regex matches are skipped
     def get_tokens(self, sql: str):
-        iterator = enumerate(sql)
-        for pos, char in iterator:
-            for rematch, tt in self._SQL_REGEX:
-                match = rematch(sql, pos)
-
-                if not match:
-                    continue
-                elif tt is PROCESS_AS_KEYWORD:
-                    tvalue, ttype = self.is_keyword(match.group())
-                    yield Token(tvalue, ttype)
-                elif tt is NUMBER:
-                    yield Token(int(match.group()), tt)
-                elif tt is QUOTES:
-                    yield Token(match.group()[1:-1], tt)
-                else:
-                    yield Token(match.group(), tt)
-
-                consume(iterator, match.end() - pos - 1)
-                break
+        group_types = GROUP_TYPES
+
+        for match in MASTER_REGEX.finditer(sql):
+            tt = group_types[match.lastgroup]
+
+            if tt is WHITESPACE:
+                continue
+            elif tt is PROCESS_AS_KEYWORD:
+                tvalue, ttype = self.is_keyword(match.group())
+                yield Token(tvalue, ttype)
+            elif tt is NUMBER:
+                yield Token(int(match.group()), tt)
+            elif tt is QUOTES:
+                yield Token(match.group()[1:-1], tt)
+            else:
+                yield Token(match.group(), tt)
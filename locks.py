@@ -0,0 +1,65 @@
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    def __init__(self):
+        """
+        Many readers or one writer at a time
+
+        Waiting writers go first: new readers wait for them, so a stream of reads can't starve writes.
+        Both modes are reentrant and the writer may also take the lock for reading, but a reader
+        can't upgrade to writing.
+        """
+
+        self._condition = threading.Condition()
+        # number of nested reads of every reading thread
+        self._readers = {}
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def reading(self):
+        me = threading.get_ident()
+
+        with self._condition:
+            # a thread that already holds the lock must not wait for writers queued after it
+            if self._writer != me and me not in self._readers:
+                self._condition.wait_for(lambda: self._writer is None and not self._waiting_writers)
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers[me] -= 1
+                if not self._readers[me]:
+                    del self._readers[me]
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        me = threading.get_ident()
+
+        with self._condition:
+            if self._writer != me:
+                if me in self._readers:
+                    raise RuntimeError('lock held for reading can\'t be taken for writing')
+
+                self._waiting_writers += 1
+                try:
+                    self._condition.wait_for(lambda: self._writer is None and not self._readers)
+                finally:
+                    self._waiting_writers -= 1
+                self._writer = me
+            self._writer_depth += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._condition.notify_all()
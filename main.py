@@ -1,6 +1,9 @@
-from FlorianDB import Interpreter, FlorianDB
-from lexer import Lexer
-from SQLparser import Parser
+import argparse
+
+from FlorianDB import FlorianDB
+from storage import migrate
+from protocol import DEFAULT_PORT
+from statements import execute
 
 
 def main():
@@ -23,11 +26,40 @@ def main():
             packed_input.append(raw_input)
 
         packed_input = ' '.join(packed_input).strip()
-        lexer = Lexer(packed_input)
-        parser = Parser(lexer)
-        Interpreter(db, parser).interpret()
+        execute(db, packed_input)
+
+
+def migrate_files(filenames):
+    for filename in filenames:
+        if not filename.endswith('.flodb'):
+            filename += '.flodb'
+
+        try:
+            if migrate(filename):
+                print(f'{filename} has been converted to the columnar format.')
+            else:
+                print(f'{filename} is already in the columnar format.')
+        except (OSError, ValueError) as e:
+            print(f'Error: Failed to convert {filename} - {e}.')
 
 
 if __name__ == '__main__':
-    db = FlorianDB()
-    main()
+    arg_parser = argparse.ArgumentParser(description='Toy SQL Engine')
+    arg_parser.add_argument('--migrate', nargs='+', metavar='FILE',
+                            help='convert database files of the old pickle format to the columnar format and exit')
+    arg_parser.add_argument('--serve', action='store_true', help='serve the database to clients over TCP')
+    arg_parser.add_argument('--db', default='florian', metavar='FILE',
+                            help='database file of the server, created if it doesn\'t exist (default: florian)')
+    arg_parser.add_argument('--host', default='127.0.0.1', help='address of the server (default: 127.0.0.1)')
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'port of the server (default: {DEFAULT_PORT})')
+    arg_parser.add_argument('--workers', type=int, default=4, help='threads that run statements of the server (default: 4)')
+    args = arg_parser.parse_args()
+
+    if args.migrate:
+        migrate_files(args.migrate)
+    elif args.serve:
+        from server import serve
+        serve(args.db, args.host, args.port, args.workers)
+    else:
+        db = FlorianDB()
+        main()
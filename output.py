@@ -0,0 +1,118 @@
+import sys
+import csv
+import json
+from itertools import chain, islice
+
+from tabulate import tabulate
+
+# Output formats of SELECT results, chosen with SET OUTPUT <format>
+#   grid:   a result of up to CHUNK_SIZE rows formatted by tabulate at once, a bigger one is written like stream
+#   stream: grid written in chunks as rows are produced, column widths are measured on the first chunk
+#   csv, tsv, json: one line per row without measuring widths, json writes JSON lines
+OUTPUT_FORMATS = ('grid', 'stream', 'csv', 'tsv', 'json')
+
+# Number of rows formatted and written at once by streaming formats
+CHUNK_SIZE = 1000
+
+
+def write_rows(col_names: list, rows, fmt: str = 'grid', out=None, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Write rows in the output format
+
+    rows: iterable of rows, streaming formats consume it chunk by chunk
+
+    :return: Number of written rows
+    """
+
+    out = out or sys.stdout
+
+    rows = iter(rows)
+
+    if fmt == 'grid':
+        data = list(islice(rows, chunk_size + 1))
+        if len(data) <= chunk_size:
+            # Using tabulate for table formatting and output
+            print(tabulate([col_names] + data, headers='firstrow', tablefmt='grid'), '\n', file=out)
+            return len(data)
+
+        # a bigger result isn't held in memory, it is written in chunks
+        fmt, rows = 'stream', chain(data, rows)
+
+    writer = {'stream': _GridWriter, 'csv': _CsvWriter, 'tsv': _TsvWriter, 'json': _JsonWriter}[fmt](col_names, out)
+
+    count = 0
+    while chunk := list(islice(rows, chunk_size)):
+        writer.write(chunk)
+        out.flush()
+        count += len(chunk)
+
+    writer.close()
+    out.flush()
+    return count
+
+
+class _GridWriter:
+    def __init__(self, col_names: list, out):
+        self.col_names = col_names
+        self.out = out
+        self.widths = None
+        self.numeric = None
+
+    def _line(self, values) -> str:
+        cells = []
+        for value, width, numeric in zip(values, self.widths, self.numeric):
+            cells.append(f' {str(value):>{width}} ' if numeric else f' {str(value):<{width}} ')
+        return '|' + '|'.join(cells) + '|\n'
+
+    def _border(self, char: str) -> str:
+        return '+' + '+'.join(char * (width + 2) for width in self.widths) + '+\n'
+
+    def write(self, chunk: list):
+        if self.widths is None:
+            # widths of the first chunk are kept, longer values of later chunks just widen their own line
+            self.widths = [max([len(str(name))] + [len(str(row[i])) for row in chunk])
+                           for i, name in enumerate(self.col_names)]
+            self.numeric = [all(isinstance(row[i], int) for row in chunk) for i in range(len(self.col_names))]
+            self.out.write(self._border('-') + self._line(self.col_names) + self._border('='))
+
+        border = self._border('-')
+        self.out.write(''.join(self._line(row) + border for row in chunk))
+
+    def close(self):
+        if self.widths is None:
+            self.widths = [len(str(name)) for name in self.col_names]
+            self.numeric = [False] * len(self.col_names)
+            self.out.write(self._border('-') + self._line(self.col_names) + self._border('='))
+        self.out.write('\n')
+
+
+class _CsvWriter:
+    dialect = 'excel'
+
+    def __init__(self, col_names: list, out):
+        self.out = out
+        self.writer = csv.writer(out, dialect=self.dialect, lineterminator='\n')
+        self.writer.writerow(col_names)
+
+    def write(self, chunk: list):
+        self.writer.writerows(chunk)
+
+    def close(self):
+        pass
+
+
+class _TsvWriter(_CsvWriter):
+    dialect = 'excel-tab'
+
+
+class _JsonWriter:
+    def __init__(self, col_names: list, out):
+        self.col_names = col_names
+        self.out = out
+
+    def write(self, chunk: list):
+        col_names = self.col_names
+        self.out.write(''.join(json.dumps(dict(zip(col_names, row)), ensure_ascii=False) + '\n' for row in chunk))
+
+    def close(self):
+        pass
@@ -0,0 +1,174 @@
+import os
+import mmap
+import marshal
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from array import array
+from itertools import count
+from concurrent.futures import ProcessPoolExecutor
+
+from indexes import fold
+
+# Tables with fewer rows are scanned serially, starting worker processes isn't worth it
+PARALLEL_THRESHOLD = 200000
+
+# Number of rows of a column segment, one segment is scanned by one task
+SEGMENT_ROWS = 65536
+
+
+# Worker side: files of column segments mapped by the worker process
+_mapped = {}
+
+
+def _segment(path: str, offset: int, length: int) -> bytes:
+    mapped = _mapped.get(path)
+
+    # files only grow, a mapping that is too short is replaced
+    if mapped is None or len(mapped) < offset + length:
+        if mapped is not None:
+            mapped.close()
+        with open(path, 'rb') as f:
+            mapped = _mapped[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return mapped[offset:offset + length]
+
+
+def _scan_segment(condition, start: int, columns: dict) -> bytes:
+    """ Return ids of the matching rows of the segment as bytes of array('q') """
+
+    # segments of str columns hold folded values, so the segment is a table whose columns are all folded:
+    # Predicate.filter compares them column by column without lower() and without building rows
+    segment = {'data': (), 'folded': {col_id: marshal.loads(_segment(path, offset, length))
+                                      for col_id, (path, offset, length) in columns.items()}}
+
+    return array('q', [start + row_id for row_id in condition.filter(segment)]).tobytes()
+
+
+def _columns(condition) -> set:
+    """ Ids of the columns the condition uses """
+
+    if hasattr(condition, 'children'):
+        return set().union(*map(_columns, condition.children))
+    return {condition.col_id}
+
+
+class ParallelScanner:
+    def __init__(self, workers: int, threshold: int = PARALLEL_THRESHOLD):
+        """
+        Evaluate conditions of full table scans in a pool of worker processes
+
+        workers: number of worker processes
+        threshold: tables with fewer rows are scanned serially
+
+        Rows aren't pickled for the workers. Columns the condition uses are marshalled into segments of
+        SEGMENT_ROWS values, which are appended to files in a temporary directory, and every worker maps
+        the files. marshal decodes lists of strings several times faster than the format of the database file.
+        str columns are stored as their folded copies, so workers compare them like serial scans do.
+        Tables only grow, so segments are encoded once and later scans only encode the new rows.
+        Every segment is scanned by one task and the ids of the matching rows are merged in the order of the segments.
+
+        clear() drops the segments of all tables, FlorianDB calls it when another database is loaded.
+        """
+
+        self.workers = workers
+        self.threshold = threshold
+
+        self._pool = None
+        self._directory = tempfile.mkdtemp(prefix='florian-scan-')
+        # id of the data list of a table -> its segments
+        self._tables = {}
+        # files are named by a counter, a name is never reused while workers may still map it
+        self._names = count()
+        self._lock = threading.Lock()
+
+    def _table_entry(self, table: dict) -> dict:
+        data = table['data']
+        entry = self._tables.get(id(data))
+
+        if entry is None:
+            # the entry keeps the data list alive, so its id isn't reused by another list
+            entry = self._tables[id(data)] = {'data': data, 'folded': table.get('folded', {}), 'bounds': [],
+                                              'columns': {}, 'name': next(self._names)}
+
+        end = entry['bounds'][-1][1] if entry['bounds'] else 0
+        for start in range(end, len(data), SEGMENT_ROWS):
+            entry['bounds'].append((start, min(start + SEGMENT_ROWS, len(data))))
+
+        return entry
+
+    def _encode(self, entry: dict, col_id: int, ctype: type) -> list:
+        """ Encode segments of the column that aren't encoded yet, return (path, offset, length) of all """
+
+        data, folded = entry['data'], entry['folded'].get(col_id)
+        segments = entry['columns'].setdefault(col_id, [])
+        path = os.path.join(self._directory, f'{entry["name"]}-{col_id}')
+
+        with open(path, 'ab') as f:
+            for start, end in entry['bounds'][len(segments):]:
+                if folded is not None:
+                    values = folded[start:end]
+                elif ctype is str:
+                    values = [fold(data[row_id][col_id]) for row_id in range(start, end)]
+                else:
+                    values = [data[row_id][col_id] for row_id in range(start, end)]
+                segment = marshal.dumps(values)
+                segments.append((path, f.tell(), len(segment)))
+                f.write(segment)
+
+        return segments
+
+    @property
+    def label(self) -> str:
+        return f'Parallel table scan ({self.workers} workers)'
+
+    def supports(self, table: dict, condition) -> bool:
+        return True
+
+    def scan(self, table: dict, condition) -> list:
+        """ Return the sorted list of ids of the rows that match the condition, the table must not change meanwhile """
+
+        col_ids = sorted(_columns(condition))
+
+        with self._lock:
+            entry = self._table_entry(table)
+            columns = {col_id: self._encode(entry, col_id, table['data_types'][col_id]) for col_id in col_ids}
+            bounds = list(entry['bounds'])
+
+            if self._pool is None:
+                # worker processes are spawned, forking a process with running threads isn't safe
+                self._pool = ProcessPoolExecutor(self.workers, multiprocessing.get_context('spawn'))
+
+        futures = [
+            self._pool.submit(_scan_segment, condition, start, {col_id: columns[col_id][i] for col_id in col_ids})
+            for i, (start, end) in enumerate(bounds)
+        ]
+
+        row_ids = array('q')
+        for future in futures:
+            row_ids.frombytes(future.result())
+
+        return row_ids.tolist()
+
+    def clear(self):
+        """ Drop the segments of all tables, so tables that are no longer used aren't kept alive """
+
+        with self._lock:
+            self._tables.clear()
+
+            # workers keep their files mapped, new ones map the files of the next scans
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+            for filename in os.listdir(self._directory):
+                os.remove(os.path.join(self._directory, filename))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+        self._tables.clear()
+        shutil.rmtree(self._directory, ignore_errors=True)
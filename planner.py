@@ -0,0 +1,499 @@
+from functools import reduce
+from itertools import chain, repeat, takewhile
+from operator import eq, lt, gt, itemgetter
+from typing import Union
+
+from errors import ProgrammingError
+from indexes import TABLE_KEYS, index_columns, index_label, index_type_name, indexed_columns
+import table_stats
+
+OPERATORS = {'=': eq, '<': lt, '>': gt}
+
+# Selectivity guesses for predicates without statistics (see ANALYZE) or an index to be estimated with
+EQUAL_SELECTIVITY = 0.1
+RANGE_SELECTIVITY = 1 / 3
+
+# An index isn't worth it if it's expected to return more than this part of the table
+INDEX_THRESHOLD = 0.5
+
+
+class PlanError(ProgrammingError):
+    pass
+
+
+# Conditions: leaves of the WHERE tree and flattened AND / OR nodes
+class Predicate:
+    def __init__(self, column: str, col_id: int, op: str, value: Union[int, str]):
+        self.column = column
+        self.col_id = col_id
+        self.op = op
+        # strings are compared case-insensitively
+        self.value = value.lower() if isinstance(value, str) else value
+
+    def compile(self):
+        """ Return function(row) -> bool """
+
+        col_id, value, compare = self.col_id, self.value, OPERATORS[self.op]
+
+        if isinstance(value, str):
+            return lambda row: compare(row[col_id].lower(), value)
+        return lambda row: compare(row[col_id], value)
+
+    def filter(self, table: dict, row_ids: list = None) -> list:
+        """ Return ids of the rows of the table (or only of row_ids) that match, in their order """
+
+        col_id, value, data = self.col_id, self.value, table['data']
+        folded = table.get('folded', {}).get(col_id)
+
+        # strings are compared with the folded column, a table without it compares lowercase copies of values
+        if isinstance(value, str) and folded is None:
+            matches = self.compile()
+            return [row_id for row_id in (range(len(data)) if row_ids is None else row_ids) if matches(data[row_id])]
+
+        if row_ids is None:
+            pairs = enumerate(folded if folded is not None else map(itemgetter(col_id), data))
+        elif folded is not None:
+            pairs = zip(row_ids, map(folded.__getitem__, row_ids))
+        else:
+            pairs = zip(row_ids, map(itemgetter(col_id), map(data.__getitem__, row_ids)))
+
+        # comparisons are inlined, a call of OPERATORS for every row would cost more than the comparison
+        if self.op == '=':
+            return [row_id for row_id, column_value in pairs if column_value == value]
+        if self.op == '<':
+            return [row_id for row_id, column_value in pairs if column_value < value]
+        return [row_id for row_id, column_value in pairs if column_value > value]
+
+    def __str__(self):
+        value = f'"{self.value}"' if isinstance(self.value, str) else self.value
+        return f'{self.column} {self.op} {value}'
+
+
+class And:
+    def __init__(self, children: list):
+        self.children = children
+
+    def compile(self):
+        return reduce(lambda f, g: lambda row: f(row) and g(row), [child.compile() for child in self.children])
+
+    def filter(self, table: dict, row_ids: list = None) -> list:
+        # every child only checks the rows the previous ones matched
+        for child in self.children:
+            row_ids = child.filter(table, row_ids)
+        return row_ids
+
+    def __str__(self):
+        return ' AND '.join(f'({child})' if isinstance(child, Or) else str(child) for child in self.children)
+
+
+class Or:
+    def __init__(self, children: list):
+        self.children = children
+
+    def compile(self):
+        return reduce(lambda f, g: lambda row: f(row) or g(row), [child.compile() for child in self.children])
+
+    def filter(self, table: dict, row_ids: list = None) -> list:
+        return sorted(set().union(*(child.filter(table, row_ids) for child in self.children)))
+
+    def __str__(self):
+        return ' OR '.join(f'({child})' if isinstance(child, And) else str(child) for child in self.children)
+
+
+# Plan nodes: execute() returns the sorted list of ids of matching rows
+class PlanNode:
+    uses_index = True
+    est_rows = 0
+
+    def execute(self) -> list:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        raise NotImplementedError
+
+    def children(self) -> list:
+        return []
+
+    def explain(self, depth: int = 0) -> list:
+        """ Return lines describing the plan tree """
+
+        prefix = '  ' * (depth - 1) + '-> ' if depth else ''
+        lines = [f'{prefix}{self.describe()}  (est. rows: {self.est_rows:.0f})']
+        for child in self.children():
+            lines.extend(child.explain(depth + 1))
+        return lines
+
+
+class TableScan(PlanNode):
+    uses_index = False
+
+    def __init__(self, table: dict, condition, est_rows: float, scanner=None):
+        self.table = table
+        self.condition = condition
+        self.est_rows = est_rows
+        # column_store.VectorScanner or parallel.ParallelScanner that evaluates the condition instead of the rows
+        self.scanner = scanner
+
+    def execute(self) -> list:
+        if self.scanner is not None:
+            return self.scanner.scan(self.table, self.condition)
+
+        return self.condition.filter(self.table)
+
+    def describe(self) -> str:
+        if self.scanner is not None:
+            return f'{self.scanner.label}: {self.condition}'
+        return f'Table scan: {self.condition}'
+
+
+class IndexScan(PlanNode):
+    def __init__(self, table: dict, predicate: Predicate, index_type: str, est_rows: float):
+        self.table = table
+        self.predicate = predicate
+        self.index_type = index_type
+        self.est_rows = est_rows
+
+    def execute(self) -> list:
+        index = self.table[self.predicate.column]
+        value = self.predicate.value
+
+        # index returns row ids in the order of keys
+        if self.predicate.op == '=':
+            return sorted(index.iter_equal(value))
+        elif self.predicate.op == '<':
+            return sorted(index.iter_less_than(value))
+        else:
+            return sorted(index.iter_greater_than(value))
+
+    def items(self):
+        """ Return iterator of (key, row ids) of the matching keys of the index in ascending order of keys """
+
+        index = self.table[self.predicate.column]
+        value = self.predicate.value
+
+        if self.predicate.op == '=':
+            row_ids = list(index.iter_equal(value))
+            return iter([(value, row_ids)] if row_ids else [])
+        elif self.predicate.op == '<':
+            return takewhile(lambda item: item[0] < value, index.items())
+        else:
+            return index.items_greater_than(value)
+
+    def describe(self) -> str:
+        return f'Index scan using {self.index_type} index on {self.predicate.column}: {self.predicate}'
+
+
+class CompositeIndexScan(PlanNode):
+    def __init__(self, table: dict, in_col: str, prefix: list, range_predicate, index_type: str, est_rows: float):
+        """
+        Scan of a composite index answering equalities on a prefix of its columns
+        and optionally a range on the next column
+
+        prefix: Predicates with = on the first columns of the index in their order
+        range_predicate: Predicate with < or > on the column after the prefix or None
+        """
+
+        self.table = table
+        self.in_col = in_col
+        self.prefix = prefix
+        self.range_predicate = range_predicate
+        self.index_type = index_type
+        self.est_rows = est_rows
+        self.used = prefix + ([range_predicate] if range_predicate is not None else [])
+
+    def execute(self) -> list:
+        return sorted(chain.from_iterable(row_ids for _, row_ids in self.items()))
+
+    def items(self):
+        """ Yield (key, row ids) of the matching keys of the index in ascending order of keys """
+
+        index = self.table[self.in_col]
+        prefix = tuple(predicate.value for predicate in self.prefix)
+        length = len(prefix)
+
+        if length == len(index_columns(self.in_col)):
+            row_ids = list(index.iter_equal(prefix))
+            if row_ids:
+                yield prefix, row_ids
+            return
+
+        # keys that start with the prefix follow each other, the scan starts right before the first of them
+        low, high, skip = prefix, None, None
+        if self.range_predicate is not None and self.range_predicate.op == '>':
+            # keys of more columns that start with low are greater than low too, they are skipped
+            low = skip = prefix + (self.range_predicate.value,)
+        elif self.range_predicate is not None:
+            high = self.range_predicate.value
+
+        for key, row_ids in index.items_greater_than(low):
+            if key[:length] != prefix or (high is not None and key[length] >= high):
+                return
+            if skip is not None and key[:length + 1] == skip:
+                continue
+            yield key, row_ids
+
+    def describe(self) -> str:
+        condition = self.used[0] if len(self.used) == 1 else And(self.used)
+        return f'Index scan using {self.index_type} index on {index_label(self.in_col)}: {condition}'
+
+
+class IndexOnlyScan(PlanNode):
+    def __init__(self, scan: Union[IndexScan, CompositeIndexScan], positions: list):
+        """
+        Index scan that answers the query from keys of the index without reading rows of the table
+
+        positions: position of every selected column in keys of the index, keys of a single-column index
+                   are taken as keys of one column
+        """
+
+        self.scan = scan
+        self.positions = positions
+        self.est_rows = scan.est_rows
+
+    def execute(self) -> list:
+        return self.scan.execute()
+
+    def rows(self, limit: int = None) -> list:
+        """ Return tuples of the selected columns of the matching rows in the order of the index, at most limit """
+
+        composite = isinstance(self.scan, CompositeIndexScan)
+        getter = itemgetter(*self.positions)
+        width = len(self.positions)
+
+        rows = []
+        for key, row_ids in self.scan.items():
+            if not composite:
+                values = (key,) * width
+            else:
+                values = (getter(key),) if width == 1 else getter(key)
+
+            # every row with the key has the same values
+            if len(row_ids) == 1:
+                rows.append(values)
+            else:
+                rows.extend(repeat(values, len(row_ids)))
+
+            if limit is not None and len(rows) >= limit:
+                del rows[limit:]
+                break
+
+        return rows
+
+    def describe(self) -> str:
+        return self.scan.describe().replace('Index scan', 'Index only scan', 1)
+
+
+class Filter(PlanNode):
+    def __init__(self, table: dict, child: PlanNode, condition, est_rows: float):
+        self.table = table
+        self.child = child
+        self.condition = condition
+        self.est_rows = est_rows
+
+    def execute(self) -> list:
+        return self.condition.filter(self.table, self.child.execute())
+
+    def children(self) -> list:
+        return [self.child]
+
+    def describe(self) -> str:
+        return f'Filter: {self.condition}'
+
+
+class UnionScan(PlanNode):
+    def __init__(self, plans: list, est_rows: float):
+        self.plans = plans
+        self.est_rows = est_rows
+
+    def execute(self) -> list:
+        return sorted(set().union(*(plan.execute() for plan in self.plans)))
+
+    def children(self) -> list:
+        return self.plans
+
+    def describe(self) -> str:
+        return 'Union'
+
+
+class Planner:
+    def __init__(self, table: dict, scanner=None, vector=None):
+        """
+        Turn the condition list of Parser.expr into a plan for the table
+
+        AND: the indexed predicate that is expected to return the fewest rows drives the plan,
+             the other predicates only filter its rows
+        OR:  the union of the children if all of them can use indexes, otherwise one table scan
+        An index is used only if it's expected to return less than INDEX_THRESHOLD of the table.
+
+        Estimates come from statistics of ANALYZE: equalities use distinct counts (of the index if the column
+        is indexed) and ranges use histograms. Without statistics a range matches RANGE_SELECTIVITY of the table.
+
+        scanner: parallel.ParallelScanner, table scans use it if the table has at least its threshold of rows
+        vector: column_store.VectorScanner, preferred to scanner for conditions on int and str columns
+                if the table has at least its threshold of rows
+        """
+
+        self.table = table
+        self.rows = len(table['data'])
+        self.scanners = [s for s in (vector, scanner) if s is not None and self.rows >= s.threshold]
+
+    def plan(self, conds: list) -> PlanNode:
+        return self._plan(self.condition(conds))
+
+    def condition(self, conds: list):
+        """ Convert the nested condition list into Predicate / And / Or, flattening chains of the same operator """
+
+        if isinstance(conds[0], list):
+            oper = conds[1].upper()
+            if oper not in ('AND', 'OR'):
+                raise PlanError('Invalid syntax: one of the operands in condition must be the column name.')
+
+            left, right = self.condition(conds[0]), self.condition(conds[2])
+            node_type = And if oper == 'AND' else Or
+
+            children = []
+            for child in (left, right):
+                children.extend(child.children if isinstance(child, node_type) else [child])
+            return node_type(children)
+
+        column, op, value = conds
+        # check whether the entered column exists
+        if column not in self.table['col_names']:
+            raise PlanError('Invalid syntax: one of the operands in condition must be the column name.')
+        if op not in OPERATORS:
+            raise PlanError(f'Error: Invalid operator {op}!')
+
+        col_id = self.table['col_names'].index(column)
+        # values of another type can't be compared with the column
+        if self.table['data_types'] and not isinstance(value, self.table['data_types'][col_id]):
+            raise PlanError(f'Error: Value {value} doesn\'t match type {str(self.table["data_types"][col_id])[7:-1]}.')
+
+        return Predicate(column, col_id, op, value)
+
+    def _index(self, predicate: Predicate):
+        """ Return the index that can answer the predicate or None """
+
+        index = self.table.get(predicate.column) if predicate.column not in TABLE_KEYS else None
+        if index is None or not (predicate.op == '=' or index.supports_range):
+            return None
+        return index
+
+    def _composite(self, children: list):
+        """
+        Return the composite index scan expected to return the fewest rows for the AND of children or None
+
+        A composite index answers equalities on its first columns and a range on the next column.
+        """
+
+        equal = {child.column: child for child in children if isinstance(child, Predicate) and child.op == '='}
+        best = None
+
+        for in_col in indexed_columns(self.table):
+            columns = index_columns(in_col)
+            if len(columns) < 2 or columns[0] not in equal:
+                continue
+
+            index = self.table[in_col]
+            prefix = []
+            for column in columns:
+                if column not in equal:
+                    break
+                prefix.append(equal[column])
+
+            range_predicate = None
+            if len(prefix) < len(columns):
+                if not index.supports_range:
+                    continue
+                range_predicate = next((child for child in children if isinstance(child, Predicate)
+                                        and child.op != '=' and child.column == columns[len(prefix)]), None)
+
+            used = prefix + ([range_predicate] if range_predicate is not None else [])
+            if len(prefix) == len(columns):
+                est_rows = self.rows / max(len(index), 1)
+            else:
+                est_rows = self.rows * self.selectivity(And(used))
+
+            if best is None or est_rows < best.est_rows:
+                best = CompositeIndexScan(self.table, in_col, prefix, range_predicate, index_type_name(index), est_rows)
+
+        if best is None or best.est_rows > self.rows * INDEX_THRESHOLD:
+            return None
+        return best
+
+    def index_only(self, plan: PlanNode, col_ids: list):
+        """
+        Return IndexOnlyScan of the plan if it is one index scan whose keys contain all selected columns, otherwise None
+
+        Keys of str columns are folded, only int columns can be taken from keys as they are.
+        """
+
+        if isinstance(plan, IndexScan):
+            columns = [plan.predicate.column]
+        elif isinstance(plan, CompositeIndexScan):
+            columns = index_columns(plan.in_col)
+        else:
+            return None
+
+        col_names, data_types = self.table['col_names'], self.table['data_types']
+        if not data_types or not all(col_names[col_id] in columns and data_types[col_id] is int for col_id in col_ids):
+            return None
+
+        return IndexOnlyScan(plan, [columns.index(col_names[col_id]) for col_id in col_ids])
+
+    def selectivity(self, condition) -> float:
+        """ Estimated part of the table that matches the condition """
+
+        if isinstance(condition, And):
+            return reduce(lambda x, y: x * y, map(self.selectivity, condition.children))
+
+        if isinstance(condition, Or):
+            return 1 - reduce(lambda x, y: x * y, (1 - self.selectivity(child) for child in condition.children))
+
+        if condition.op == '=':
+            index = self._index(condition)
+            if index:
+                return 1 / len(index)
+
+        estimate = table_stats.selectivity(self.table.get('stats'), condition.column, condition.op, condition.value)
+        if estimate is not None:
+            return estimate
+
+        return EQUAL_SELECTIVITY if condition.op == '=' else RANGE_SELECTIVITY
+
+    def _plan(self, condition) -> PlanNode:
+        est_rows = self.rows * self.selectivity(condition)
+
+        if isinstance(condition, Predicate):
+            index = self._index(condition)
+            if index is not None and est_rows <= self.rows * INDEX_THRESHOLD:
+                return IndexScan(self.table, condition, index_type_name(index), est_rows)
+
+            composite = self._composite([condition])
+            if composite is not None:
+                return composite
+
+        elif isinstance(condition, And):
+            plans = [self._plan(child) for child in condition.children]
+            indexed = [(plan, [child]) for plan, child in zip(plans, condition.children) if plan.uses_index]
+
+            # one scan of a composite index may answer several children
+            composite = self._composite(condition.children)
+            if composite is not None:
+                indexed.append((composite, composite.used))
+
+            if indexed:
+                best, used = min(indexed, key=lambda item: item[0].est_rows)
+                rest = [child for child in condition.children if not any(child is u for u in used)]
+
+                if not rest:
+                    return best
+                return Filter(self.table, best, rest[0] if len(rest) == 1 else And(rest), est_rows)
+
+        elif isinstance(condition, Or):
+            plans = [self._plan(child) for child in condition.children]
+
+            if all(plan.uses_index for plan in plans):
+                return UnionScan(plans, min(est_rows, sum(plan.est_rows for plan in plans)))
+
+        scanner = next((s for s in self.scanners if s.supports(self.table, condition)), None)
+        return TableScan(self.table, condition, est_rows, scanner)
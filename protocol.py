@@ -0,0 +1,39 @@
+import json
+import struct
+
+# Wire protocol of the server
+#
+# Every message is a frame: 4-byte big-endian length of the payload followed by the payload,
+# a JSON object in UTF-8.
+#
+# Request:  {'sql': <statement>, 'params': [<values of ? placeholders>]}
+# Response: a sequence of frames, the last one has 'done' or 'error'
+#   {'columns': [<column names>]}               statements that return rows, before their rows
+#   {'rows': [[<values>], ...]}                 up to CHUNK_SIZE rows
+#   {'done': True, 'rowcount': <int>}           end of the result, rowcount is -1 if nothing was inserted
+#   {'error': <message>, 'type': <class name>}  the statement failed, type is a class of module errors
+FRAME_HEADER = struct.Struct('>I')
+
+# Longest accepted payload
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# Number of rows sent in one frame
+CHUNK_SIZE = 1000
+
+DEFAULT_PORT = 7433
+
+
+def encode_frame(message: dict) -> bytes:
+    payload = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> dict:
+    return json.loads(payload.decode('utf-8'))
+
+
+def payload_length(header: bytes) -> int:
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f'frame of {length} bytes is too long')
+    return length
@@ -0,0 +1,128 @@
+import threading
+from array import array
+from collections import OrderedDict
+
+# Number of results kept by the result cache, 0 turns it off
+CACHE_SIZE = 128
+
+# Bytes of row ids the result cache may hold, a result is 8 bytes per matching row
+CACHE_MEMORY = 64 * 1024 * 1024
+
+
+class ResultCache:
+    def __init__(self, size: int = CACHE_SIZE, memory: int = CACHE_MEMORY):
+        """
+        LRU cache of ids of the rows that match a WHERE condition
+
+        Results are keyed by the table name, the version of the table and the normalised condition
+        (str of the Predicate / And / Or tree of the planner: flattened AND / OR, lowercase strings),
+        so conditions that differ only in spelling share one entry. invalidate() bumps the version of a table
+        when rows are inserted, results of older versions are dropped and never returned again.
+
+        size: maximum number of results
+        memory: maximum bytes of row ids of all results, a bigger result isn't cached
+        """
+
+        self.size = size
+        self.memory = memory
+
+        self.results = OrderedDict()
+        self.used = 0
+        self.versions = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def version(self, table_name: str) -> int:
+        return self.versions.get(table_name, 0)
+
+    def get(self, table_name: str, condition: str):
+        """ Return the cached array of row ids or None """
+
+        with self._lock:
+            key = (table_name, self.version(table_name), condition)
+            row_ids = self.results.get(key)
+
+            if row_ids is None:
+                self.misses += 1
+                return None
+
+            self.results.move_to_end(key)
+            self.hits += 1
+            return row_ids
+
+    def put(self, table_name: str, version: int, condition: str, row_ids: list) -> array:
+        """ Keep the result computed for the version of the table, return it as array('q') """
+
+        row_ids = array('q', row_ids)
+        nbytes = self._nbytes(row_ids)
+
+        with self._lock:
+            # the table changed while the result was computed, or the result doesn't fit at all
+            if version != self.version(table_name) or not self.size or nbytes > self.memory:
+                return row_ids
+
+            key = (table_name, version, condition)
+            if key in self.results:
+                self.used -= self._nbytes(self.results.pop(key))
+
+            self.results[key] = row_ids
+            self.used += nbytes
+            self._evict()
+
+        return row_ids
+
+    def invalidate(self, table_name: str):
+        """ Rows of the table changed: bump its version and drop its results """
+
+        with self._lock:
+            self.versions[table_name] = self.version(table_name) + 1
+            self.invalidations += 1
+
+            for key in [key for key in self.results if key[0] == table_name]:
+                self.used -= self._nbytes(self.results.pop(key))
+
+    def resize(self, size: int = None, memory: int = None):
+        with self._lock:
+            if size is not None:
+                self.size = size
+            if memory is not None:
+                self.memory = memory
+            self._evict()
+
+    def clear(self):
+        """ Drop all results, used when another database is loaded """
+
+        with self._lock:
+            self.results.clear()
+            self.used = 0
+            self.versions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.results),
+                'size': self.size,
+                'memory used': self.used,
+                'memory': self.memory,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit ratio': round(self.hits / lookups, 3) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    @staticmethod
+    def _nbytes(row_ids: array) -> int:
+        return row_ids.itemsize * len(row_ids)
+
+    def _evict(self):
+        # the least recently used results go first
+        while self.results and (len(self.results) > self.size or self.used > self.memory):
+            _, row_ids = self.results.popitem(last=False)
+            self.used -= self._nbytes(row_ids)
+            self.evictions += 1
@@ -0,0 +1,126 @@
+import asyncio
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from api import Connection, Cursor
+from errors import Error, ProgrammingError
+from FlorianDB import FlorianDB
+from protocol import CHUNK_SIZE, FRAME_HEADER, decode_payload, encode_frame, payload_length
+from SQLparser import bind
+from statements import parse
+
+
+# Commands clients may run: COPY would read files of the server and SET changes options of the whole database
+COMMANDS = ('CREATE', 'CREATE INDEX', 'DROP INDEX', 'INSERT', 'SELECT', 'EXPLAIN', 'ANALYZE', 'SHOW',
+            'PREPARE', 'EXECUTE', 'SAVE')
+
+
+class Server:
+    def __init__(self, db: FlorianDB, host: str, port: int, workers: int = 4):
+        """
+        TCP server that shares one loaded database among its clients, see protocol for the wire format
+
+        Statements are parsed and run in a pool of worker threads, so the event loop keeps reading requests.
+        Concurrency is controlled by the table locks of FlorianDB: SELECTs run in parallel,
+        an INSERT waits for the SELECTs of its table and runs alone.
+        Every client has its own connection, which runs only COMMANDS and keeps the client's prepared statements.
+        """
+
+        self.connection = Connection(db)
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(workers)
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f'Serving {self.connection.db.filename} on {self.host}:{self.port}.')
+
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+        self.connection.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # the database is closed by the connection of the server, client connections are just dropped
+        connection = Connection(self.connection.db, COMMANDS)
+
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(FRAME_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+
+                payload = await reader.readexactly(payload_length(header))
+
+                # the frame was read completely, so the connection stays usable after a payload that isn't JSON
+                try:
+                    request = decode_payload(payload)
+                except ValueError:
+                    request = None
+
+                await self.respond(request, writer, connection)
+
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # the client is gone or sent a frame that is too long, its connection is dropped
+            pass
+
+        finally:
+            writer.close()
+
+    async def respond(self, request, writer: asyncio.StreamWriter, connection: Connection):
+        loop = asyncio.get_running_loop()
+
+        try:
+            if (not isinstance(request, dict) or not isinstance(request.get('sql', ''), str)
+                    or not isinstance(request.get('params', []), list)):
+                raise ProgrammingError('Error: Request must be a JSON object with "sql" string and "params" list.')
+
+            cursor = connection.cursor()
+
+            # the statement is parsed and run in the pool, rows are streamed after it released its table lock
+            await loop.run_in_executor(self.executor, self.run, cursor, request)
+
+            if cursor.description is not None:
+                writer.write(encode_frame({'columns': [column[0] for column in cursor.description]}))
+
+                while rows := await loop.run_in_executor(self.executor, cursor.fetchmany, CHUNK_SIZE):
+                    writer.write(encode_frame({'rows': rows}))
+                    await writer.drain()
+
+            writer.write(encode_frame({'done': True, 'rowcount': cursor.rowcount}))
+
+        except Error as e:
+            writer.write(encode_frame({'error': str(e), 'type': type(e).__name__}))
+
+        except ConnectionError:
+            raise
+
+        except Exception as e:
+            # a bug must not drop the client, it gets an error and the connection stays open
+            traceback.print_exc()
+            writer.write(encode_frame({'error': f'Error: Internal error - {e!r}.', 'type': 'InternalError'}))
+
+        await writer.drain()
+
+    @staticmethod
+    def run(cursor: Cursor, request: dict):
+        cursor.run(bind(parse(request.get('sql', '')), request.get('params', [])))
+
+
+def serve(filename: str, host: str, port: int, workers: int = 4):
+    """ Load the database (it is created if it doesn't exist) and serve it until interrupted """
+
+    db = FlorianDB()
+    db.load(filename, create=True)
+
+    server = Server(db, host, port, workers)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print('Database has been successfully saved.')
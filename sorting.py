@@ -0,0 +1,143 @@
+import sys
+import heapq
+import pickle
+import tempfile
+from itertools import chain, islice
+from operator import itemgetter
+
+from indexes import TABLE_KEYS, fold
+
+# Bytes of sort keys an ORDER BY without LIMIT may hold in memory, a bigger result is sorted in runs
+# that are spilled to temporary files and merged
+SORT_MEMORY = 64 * 1024 * 1024
+
+# Bytes of a (key, row id) pair of a run besides the key: the tuple, the row id and the pointer of the list
+PAIR_SIZE = 100
+
+# Number of pairs pickled at once into a run file
+RUN_CHUNK = 4096
+
+
+def sort_key(table: dict, col_id: int):
+    """ Return function(row id) -> value the row is ordered by, strings are ordered case-insensitively """
+
+    folded = table.get('folded', {}).get(col_id)
+    if folded is not None:
+        return folded.__getitem__
+
+    data = table['data']
+    if table['data_types'] and table['data_types'][col_id] is str:
+        return lambda row_id: data[row_id][col_id].lower()
+    return lambda row_id: data[row_id][col_id]
+
+
+def order_index(table: dict, column: str):
+    """ Return the AVL or BTREE index that holds the rows in the order of the column or None """
+
+    index = table.get(column) if column not in TABLE_KEYS else None
+    return index if index is not None and index.supports_range else None
+
+
+def index_order(table: dict, column: str, descending: bool = False):
+    """
+    Return iterator of lists of row ids in the order of the index of the column
+
+    Rows of one key keep the order of their ids also in descending order, like a stable sort.
+    """
+
+    index = order_index(table, column)
+    return map(itemgetter(1), index.items_reversed() if descending else index.items())
+
+
+def top_k(row_ids, key, limit: int, descending: bool = False) -> list:
+    """ Return the first limit row ids in the order of key, a heap of limit ids is kept instead of sorting all """
+
+    return (heapq.nlargest if descending else heapq.nsmallest)(limit, row_ids, key=key)
+
+
+def sort_rows(row_ids, key, descending: bool = False, memory: int = SORT_MEMORY):
+    """
+    Return iterator of row ids in the order of key
+
+    Row ids are sorted in memory if their keys are expected to fit into memory bytes. Otherwise runs of
+    row ids that fit are sorted and spilled to temporary files, and the runs are merged while the iterator is
+    consumed. Keys are computed before the function returns, so the table may change meanwhile.
+    """
+
+    if not isinstance(row_ids, (list, range)):
+        row_ids = list(row_ids)
+
+    # the size of keys is estimated from the first rows
+    sample = [sys.getsizeof(key(row_id)) for row_id in islice(row_ids, 100)]
+    pair_size = PAIR_SIZE + (sum(sample) / len(sample) if sample else 0)
+    run_rows = max(int(memory // pair_size), RUN_CHUNK)
+
+    if len(row_ids) <= run_rows:
+        return iter(sorted(row_ids, key=key, reverse=descending))
+
+    runs = []
+    for start in range(0, len(row_ids), run_rows):
+        run = [(key(row_id), row_id) for row_id in row_ids[start:start + run_rows]]
+        # sorting by the key only is stable, rows with equal keys stay in their order
+        run.sort(key=itemgetter(0), reverse=descending)
+        runs.append(_spill(run))
+
+    return _merge(runs, descending)
+
+
+def _spill(run: list):
+    f = tempfile.TemporaryFile(prefix='florian-sort-')
+    for start in range(0, len(run), RUN_CHUNK):
+        pickle.dump(run[start:start + RUN_CHUNK], f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def _read_run(f):
+    while True:
+        try:
+            yield from pickle.load(f)
+        except EOFError:
+            return
+
+
+def _merge(runs: list, descending: bool):
+    try:
+        # runs are merged in their order, so equal keys keep the order of rows across runs too
+        merged = heapq.merge(*map(_read_run, runs), key=itemgetter(0), reverse=descending)
+        yield from map(itemgetter(1), merged)
+    finally:
+        for f in runs:
+            f.close()
+
+
+def ordered_by_index(table: dict, column: str, plan, limit: int = None) -> bool:
+    """
+    Whether rows are taken in the order of the index of the column instead of sorting the matching rows
+
+    plan: plan of the WHERE condition or None if there is no condition
+
+    Without a condition the index already holds all rows in order. With LIMIT a walk of the index that checks
+    the condition stops after limit matching rows, which is better than a table scan of the whole condition.
+    """
+
+    if order_index(table, column) is None:
+        return False
+    return plan is None or (limit is not None and not plan.uses_index)
+
+
+def ordered_row_ids(table: dict, column: str, descending: bool = False, condition=None, limit: int = None) -> list:
+    """ Return ids of the rows that match the condition (all if None) in the order of the index of the column """
+
+    row_ids = index_order(table, column, descending)
+    if condition is not None:
+        row_ids = (condition.filter(table, key_rows) for key_rows in row_ids)
+
+    return list(islice(chain.from_iterable(row_ids), limit))
+
+
+def sort_result(rows: list, position: int, descending: bool = False) -> list:
+    """ Sort result rows (of aggregates) by the value at position, strings are ordered case-insensitively """
+
+    return sorted(rows, key=lambda row: fold(row[position]) if isinstance(row[position], str) else row[position],
+                  reverse=descending)
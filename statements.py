@@ -0,0 +1,81 @@
+import re
+import threading
+from collections import OrderedDict
+
+from FlorianDB import FlorianDB, Interpreter
+from lexer import Lexer
+from SQLparser import Parser, bind
+
+# Number of parsed statements kept by the parse cache
+CACHE_SIZE = 256
+
+# Quoted strings are kept as they are, whitespace outside of them is collapsed into one space
+_NORMALISE = re.compile(r'''("(?:""|\\"|[^"])*"|'(?:''|\\'|[^'])*')|\s+''')
+
+
+def normalise(sql: str) -> str:
+    return _NORMALISE.sub(lambda match: match.group(1) or ' ', sql).strip()
+
+
+class StatementCache:
+    def __init__(self, size: int = CACHE_SIZE):
+        """
+        LRU cache of parsed statements keyed by their normalised text
+
+        Statements that differ only in whitespace share one entry. Cached statements are templates:
+        they are never run directly, every run gets its own copy from SQLparser.bind.
+        """
+
+        self.size = size
+        self.statements = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def parse(self, sql: str) -> dict:
+        """ Return the parsed statement, the lexer and the parser run only if it isn't cached """
+
+        key = normalise(sql)
+
+        with self._lock:
+            statement = self.statements.get(key)
+            if statement is not None:
+                self.statements.move_to_end(key)
+                self.hits += 1
+                return statement
+
+            self.misses += 1
+
+        statement = Parser(Lexer(key)).parse()
+
+        # invalid statements are not kept, they only print an error
+        if statement['success']:
+            with self._lock:
+                self.statements[key] = statement
+                if len(self.statements) > self.size:
+                    self.statements.popitem(last=False)
+
+        return statement
+
+    def clear(self):
+        with self._lock:
+            self.statements.clear()
+
+
+cache = StatementCache()
+
+
+def parse(sql: str) -> dict:
+    return cache.parse(sql)
+
+
+def execute(db: FlorianDB, sql: str, params=()):
+    """
+    Run one statement on the database, ? placeholders of the statement take the values of params in their order
+
+    The statement is parsed once and then taken from the cache:
+        for row in rows:
+            execute(db, 'INSERT INTO people (?, ?, ?)', row)
+    """
+
+    Interpreter(db).execute(bind(parse(sql), params))
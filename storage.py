@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import threading
+from array import array
+from itertools import accumulate
+from pickle import load as pickle_load
+from collections.abc import MutableMapping
+
+from indexes import build_index, fold_rows, index_type_name, indexed_columns
+
+# File layout:
+#   header:   MAGIC, format version, offset and length of the catalog
+#   segments: column segments of every table, one after another
+#   catalog:  JSON description of the tables and where their segments are, and the generation of the write-ahead log
+#             that continues the file (records of older generations are already in the file)
+#
+# Column segment encodings:
+#   'i64': fixed-width little-endian signed 64-bit integers
+#   'str': (rows + 1) little-endian unsigned 64-bit offsets followed by the UTF-8 encoded values
+#   'int': integers that don't fit into 64 bits, stored like 'str' in decimal notation
+#
+# Version 2 stores the type of every index, version 1 files only list indexed columns, which are AVL trees
+MAGIC = b'FLODBCOL'
+VERSION = 2
+_HEADER = struct.Struct('<8sHQQ')
+
+TYPE_NAMES = {int: 'int', str: 'str'}
+NAME_TYPES = {'int': int, 'str': str}
+
+
+def is_columnar(filename: str) -> bool:
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _little_endian(arr: array) -> array:
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+def _encode_strings(values) -> bytes:
+    encoded = [value.encode('utf-8', 'surrogatepass') for value in values]
+    offsets = array('Q', accumulate(map(len, encoded), initial=0))
+    return _little_endian(offsets).tobytes() + b''.join(encoded)
+
+
+def _decode_strings(buf, rows: int) -> list:
+    offsets = array('Q')
+    offsets.frombytes(buf[:8 * (rows + 1)])
+    _little_endian(offsets)
+
+    blob = bytes(buf[8 * (rows + 1):])
+
+    # ASCII text is decoded at once, its byte offsets are character offsets as well
+    text = blob.decode('utf-8', 'surrogatepass')
+    if len(text) == len(blob):
+        return [text[offsets[i]:offsets[i + 1]] for i in range(rows)]
+
+    return [blob[offsets[i]:offsets[i + 1]].decode('utf-8', 'surrogatepass') for i in range(rows)]
+
+
+def _share_strings(values: list) -> list:
+    """ Replace equal strings of the column with one object, decoding makes a new string for every row """
+
+    shared = {}
+    return [shared.setdefault(value, value) for value in values]
+
+
+def encode_column(values: list, ctype: type) -> tuple:
+    """ Return (encoding, segment bytes) for the values of one column """
+
+    if ctype is int:
+        try:
+            return 'i64', _little_endian(array('q', values)).tobytes()
+        except OverflowError:
+            return 'int', _encode_strings(map(str, values))
+
+    return 'str', _encode_strings(values)
+
+
+def decode_column(buf, encoding: str, rows: int) -> list:
+    if encoding == 'i64':
+        values = array('q')
+        values.frombytes(buf)
+        return _little_endian(values).tolist()
+
+    if encoding == 'int':
+        return list(map(int, _decode_strings(buf, rows)))
+
+    return _decode_strings(buf, rows)
+
+
+class LazyDatabase(MutableMapping):
+    def __init__(self, filename: str = None, tables: dict = None):
+        """
+        Mapping of table names to tables, the same as FlorianDB.db
+
+        filename: columnar database file that is opened with mmap, defaults to None
+        tables: already materialised tables, they take precedence over the tables of the file
+
+        Tables of the file are only described by the catalog until they are accessed for the first time,
+        then their column segments are decoded into rows and their indexes are rebuilt.
+        """
+
+        self._tables = dict(tables or {})
+        self._pending = {}
+        # concurrent readers must not materialise the same table twice
+        self._materialise_lock = threading.Lock()
+
+        self._file = None
+        self._mmap = None
+        # generation of the write-ahead log whose records come after the file, see wal.WriteAheadLog
+        self.wal_generation = 0
+
+        if filename is not None:
+            self._open(filename)
+
+    def _open(self, filename: str):
+        self._file = open(filename, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, catalog_offset, catalog_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{filename} is not a columnar database file')
+        if version > VERSION:
+            raise ValueError(f'unsupported file format version {version}')
+
+        catalog = json.loads(self._mmap[catalog_offset:catalog_offset + catalog_length])
+        self.wal_generation = catalog.get('wal_generation', 0)
+        for entry in catalog['tables']:
+            if entry['name'] not in self._tables:
+                self._pending[entry['name']] = entry
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    def materialised(self) -> dict:
+        return dict(self._tables)
+
+    def segment(self, column: dict) -> memoryview:
+        return memoryview(self._mmap)[column['offset']:column['offset'] + column['length']]
+
+    def pending_entry(self, name: str):
+        return self._pending.get(name)
+
+    def _materialise(self, name: str) -> dict:
+        # the entry stays pending until the table is stored, so the table is always in one of the dicts
+        entry = self._pending[name]
+        rows = entry['rows']
+
+        data_types = [NAME_TYPES[type_name] for type_name in entry['data_types']]
+        columns = [decode_column(self.segment(column), column['encoding'], rows) for column in entry['columns']]
+        columns = [_share_strings(values) if ctype is str else values for ctype, values in zip(data_types, columns)]
+
+        table = {
+            'col_names': entry['col_names'],
+            'data_types': data_types,
+            'data': list(zip(*columns)) if rows else []
+        }
+
+        fold_rows(table)
+
+        indexes = entry['indexes']
+        if isinstance(indexes, list):
+            indexes = dict.fromkeys(indexes, 'AVL')
+
+        for in_col, index_type in indexes.items():
+            table[in_col] = build_index(table, in_col, index_type)
+
+        if 'stats' in entry:
+            table['stats'] = entry['stats']
+
+        self._tables[name] = table
+        del self._pending[name]
+        return table
+
+    def __getitem__(self, name: str) -> dict:
+        if name in self._pending:
+            with self._materialise_lock:
+                if name in self._pending:
+                    return self._materialise(name)
+        return self._tables[name]
+
+    def __setitem__(self, name: str, table: dict):
+        self._tables[name] = table
+        self._pending.pop(name, None)
+
+    def __delitem__(self, name: str):
+        if name in self._pending:
+            del self._pending[name]
+        else:
+            del self._tables[name]
+
+    def __contains__(self, name) -> bool:
+        # pending first: a table leaves _pending only after it is in _tables
+        return name in self._pending or name in self._tables
+
+    def __iter__(self):
+        # tables may be materialised meanwhile, each name is yielded once
+        pending = list(self._pending)
+        tables = list(self._tables)
+        yield from tables
+        yield from (name for name in pending if name not in tables)
+
+    def __len__(self) -> int:
+        return len(self._tables) + len(self._pending)
+
+
+def write_database(filename: str, db, wal_generation: int = 0) -> None:
+    """
+    Write tables of db into filename in the columnar format
+
+    Tables of a LazyDatabase that were never accessed are copied segment by segment without decoding.
+    wal_generation: generation of the write-ahead log that starts after this checkpoint
+    """
+
+    tables = []
+
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, 0))
+
+        for name in list(db):
+            entry = db.pending_entry(name) if isinstance(db, LazyDatabase) else None
+
+            if entry is not None:
+                segments = [(column['encoding'], db.segment(column)) for column in entry['columns']]
+                entry = dict(entry)
+            else:
+                table = db[name]
+                data_types = table['data_types']
+                columns = list(zip(*table['data'])) if table['data'] else [[] for _ in table['col_names']]
+
+                segments = [encode_column(list(values), data_types[i] if data_types else str)
+                            for i, values in enumerate(columns)]
+                entry = {
+                    'name': name,
+                    'col_names': table['col_names'],
+                    'data_types': [TYPE_NAMES[ctype] for ctype in data_types],
+                    'indexes': {in_col: index_type_name(table[in_col]) for in_col in indexed_columns(table)},
+                    'rows': len(table['data'])
+                }
+                if 'stats' in table:
+                    entry['stats'] = table['stats']
+
+            entry['columns'] = []
+            for encoding, segment in segments:
+                entry['columns'].append({'encoding': encoding, 'offset': f.tell(), 'length': len(segment)})
+                f.write(segment)
+
+            tables.append(entry)
+
+        catalog = json.dumps({'tables': tables, 'wal_generation': wal_generation}).encode('utf-8')
+        catalog_offset = f.tell()
+        f.write(catalog)
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, catalog_offset, len(catalog)))
+
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_legacy(filename: str) -> dict:
+    """ Read the whole database from a pickle .flodb file of the previous format """
+
+    with open(filename, 'rb') as f:
+        db = pickle_load(f)
+
+    # indexes of pickle files hold whole rows, they are rebuilt to hold row ids
+    for table in db.values():
+        table['data'] = list(map(tuple, table['data']))
+        fold_rows(table)
+        for in_col in indexed_columns(table):
+            table[in_col] = build_index(table, in_col)
+
+    return db
+
+
+def migrate(filename: str) -> bool:
+    """ Rewrite a pickle .flodb file in the columnar format, return False if it already is columnar """
+
+    if is_columnar(filename):
+        return False
+
+    tmp_filename = filename + '.tmp'
+    write_database(tmp_filename, load_legacy(filename))
+    os.replace(tmp_filename, filename)
+    return True
@@ -0,0 +1,112 @@
+from bisect import bisect_left
+from typing import Union
+
+from additional_functions import index_key
+from indexes import column_keys
+
+# Number of buckets of equi-depth histograms
+HISTOGRAM_BUCKETS = 32
+
+
+def analyze(table: dict) -> dict:
+    """
+    Compute statistics of the table
+
+    :return: dict(
+        'rows' (int): Number of rows
+        'columns' (dict): For every column name dict(
+            'distinct' (int): Number of distinct values
+            'min', 'max': The smallest and the biggest value
+            'histogram' (list): Bounds of equi-depth buckets, every bucket holds about the same number of rows
+        )
+    )
+
+    Values are normalised like index keys, so strings are compared case-insensitively.
+    """
+
+    rows = len(table['data'])
+    stats = {'rows': rows, 'columns': {}}
+
+    if not rows:
+        return stats
+
+    for column_index, col_name in enumerate(table['col_names']):
+        values = sorted(column_keys(table, column_index))
+        buckets = min(HISTOGRAM_BUCKETS, rows)
+
+        stats['columns'][col_name] = {
+            'distinct': len(set(values)),
+            'min': values[0],
+            'max': values[-1],
+            'histogram': [values[i * rows // buckets] for i in range(buckets)] + [values[-1]]
+        }
+
+    return stats
+
+
+def update(stats: dict, col_names: list, rows: list) -> None:
+    """
+    Keep statistics approximately up to date after rows were inserted
+
+    Row count, min and max are exact. A value outside of the old min / max is surely new, so it's
+    counted as a distinct value; histogram bounds are kept until the next ANALYZE.
+    """
+
+    stats['rows'] += len(rows)
+
+    for column_index, col_name in enumerate(col_names):
+        column = stats['columns'].get(col_name)
+        if column is None:
+            continue
+
+        for row in rows:
+            value = index_key(row[column_index])
+            if value < column['min']:
+                column['min'] = column['histogram'][0] = value
+                column['distinct'] += 1
+            elif value > column['max']:
+                column['max'] = column['histogram'][-1] = value
+                column['distinct'] += 1
+
+
+def _fraction_less(column: dict, value: Union[int, str]) -> float:
+    """ Estimated part of the rows with values less than value """
+
+    bounds = column['histogram']
+    buckets = len(bounds) - 1
+
+    if value <= bounds[0]:
+        return 0.0
+    if value > bounds[-1]:
+        return 1.0
+
+    bucket = bisect_left(bounds, value) - 1
+    low, high = bounds[bucket], bounds[bucket + 1]
+
+    # numbers are interpolated inside the bucket, for strings half of the bucket is assumed
+    if isinstance(value, int) and high > low:
+        inside = (value - low) / (high - low)
+    else:
+        inside = 0.5
+
+    return (bucket + inside) / buckets
+
+
+def selectivity(stats: dict, col_name: str, op: str, value: Union[int, str]):
+    """ Estimated part of the table matching 'col_name op value', None if there are no usable statistics """
+
+    column = stats['columns'].get(col_name) if stats else None
+    if column is None or type(value) is not type(column['min']):
+        return None
+
+    if value < column['min'] or value > column['max']:
+        return 0.0
+
+    equal = 1 / column['distinct']
+    if op == '=':
+        return equal
+
+    less = _fraction_less(column, value)
+    if op == '<':
+        return less
+    return max(0.0, 1 - less - equal)
@@ -0,0 +1,20 @@
+import random
+
+from AVLTree import AVLTree
+
+
+def test_ranges_match_sorted_rows():
+    rng = random.Random(4)
+    keys = [rng.randrange(300) for _ in range(2000)]
+
+    tree = AVLTree()
+    for row_id, key in enumerate(keys):
+        tree.insert_or_update_node(key, row_id)
+
+    by_key = sorted(range(len(keys)), key=keys.__getitem__)
+    for target in range(-1, 302, 5):
+        assert tree.get_values_less_than(target) == [i for i in by_key if keys[i] < target]
+        assert tree.get_values_greater_than(target) == [i for i in by_key if keys[i] > target]
+        assert tree.get_values_less_than(target) == list(tree.iter_less_than(target))
+        assert tree.get_values_greater_than(target) == list(tree.iter_greater_than(target))
+        assert tree.get_equal(target) == [i for i in range(len(keys)) if keys[i] == target]
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from FlorianDB import FlorianDB
+from planner import CompositeIndexScan, Filter, Planner
+
+NAMES = ['Tom', 'tom', 'Kitty', 'Leo']
+
+
+@pytest.fixture(params=['AVL', 'BTREE'])
+def db(tmp_path, request):
+    rng = random.Random(7)
+    db = FlorianDB(wal_sync_every=0)
+    db.load(str(tmp_path / 'db'), create=True)
+    db.create_table('t', ['name', 'b', 'c', 'd'], ['name,b,c'], {'name,b,c': request.param})
+    db.insert_many('t', ([rng.choice(NAMES), rng.randrange(10), rng.randrange(10), i] for i in range(2000)))
+    yield db
+    db.close(save=False)
+
+
+def brute_force(table: dict, conds: list) -> list:
+    return sorted(Planner({key: table[key] for key in ('col_names', 'data_types', 'data')}).plan(conds).execute())
+
+
+@pytest.mark.parametrize('conds, used', [
+    (['name', '=', 'TOM'], 1),
+    ([['name', '=', 'tom'], 'AND', ['b', '=', 3]], 2),
+    ([['name', '=', 'tom'], 'AND', ['b', '>', 3]], 2),
+    ([['b', '<', 3], 'AND', ['name', '=', 'leo']], 2),
+    ([['name', '=', 'kitty'], 'AND', [['b', '=', 3], 'AND', ['c', '=', 9]]], 3),
+    ([['name', '=', 'kitty'], 'AND', [['b', '=', 3], 'AND', ['c', '>', 4]]], 3),
+    ([['name', '=', 'kitty'], 'AND', [['b', '=', 3], 'AND', ['c', '<', 4]]], 3),
+])
+def test_prefix_and_range_are_answered_by_one_scan(db, conds, used):
+    table = db.table('t')
+    plan = Planner(table).plan(conds)
+
+    assert isinstance(plan, CompositeIndexScan) and len(plan.used) == used
+    assert plan.execute() == brute_force(table, conds)
+
+
+@pytest.mark.parametrize('conds', [
+    [['name', '=', 'tom'], 'AND', ['c', '=', 3]],
+    [['name', '=', 'tom'], 'AND', [['b', '>', 3], 'AND', ['d', '<', 100]]],
+])
+def test_columns_after_a_gap_are_filtered(db, conds):
+    table = db.table('t')
+    plan = Planner(table).plan(conds)
+
+    assert isinstance(plan, Filter) and isinstance(plan.child, CompositeIndexScan)
+    assert plan.execute() == brute_force(table, conds)
+
+
+def test_index_without_its_first_column_isnt_used(db):
+    assert db.explain('t', [['b', '=', 3], 'AND', ['c', '=', 3]])[0].startswith('Table scan')
+
+
+def test_rows_inserted_later_are_indexed(db):
+    conds = [['name', '=', 'Leo'], 'AND', ['b', '>', 8]]
+    before = len(list(db.select('t', conds)[1]))
+
+    db.insert('t', ['LEO', 9, 0, 5000])
+    db.insert_many('t', [['leo', 10, 0, 5001], ['Leo', 8, 0, 5002]])
+    assert len(list(db.select('t', conds)[1])) == before + 2
+
+
+def test_hash_index_needs_every_column(tmp_path):
+    db = FlorianDB(wal_sync_every=0)
+    db.load(str(tmp_path / 'db'), create=True)
+    db.create_table('t', ['a', 'b'], ['a,b'], {'a,b': 'HASH'})
+    db.insert_many('t', ([i % 5, i % 7] for i in range(100)))
+
+    assert db.explain('t', [['a', '=', 1], 'AND', ['b', '=', 3]]) == [
+        'Index scan using HASH index on (a, b): a = 1 AND b = 3  (est. rows: 3)'
+    ]
+    assert db.explain('t', [['a', '=', 1], 'AND', ['b', '>', 3]])[0].startswith('Table scan')
+    assert [row for row in db.select('t', [['a', '=', 1], 'AND', ['b', '=', 3]])[1]] == [(1, 3)] * 2
+    db.close(save=False)
+
+
+def test_index_only_scan_of_int_columns(tmp_path):
+    db = FlorianDB(wal_sync_every=0)
+    db.load(str(tmp_path / 'db'), create=True)
+    db.create_table('t', ['a', 'b', 'c'], ['a,b'])
+    db.insert_many('t', ([i % 5, i, 'x'] for i in range(100)))
+
+    conds = [['a', '=', 2], 'AND', ['b', '<', 20]]
+    assert db.explain('t', conds, ['b', 'a'])[0].startswith('Index only scan using AVL index on (a, b)')
+    assert list(db.select('t', conds, columns=['b', 'a'])[1]) == [(2, 2), (7, 2), (12, 2), (17, 2)]
+    db.close(save=False)
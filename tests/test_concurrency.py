@@ -0,0 +1,181 @@
+import random
+import threading
+import time
+
+import pytest
+
+from additional_functions import index_key
+from api import Connection
+from FlorianDB import FlorianDB
+from locks import RWLock
+
+ROWS = 3000
+GROUPS = 50
+
+
+def test_rwlock_readers_share_and_writers_exclude():
+    lock = RWLock()
+    inside = threading.Barrier(2, timeout=2)
+
+    # both readers must be inside at the same time to pass the barrier
+    def read():
+        with lock.reading():
+            inside.wait()
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+
+    events = []
+
+    def read_after_writer():
+        with lock.reading():
+            events.append('read')
+
+    with lock.writing():
+        reader = threading.Thread(target=read_after_writer)
+        reader.start()
+        time.sleep(0.05)
+        events.append('write done')
+    reader.join()
+    assert events == ['write done', 'read']
+
+
+def test_rwlock_reentrancy():
+    lock = RWLock()
+
+    with lock.writing():
+        with lock.writing(), lock.reading():
+            pass
+
+    with lock.reading():
+        with lock.reading():
+            pass
+        with pytest.raises(RuntimeError):
+            with lock.writing():
+                pass
+
+
+def test_readers_and_writers_keep_results_and_indexes_consistent(tmp_path):
+    db = FlorianDB(wal_sync_every=0)
+    db.load(str(tmp_path / 'stress'), create=True)
+    db.create_table('t', ['id', 'grp', 'name'], ['id', 'grp', 'name'], {'id': 'AVL', 'grp': 'BTREE', 'name': 'HASH'})
+    db.insert_many('t', ([i, i % GROUPS, f'Name{i % 100}'] for i in range(ROWS)))
+
+    initial = {group: sum(1 for i in range(ROWS) if i % GROUPS == group) for group in range(GROUPS)}
+    errors_found = []
+    inserted = [0, 0]
+    stop = threading.Event()
+
+    def read(seed: int):
+        generator = random.Random(seed)
+        while not stop.is_set():
+            group = generator.randrange(GROUPS)
+            matches = list(db.select('t', ['grp', '=', group])[1])
+            if len(matches) < initial[group] or any(row[1] != group for row in matches):
+                errors_found.append(f'grp = {group}: {len(matches)} rows')
+
+            # rows with ids below ROWS are never inserted again
+            target = generator.randrange(ROWS)
+            matches = list(db.select('t', ['id', '<', target])[1])
+            if len(matches) != target or any(row[0] >= target for row in matches):
+                errors_found.append(f'id < {target}: {len(matches)} rows')
+
+            name = f'name{generator.randrange(100)}'
+            if any(row[2].lower() != name for row in db.select('t', ['name', '=', name])[1]):
+                errors_found.append(f'name = {name}')
+
+    def write(seed: int):
+        generator = random.Random(seed)
+        next_id = ROWS * (seed + 2)
+        while not stop.is_set():
+            if generator.random() < 0.5:
+                db.insert('t', [next_id, generator.randrange(GROUPS), f'Name{generator.randrange(100)}'])
+                count = 1
+            else:
+                count = db.insert_many('t', [[next_id + i, generator.randrange(GROUPS), 'Batch'] for i in range(20)])
+            next_id += count
+            inserted[seed] += count
+
+    threads = [threading.Thread(target=read, args=(seed,)) for seed in range(4)]
+    threads += [threading.Thread(target=write, args=(seed,)) for seed in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors_found == []
+
+    table = db.table('t')
+    assert len(table['data']) == ROWS + sum(inserted)
+
+    # every index holds every row exactly once under its own key
+    for column_index, column in enumerate(table['col_names']):
+        row_ids = []
+        for key, data in table[column].items():
+            row_ids.extend(data)
+            assert all(index_key(table['data'][row_id][column_index]) == key for row_id in data)
+        assert sorted(row_ids) == list(range(len(table['data'])))
+
+    db.close()
+
+    # the log and the checkpoint hold the same rows
+    db = FlorianDB()
+    db.load(str(tmp_path / 'stress'))
+    assert len(db.table('t')['data']) == ROWS + sum(inserted)
+    db.close()
+
+
+def test_first_access_of_lazy_tables_from_many_threads(tmp_path):
+    filename = str(tmp_path / 'lazy')
+    db = FlorianDB(wal_sync_every=0)
+    db.load(filename, create=True)
+    for name in ('t', 'u', 'v'):
+        db.create_table(name, ['id', 'name'], ['id'])
+        db.insert_many(name, ([i, f'Name{i}'] for i in range(ROWS)))
+    db.close()
+
+    db = FlorianDB()
+    db.load(filename)
+    start = threading.Barrier(8, timeout=5)
+    results = []
+
+    # every thread is the first to select from the tables, they are materialised while the others look them up
+    def select():
+        start.wait()
+        try:
+            results.extend(len(list(db.select(name, ['id', '<', 10])[1])) for name in ('t', 'u', 'v'))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=select) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [10] * 24
+    db.close()
+
+
+def test_result_excludes_rows_inserted_while_it_is_read(tmp_path):
+    db = FlorianDB(wal_sync_every=0)
+    db.load(str(tmp_path / 'snapshot'), create=True)
+    connection = Connection(db)
+
+    queries = ['SELECT FROM {}', 'SELECT id FROM {}', 'SELECT FROM {} WHERE id < ?', 'SELECT FROM {} ORDER BY id']
+    for i, query in enumerate(queries):
+        name = f't{i}'
+        db.create_table(name, ['id'], [])
+        db.insert_many(name, [[0], [1], [2]])
+
+        cursor = connection.execute(query.format(name), (5,) if '?' in query else ())
+        first = cursor.fetchone()
+        connection.execute(f'INSERT {name} (99)')
+        assert [first] + cursor.fetchall() == [(0,), (1,), (2,)], query
+
+    connection.close()
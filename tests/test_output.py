@@ -0,0 +1,59 @@
+import io
+import json
+
+import pytest
+from tabulate import tabulate
+
+from output import write_rows
+
+COLUMNS = ['id', 'name']
+ROWS = [(1, 'Tom'), (2, 'Kitty, "the cat"'), (3, 'Лео')]
+
+
+def written(rows, fmt: str, chunk_size: int = 2) -> str:
+    out = io.StringIO()
+    assert write_rows(COLUMNS, iter(rows), fmt, out, chunk_size) == len(rows)
+    return out.getvalue()
+
+
+def test_csv_and_tsv_end_with_the_last_row():
+    assert written(ROWS, 'csv') == 'id,name\n1,Tom\n2,"Kitty, ""the cat"""\n3,Лео\n'
+    assert written(ROWS, 'tsv') == 'id\tname\n1\tTom\n2\t"Kitty, ""the cat"""\n3\tЛео\n'
+    assert written([], 'csv') == 'id,name\n'
+
+
+def test_json_lines_end_with_the_last_row():
+    text = written(ROWS, 'json')
+
+    assert text.endswith('}\n') and not text.endswith('\n\n')
+    assert [json.loads(line) for line in text.splitlines()] == [dict(zip(COLUMNS, row)) for row in ROWS]
+    assert written([], 'json') == ''
+
+
+def test_small_grid_is_formatted_by_tabulate():
+    assert written(ROWS, 'grid', chunk_size=3) == tabulate([COLUMNS] + ROWS, headers='firstrow', tablefmt='grid') + ' \n\n'
+
+
+@pytest.mark.parametrize('fmt', ['grid', 'stream'])
+def test_big_grid_is_written_while_rows_are_produced(fmt):
+    produced = []
+
+    def rows():
+        for i in range(25):
+            produced.append(i)
+            yield i, f'Name{i}'
+
+    class Out(io.StringIO):
+        def write(self, text: str) -> int:
+            # every chunk is written before the following rows are taken
+            writes.append(len(produced))
+            return super().write(text)
+
+    writes = []
+    out = Out()
+    assert write_rows(COLUMNS, rows(), fmt, out, chunk_size=10) == 25
+    assert writes[0] <= 11
+
+    lines = out.getvalue().splitlines()
+    assert lines[:4] == ['+----+-------+', '| id | name  |', '+====+=======+', '|  0 | Name0 |']
+    assert lines[-3:] == ['| 24 | Name24 |', '+----+-------+', '']
@@ -0,0 +1,49 @@
+import pytest
+
+from api import connect
+from errors import DataError, ProgrammingError
+from FlorianDB import FlorianDB
+
+
+@pytest.fixture
+def connection(tmp_path):
+    with connect(str(tmp_path / 'db')) as connection:
+        connection.execute('CREATE t (id, name)')
+        yield connection
+
+
+@pytest.mark.parametrize('params', [(1.5, 'a'), (1, None), (True, 'a'), (1, b'a'), ([1], 'a')])
+def test_unsupported_params_are_rejected(connection, params):
+    with pytest.raises(ProgrammingError):
+        connection.execute('INSERT INTO t (?, ?)', params)
+    with pytest.raises(ProgrammingError):
+        connection.executemany('INSERT INTO t (?, ?)', [(1, 'a'), params])
+    with pytest.raises(ProgrammingError):
+        connection.execute('SELECT FROM t WHERE id = ?', [value for value in params if type(value) not in (int, str)])
+
+    # nothing reached the table or the log, so the database can still be saved and reloaded
+    connection.commit()
+    assert list(connection.execute('SELECT FROM t')) == []
+
+
+def test_supported_params(connection):
+    connection.execute('INSERT INTO t (?, ?)', (1, 'a'))
+    connection.executemany('INSERT INTO t (?, ?)', [(2, 'b'), (3, 'c')])
+    connection.commit()
+
+    assert list(connection.execute('SELECT FROM t WHERE id > ?', (1,))) == [(2, 'b'), (3, 'c')]
+
+
+@pytest.mark.parametrize('values', [[1.5, 'a'], [None, 'a'], [1, False]])
+def test_unsupported_values_of_an_empty_table(tmp_path, values):
+    db = FlorianDB()
+    db.load(str(tmp_path / 'db'), create=True)
+    db.create_table('t', ['id', 'name'], [])
+
+    with pytest.raises(DataError):
+        db.insert('t', values)
+    with pytest.raises(DataError):
+        db.insert_many('t', [values])
+
+    assert db.table('t')['data_types'] == []
+    db.close()
@@ -0,0 +1,27 @@
+import lexer
+from SQLparser import Parser
+
+
+def parse(sql: str) -> dict:
+    return Parser(lexer.Lexer(sql)).parse()
+
+
+def test_limit():
+    result = parse('SELECT FROM t WHERE a = 3 LIMIT 5')
+    assert result['success'] and result['limit'] == 5 and result['conditions'] == ['a', '=', 3]
+
+    result = parse('select id from t order by id desc limit 2')
+    assert result['success'] and result['limit'] == 2 and result['order_by'] == 'id'
+
+    assert not parse('SELECT FROM t LIMIT')['success']
+    assert not parse('SELECT FROM t LIMIT 2 WHERE a = 1')['success']
+
+
+def test_column_named_limit():
+    result = parse('CREATE t (id, limit INDEXED)')
+    assert result['success'] and result['col_names'] == ['id', 'limit']
+
+    result = parse('SELECT limit FROM t WHERE limit > 3 ORDER BY limit LIMIT 1')
+    assert result['success']
+    assert result['columns'] == ['limit'] and result['conditions'] == ['limit', '>', 3]
+    assert result['order_by'] == 'limit' and result['limit'] == 1
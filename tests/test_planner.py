@@ -0,0 +1,69 @@
+import pytest
+
+from FlorianDB import FlorianDB
+from planner import Filter, IndexScan, Planner, TableScan, UnionScan
+
+CITIES = ['Paris', 'Rome', 'Oslo']
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = FlorianDB(wal_sync_every=0)
+    db.load(str(tmp_path / 'db'), create=True)
+    db.create_table('p', ['id', 'city', 'age', 'name'], ['id', 'city', 'age'], {'age': 'BTREE', 'city': 'HASH'})
+    db.insert_many('p', ([i, CITIES[i % 3], i % 90, f'N{i}'] for i in range(3000)))
+    yield db
+    db.close(save=False)
+
+
+def matching(table: dict, test) -> list:
+    col_names = table['col_names']
+    return [row_id for row_id, row in enumerate(table['data']) if test(dict(zip(col_names, row)))]
+
+
+@pytest.mark.parametrize('conds, plan_type, test', [
+    (['id', '=', 5], IndexScan, lambda r: r['id'] == 5),
+    (['age', '>', 10], IndexScan, lambda r: r['age'] > 10),
+    (['name', '=', 'n7'], TableScan, lambda r: r['name'] == 'N7'),
+    ([['id', '=', 5], 'AND', ['age', '>', 30]], Filter, lambda r: r['id'] == 5 and r['age'] > 30),
+    ([['id', '<', 20], 'AND', ['name', '>', 'n2']], Filter, lambda r: r['id'] < 20 and r['name'].lower() > 'n2'),
+    ([['name', '>', 'n2'], 'AND', ['name', '<', 'n5']], TableScan, lambda r: 'n2' < r['name'].lower() < 'n5'),
+    ([['id', '=', 5], 'OR', ['city', '=', 'rome']], UnionScan, lambda r: r['id'] == 5 or r['city'] == 'Rome'),
+    ([['id', '=', 5], 'OR', ['name', '=', 'n7']], TableScan, lambda r: r['id'] == 5 or r['name'] == 'N7'),
+])
+def test_plan_type_and_result(db, conds, plan_type, test):
+    table = db.table('p')
+    plan = Planner(table).plan(conds)
+
+    assert isinstance(plan, plan_type)
+    assert list(plan.execute()) == matching(table, test)
+
+
+def test_most_selective_index_drives_and(db):
+    assert db.explain('p', [['city', '=', 'Paris'], 'AND', ['id', '=', 5]]) == [
+        'Filter: city = "paris"  (est. rows: 0)',
+        '-> Index scan using AVL index on id: id = 5  (est. rows: 1)',
+    ]
+
+
+def test_explain_union(db):
+    assert db.explain('p', [['id', '=', 5], 'OR', ['city', '=', 'rome']]) == [
+        'Union  (est. rows: 1001)',
+        '-> Index scan using AVL index on id: id = 5  (est. rows: 1)',
+        '-> Index scan using HASH index on city: city = "rome"  (est. rows: 1000)',
+    ]
+
+
+def test_statistics_decide_between_index_and_table_scan(db):
+    # without statistics a range is guessed to match a third of the table
+    assert db.explain('p', ['age', '<', 80]) == ['Index scan using BTREE index on age: age < 80  (est. rows: 1000)']
+
+    db.analyze('p')
+    assert db.explain('p', ['age', '>', 80]) == ['Index scan using BTREE index on age: age > 80  (est. rows: 279)']
+    assert db.explain('p', ['age', '<', 80]) == ['Table scan: age < 80  (est. rows: 2688)']
+
+
+def test_index_only_scan(db):
+    assert db.explain('p', ['id', '<', 3], ['id']) == ['Index only scan using AVL index on id: id < 3  (est. rows: 1000)']
+    assert list(db.select('p', ['id', '<', 3], columns=['id'])[1]) == [(0,), (1,), (2,)]
+
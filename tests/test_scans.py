@@ -0,0 +1,64 @@
+import os
+import random
+
+import pytest
+
+from FlorianDB import FlorianDB
+
+CONDITIONS = [
+    ['age', '=', 42],
+    ['name', '<', 'NAME2'],
+    [['age', '>', 50], 'AND', ['name', '>', 'name5']],
+    [['age', '<', 3], 'OR', ['name', '=', 'Name7']],
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = FlorianDB(wal_sync_every=0)
+    db.load(str(tmp_path / 'db'), create=True)
+
+    rng = random.Random(1)
+    db.create_table('people', ['id', 'name', 'age'], [])
+    db.insert_many('people', ([i, rng.choice(['Name', 'NAME', 'name']) + str(rng.randrange(100)), rng.randrange(100)]
+                              for i in range(20000)))
+    yield db
+    db.close(save=False)
+
+
+def select_all(db: FlorianDB) -> list:
+    db.set_option('CACHE_SIZE', 0)
+    return [list(db.select('people', conds)[1]) for conds in CONDITIONS]
+
+
+def test_parallel_scan_matches_serial(db, tmp_path):
+    expected = select_all(db)
+
+    db.set_option('PARALLEL_THRESHOLD', 0)
+    db.set_option('PARALLEL', 2)
+    assert 'Parallel table scan' in db.explain('people', CONDITIONS[1])[0]
+    assert select_all(db) == expected
+
+    # rows inserted after the first scan are scanned too
+    db.insert('people', [20000, 'NAME1', 42])
+    assert [row[0] for row in db.select('people', ['age', '=', 42])[1]][-1] == 20000
+
+    # segments of the previous database are dropped by LOAD
+    assert db.scanner._tables
+    db.load(str(tmp_path / 'other'), create=True)
+    assert not db.scanner._tables and not os.listdir(db.scanner._directory)
+
+
+def test_vectorised_scan_matches_serial(db, tmp_path):
+    pytest.importorskip('numpy')
+    expected = select_all(db)
+
+    db.set_option('VECTORISED_THRESHOLD', 0)
+    db.set_option('VECTORISED', 'ON')
+    assert 'Vectorised table scan' in db.explain('people', CONDITIONS[1])[0]
+    assert select_all(db) == expected
+
+    # stores of the previous database are dropped by LOAD
+    assert db.vector._stores
+    db.load(str(tmp_path / 'other'), create=True)
+    assert not db.vector._stores
@@ -0,0 +1,119 @@
+import socket
+import asyncio
+import threading
+
+import pytest
+
+import errors
+import server as server_module
+from client import Client
+from FlorianDB import FlorianDB
+from protocol import FRAME_HEADER, decode_payload, encode_frame
+
+
+@pytest.fixture
+def address(tmp_path):
+    db = FlorianDB()
+    db.load(str(tmp_path / 'db'), create=True)
+    server = server_module.Server(db, '127.0.0.1', 0, workers=2)
+
+    loop = asyncio.new_event_loop()
+    started = loop.run_until_complete(asyncio.start_server(server.handle, '127.0.0.1', 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    yield started.sockets[0].getsockname()[:2]
+
+    async def shutdown():
+        started.close()
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+    server.close()
+
+
+def send_raw(sock: socket.socket, payload: bytes) -> dict:
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+    (length,) = FRAME_HEADER.unpack(sock.recv(FRAME_HEADER.size, socket.MSG_WAITALL))
+    return decode_payload(sock.recv(length, socket.MSG_WAITALL))
+
+
+def test_statements(address):
+    with Client(*address) as client:
+        client.execute('CREATE t (id INDEXED, name)')
+        assert client.execute('INSERT INTO t (?, ?)', (1, 'a')).rowcount == 1
+        assert client.execute('SELECT FROM t WHERE id = ?', (1,)).fetchall() == [(1, 'a')]
+
+
+@pytest.mark.parametrize('payload', [b'[1]', b'"SELECT"', b'{"sql": 1}', b'{"sql": "SELECT FROM t", "params": 3}',
+                                     b'not json', b'\xff'])
+def test_malformed_requests_keep_the_connection(address, payload):
+    with socket.create_connection(address) as sock:
+        response = send_raw(sock, payload)
+        assert response['type'] == 'ProgrammingError'
+
+        response = send_raw(sock, encode_frame({'sql': 'SELECT FROM nope', 'params': []})[FRAME_HEADER.size:])
+        assert 'error' in response
+
+
+def test_errors_keep_the_connection(address):
+    with Client(*address) as client:
+        client.execute('CREATE t (id, name)')
+
+        with pytest.raises(errors.ProgrammingError):
+            client.execute('INSERT INTO t (?, ?)', (1.5, None))
+        with pytest.raises(errors.ProgrammingError):
+            client.execute('SELECT FROM nope')
+
+        assert client.execute('INSERT INTO t (?, ?)', (1, 'a')).rowcount == 1
+
+
+def test_unexpected_exception_keeps_the_connection(address, monkeypatch):
+    parse = server_module.parse
+
+    def failing_parse(sql: str):
+        if sql == 'BOOM':
+            raise RuntimeError('boom')
+        return parse(sql)
+
+    monkeypatch.setattr(server_module, 'parse', failing_parse)
+
+    with Client(*address) as client:
+        with pytest.raises(errors.InternalError):
+            client.execute('BOOM')
+
+        client.execute('CREATE t (id)')
+        assert client.execute('SELECT FROM t').fetchall() == []
+
+
+@pytest.mark.parametrize('sql', ['COPY t FROM "/etc/passwd"', 'SET PARALLEL 2', 'PREPARE p AS COPY t FROM "/etc/passwd"',
+                                 'PREPARE p AS SET VECTORISED ON'])
+def test_server_rejects_copy_and_set(address, sql):
+    with Client(*address) as client:
+        client.execute('CREATE t (line)')
+
+        with pytest.raises(errors.ProgrammingError, match='not available'):
+            client.execute(sql)
+        with pytest.raises(errors.ProgrammingError):
+            client.execute('EXECUTE p ()')
+        assert client.execute('SELECT FROM t').fetchall() == []
+
+
+def test_prepared_statements_belong_to_the_client(address):
+    with Client(*address) as first, Client(*address) as second:
+        first.execute('CREATE t (name)')
+        first.execute('PREPARE p AS INSERT INTO t (?)')
+        second.execute('PREPARE p AS SELECT FROM t WHERE name = ?')
+
+        assert first.execute('EXECUTE p ("Tom")').rowcount == 1
+        assert second.execute('EXECUTE p ("Tom")').fetchall() == [('Tom',)]
+
+        with Client(*address) as third:
+            with pytest.raises(errors.ProgrammingError, match="doesn't exist"):
+                third.execute('EXECUTE p ("Tom")')
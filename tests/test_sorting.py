@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+import sorting
+from FlorianDB import FlorianDB
+
+ROWS = 10000
+
+
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+    rng = random.Random(3)
+    db = FlorianDB(wal_sync_every=0)
+    db.load(str(tmp_path_factory.mktemp('sorting') / 'db'), create=True)
+    db.create_table('t', ['id', 'grp', 'name', 'n'], ['id', 'grp', 'name'], {'grp': 'BTREE', 'name': 'HASH'})
+    db.insert_many('t', ([i, rng.randrange(50), rng.choice(['a', 'B', 'b', 'C']) + str(rng.randrange(20)),
+                          rng.randrange(100)] for i in range(ROWS)))
+    yield db
+    db.close(save=False)
+
+
+def expected(db: FlorianDB, conds: list, column: str, descending: bool, limit: int = None) -> list:
+    table = db.table('t')
+    position = table['col_names'].index(column)
+    rows = list(db.select('t', conds)[1])
+    # Python's sort is stable in both directions, rows with equal values keep the order of the table
+    rows.sort(key=lambda row: row[position].lower() if isinstance(row[position], str) else row[position],
+              reverse=descending)
+    return rows[:limit] if limit is not None else rows
+
+
+@pytest.mark.parametrize('column, conds, limit, plan', [
+    ('grp', [], None, 'Index order scan using BTREE index on grp'),
+    ('grp', [], 10, 'Index order scan using BTREE index on grp'),
+    ('id', ['n', '<', 5], 10, 'Index order scan using AVL index on id'),
+    ('grp', ['id', '<', 100], 10, 'Top-K heap: ORDER BY grp'),
+    ('grp', ['id', '<', 100], None, 'Sort: ORDER BY grp'),
+    ('name', [], 25, 'Top-K heap: ORDER BY name'),
+    ('name', ['n', '>', 50], None, 'Sort: ORDER BY name'),
+    ('n', [], None, 'Sort: ORDER BY n'),
+])
+@pytest.mark.parametrize('descending', [False, True])
+def test_order_by(db, column, conds, limit, plan, descending):
+    assert db.explain('t', conds, order_by=column, descending=descending, limit=limit)[0].startswith(plan)
+
+    rows = list(db.select('t', conds, limit, order_by=column, descending=descending)[1])
+    assert rows == expected(db, conds, column, descending, limit)
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_external_sort_spills_runs(db, monkeypatch, descending):
+    monkeypatch.setattr(sorting, 'RUN_CHUNK', 100)
+    spilled = []
+    spill = sorting._spill
+
+    def counting_spill(run: list):
+        spilled.append(len(run))
+        return spill(run)
+
+    monkeypatch.setattr(sorting, '_spill', counting_spill)
+
+    db.set_option('SORT_MEMORY', 1)
+    try:
+        rows = list(db.select('t', ['n', '>', 10], order_by='name', descending=descending)[1])
+    finally:
+        db.set_option('SORT_MEMORY', sorting.SORT_MEMORY)
+
+    assert len(spilled) > 1
+    assert rows == expected(db, ['n', '>', 10], 'name', descending)
+
+
+def test_order_by_aggregate(db):
+    col_names, rows = db.select('t', [], 3, ['grp', ['COUNT', '*']], ['grp'], ['COUNT', '*'], True)
+    counts = {}
+    for row in db.select('t', [])[1]:
+        counts[row[1]] = counts.get(row[1], 0) + 1
+
+    assert col_names == ['grp', 'COUNT(*)']
+    assert [count for _, count in rows] == sorted(counts.values(), reverse=True)[:3]
@@ -0,0 +1,101 @@
+import os
+import shutil
+
+import pytest
+
+from FlorianDB import FlorianDB
+from indexes import build_index, fold_rows, index_type_name, indexed_columns
+from storage import LazyDatabase, decode_column, encode_column, is_columnar, load_legacy, migrate, write_database
+
+LEGACY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cats.flodb')
+
+
+@pytest.mark.parametrize('values, ctype, encoding', [
+    ([0, -1, 2 ** 63 - 1, -2 ** 63], int, 'i64'),
+    ([1, 2 ** 70, -2 ** 80], int, 'int'),
+    (['', 'Murzik', 'ascii'], str, 'str'),
+    (['Мурзик', '猫', 'é', '\ud800'], str, 'str'),
+    ([], str, 'str'),
+])
+def test_column_round_trip(values, ctype, encoding):
+    assert encode_column(values, ctype)[0] == encoding
+    assert decode_column(encode_column(values, ctype)[1], encoding, len(values)) == values
+
+
+def make_table(col_names: list, rows: list, indexes: dict) -> dict:
+    table = {'col_names': col_names, 'data_types': [type(value) for value in rows[0]] if rows else [],
+             'data': rows}
+    fold_rows(table)
+    for in_col, index_type in indexes.items():
+        table[in_col] = build_index(table, in_col, index_type)
+    return table
+
+
+def assert_same_table(table: dict, expected: dict):
+    assert table['col_names'] == expected['col_names']
+    assert table['data_types'] == expected['data_types']
+    assert table['data'] == expected['data']
+    assert table.get('stats') == expected.get('stats')
+    assert indexed_columns(table) == indexed_columns(expected)
+
+    for in_col in indexed_columns(expected):
+        assert index_type_name(table[in_col]) == index_type_name(expected[in_col])
+        assert sorted(table[in_col].items()) == sorted(expected[in_col].items())
+
+
+@pytest.fixture
+def tables() -> dict:
+    people = make_table(['id', 'name', 'age'], [(i, f'Name{i % 7}', i % 30) for i in range(500)],
+                        {'id': 'AVL', 'name': 'HASH', 'age': 'BTREE', 'name,age': 'AVL'})
+    people['stats'] = {'rows': 500}
+    return {'people': people, 'empty': make_table(['a', 'b'], [], {'a': 'AVL'})}
+
+
+def test_database_round_trip(tmp_path, tables):
+    filename = str(tmp_path / 'db.flodb')
+    write_database(filename, tables, wal_generation=3)
+    assert is_columnar(filename)
+
+    db = LazyDatabase(filename)
+    assert db.wal_generation == 3
+    assert sorted(db) == ['empty', 'people'] and db.materialised() == {}
+
+    for name, expected in tables.items():
+        assert_same_table(db[name], expected)
+    db.close()
+
+
+def test_tables_never_accessed_are_copied(tmp_path, tables):
+    first, second = str(tmp_path / 'first.flodb'), str(tmp_path / 'second.flodb')
+    write_database(first, tables)
+
+    db = LazyDatabase(first)
+    assert_same_table(db['empty'], tables['empty'])
+    write_database(second, db)
+    assert 'people' not in db.materialised()
+    db.close()
+
+    db = LazyDatabase(second)
+    for name, expected in tables.items():
+        assert_same_table(db[name], expected)
+    db.close()
+
+
+def test_legacy_pickle_is_loaded_and_migrated(tmp_path):
+    filename = str(tmp_path / 'cats.flodb')
+    shutil.copy(LEGACY, filename)
+    expected = load_legacy(filename)
+
+    db = FlorianDB()
+    db.load(filename)
+    assert_same_table(db.table('cats'), expected['cats'])
+    assert list(db.select('cats', ['name', '=', 'murzik'])[1]) == [('1', 'Murzik', 'Sausages')]
+    db.close(save=False)
+
+    assert migrate(filename)
+    assert is_columnar(filename)
+    assert not migrate(filename)
+
+    db = LazyDatabase(filename)
+    assert_same_table(db['cats'], expected['cats'])
+    db.close()
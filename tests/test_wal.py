@@ -0,0 +1,189 @@
+import os
+import time
+import zlib
+from pickle import dumps, HIGHEST_PROTOCOL
+
+import pytest
+
+from errors import OperationalError, ProgrammingError
+from FlorianDB import FlorianDB
+from wal import WriteAheadLog, CREATE_INDEX, INSERT, _RECORD_HEADER
+
+
+class Crash(Exception):
+    pass
+
+
+def open_db(filename: str) -> FlorianDB:
+    db = FlorianDB()
+    db.load(filename, create=True)
+    return db
+
+
+def rows(db: FlorianDB, name: str = 't') -> list:
+    return list(db.select(name, [])[1])
+
+
+def write_records(filename: str, *records):
+    with open(filename + '.flodb.wal', 'wb') as f:
+        for record in records:
+            payload = dumps(record, HIGHEST_PROTOCOL)
+            f.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+
+
+def test_replay_after_crash_without_save(tmp_path):
+    filename = str(tmp_path / 'db')
+
+    db = open_db(filename)
+    db.create_table('t', ['id'], [])
+    db.insert('t', [1])
+    db.insert_many('t', [[2], [3]])
+    db.close_wal()
+
+    db = FlorianDB()
+    assert db.load(filename) == 3
+    assert rows(db) == [(1,), (2,), (3,)]
+    db.close()
+
+
+@pytest.mark.parametrize('sync_interval', [0.0, 0.05])
+def test_crash_between_checkpoint_and_log_truncate(tmp_path, monkeypatch, sync_interval):
+    filename = str(tmp_path / 'db')
+
+    db = FlorianDB(wal_sync_interval=sync_interval)
+    db.load(filename, create=True)
+    db.create_table('t', ['id'], ['id'])
+    db.insert('t', [1])
+    db.insert('t', [2])
+
+    # the new file is in place, the process dies before the log is emptied
+    def crash(self, generation):
+        raise Crash()
+
+    monkeypatch.setattr(WriteAheadLog, 'truncate', crash)
+    with pytest.raises(Crash):
+        db.save()
+    monkeypatch.undo()
+    db.close_wal()
+
+    db = FlorianDB()
+    assert db.load(filename) == 0
+    assert rows(db) == [(1,), (2,)]
+
+    # the stale log was emptied, new records are replayed once
+    db.insert('t', [3])
+    db.close_wal()
+
+    db = FlorianDB()
+    assert db.load(filename) == 1
+    assert rows(db) == [(1,), (2,), (3,)]
+    assert [row_ids for _, row_ids in db.table('t')['id'].items()] == [[0], [1], [2]]
+    db.close()
+
+
+def test_crash_before_checkpoint_replace(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'db')
+
+    db = open_db(filename)
+    db.create_table('t', ['id'], [])
+    db.insert('t', [1])
+
+    def crash(src, dst):
+        raise Crash()
+
+    # the old file and the log stay as they were
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(Crash):
+        db.save()
+    monkeypatch.undo()
+    db.close_wal()
+
+    db = FlorianDB()
+    assert db.load(filename) == 2
+    assert rows(db) == [(1,)]
+    db.close()
+
+
+def test_log_without_generation_is_replayed(tmp_path):
+    filename = str(tmp_path / 'db')
+
+    db = open_db(filename)
+    db.create_table('t', ['id'], [])
+    db.close()
+
+    # a log written before generations starts right with its first record
+    write_records(filename, (INSERT, 't', [7]))
+
+    db = FlorianDB()
+    assert db.load(filename) == 1
+    assert rows(db) == [(7,)]
+    db.close()
+
+
+def test_sync_interval_syncs_trailing_record(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, 'fsync', synced.append)
+
+    wal = WriteAheadLog(str(tmp_path / 'log.wal'), sync_every=0, sync_interval=0.05)
+    synced.clear()
+    wal.append(INSERT, 't', [1])
+    assert not synced
+
+    # no more records are written, the background thread syncs the last one
+    deadline = time.monotonic() + 2
+    while not synced and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert synced
+    wal.close()
+
+
+def test_unknown_index_type_is_not_logged(tmp_path):
+    filename = str(tmp_path / 'db')
+
+    db = open_db(filename)
+    db.create_table('t', ['a'], [])
+    db.insert('t', [1])
+    with pytest.raises(ProgrammingError, match='Unknown index type'):
+        db.create_index('t', 'a', 'BTREEE')
+    db.close_wal()
+
+    db = FlorianDB()
+    assert db.load(filename) == 2
+    assert db.indexed_columns(db.table('t')) == []
+    db.close()
+
+
+def test_invalid_record_fails_load_with_its_position(tmp_path):
+    filename = str(tmp_path / 'db')
+
+    db = open_db(filename)
+    db.create_table('t', ['a'], [])
+    db.close()
+    write_records(filename, (INSERT, 't', [1]), (CREATE_INDEX, 't', 'a', 'BTREEE'))
+    log = open(filename + '.flodb.wal', 'rb').read()
+
+    db = FlorianDB()
+    with pytest.raises(OperationalError, match='Record 2 of the write-ahead log'):
+        db.load(filename)
+
+    # the half replayed database isn't kept, closing it doesn't touch the files
+    assert db.filename == '' and not db.is_table_exist('t')
+    db.close()
+    assert open(filename + '.flodb.wal', 'rb').read() == log
+
+
+@pytest.mark.parametrize('indexed, index_types', [(['a'], {'a': 'BTREEE'}), (['a'], {'b': 'HASH'}),
+                                                  (['c'], None), (['a,c'], {'a,c': 'AVL'})])
+def test_invalid_create_is_not_logged(tmp_path, indexed, index_types):
+    filename = str(tmp_path / 'db')
+
+    db = open_db(filename)
+    with pytest.raises(ProgrammingError):
+        db.create_table('t', ['a', 'b'], indexed, index_types)
+    assert not db.is_table_exist('t')
+    db.close_wal()
+
+    db = FlorianDB()
+    assert db.load(filename) == 0
+    db.close()
@@ -0,0 +1,156 @@
+import os
+import time
+import struct
+import zlib
+import threading
+from pickle import dumps, loads, HIGHEST_PROTOCOL, UnpicklingError
+
+# Record types
+CREATE, INSERT, INSERT_MANY, CREATE_INDEX, DROP_INDEX = 'C', 'I', 'M', 'X', 'D'
+
+# First record of a log: generation of the checkpoint the records of the log are applied to
+GENERATION = 'G'
+
+# Every record is stored as: <payload length> <crc32 of payload> <pickled payload>
+_RECORD_HEADER = struct.Struct('<II')
+
+
+class WriteAheadLog:
+    def __init__(self, filename: str, sync_every: int = 1, sync_interval: float = 0.0, generation: int = 0):
+        """
+        Append-only log of the changes made since the last checkpoint
+
+        filename: path of the log file, usually <database file>.wal
+        generation: generation written into a new (empty) log, the checkpoint it continues must have the same one
+        sync_every: fsync the log after this many appended records, 0 disables counting
+        sync_interval: fsync appended records at most this many seconds after they were written, 0 disables the timer
+
+        With sync_every=1 every record is on disk before the statement returns. Bigger values
+        group several commits into one fsync, trading the last few statements on a power loss
+        for throughput. Records are always flushed to the OS, so a crash of the process itself loses nothing.
+        With sync_interval a background thread fsyncs records left pending after the last append, so a power loss
+        costs at most the records of the last sync_interval seconds even if no more records are written.
+
+        Every checkpoint bumps the generation: the database file is written with generation n + 1 before the log
+        of generation n is emptied, so after a crash between the two steps replay() skips the stale log
+        instead of applying its records twice.
+        """
+
+        self.filename = filename
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._file = open(filename, 'ab')
+        # writers of different tables append concurrently
+        self._lock = threading.RLock()
+
+        # None is a log written before generations, its records are always replayed
+        self.generation = None
+        if self._file.tell() == 0:
+            self._start(generation)
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if sync_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, name='wal-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.sync_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_sync >= self.sync_interval:
+                    self.sync()
+
+    def _start(self, generation: int) -> None:
+        self.generation = generation
+        payload = dumps((GENERATION, generation), HIGHEST_PROTOCOL)
+        self._file.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, *record) -> None:
+        payload = dumps(record, HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self._file.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._file.flush()
+
+            self._pending += 1
+            if self.sync_every and self._pending >= self.sync_every:
+                self.sync()
+            elif self.sync_interval and time.monotonic() - self._last_sync >= self.sync_interval:
+                self.sync()
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._pending:
+                os.fsync(self._file.fileno())
+                self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def replay(self, generation: int = 0):
+        """
+        Yield records of the log in the order they were appended
+
+        generation: generation of the loaded checkpoint, a log of an older generation is already in the checkpoint,
+                    so nothing is yielded and the log is emptied
+
+        A torn or corrupted tail (e.g. after a crash in the middle of a write) ends the replay
+        and is cut off, so the following appends continue right after the last valid record.
+        """
+
+        records = self._records()
+        for record in records:
+            if record[0] != GENERATION:
+                yield record
+                continue
+
+            self.generation = record[1]
+            if self.generation < generation:
+                records.close()
+                self.truncate(generation)
+                return
+
+    def _records(self):
+        """ Yield valid records of the file and cut off the invalid tail """
+
+        valid_end = 0
+        with open(self.filename, 'rb') as f:
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+
+                length, crc = _RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+
+                try:
+                    record = loads(payload)
+                except (UnpicklingError, EOFError, ValueError):
+                    break
+
+                valid_end = f.tell()
+                yield record
+
+        if valid_end != os.path.getsize(self.filename):
+            self._file.truncate(valid_end)
+
+    def truncate(self, generation: int) -> None:
+        """ Drop every record and start the generation, used after the records were folded into a checkpoint """
+
+        with self._lock:
+            self._file.truncate(0)
+            self._pending = 0
+            self._start(generation)
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+
+        self.sync()
+        self._file.close()